@@ -0,0 +1,6 @@
+from focus_arrow.async_app import create_async_app
+from dotenv import load_dotenv
+
+# Serve with an ASGI server, e.g. `hypercorn asgi:app`.
+load_dotenv(".env")
+app = create_async_app()
@@ -0,0 +1,77 @@
+from abc import ABC, abstractmethod
+from email.mime import multipart
+import asyncio
+import aiosmtplib
+from focus_arrow.adapters.email import html_part
+
+
+class AbstractAsyncEmailClient(ABC):
+    @abstractmethod
+    async def send(self, to_address: str, subject: str, content: str):
+        raise NotImplementedError
+
+
+class AsyncGmailClient(AbstractAsyncEmailClient):
+    # Same pooling strategy as PooledGmailClient: up to `size` authenticated
+    # connections are kept and reused, and a dropped one is replaced once.
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        host: str = "smtp.gmail.com",
+        port: int = 587,
+        use_starttls: bool = True,
+        size: int = 2,
+    ) -> None:
+        self.username = username
+        self.password = password
+        self.host = host
+        self.port = port
+        self.use_starttls = use_starttls
+        self.size = size
+        self._idle = []
+        self._slots = None
+
+    async def send(self, to_address: str, subject: str, content: str):
+        msg = multipart.MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = self.username
+        msg["To"] = to_address
+        msg.attach(html_part(content))
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        async with self._slots:
+            server = self._idle.pop() if self._idle else await self._connect()
+            try:
+                try:
+                    await server.send_message(msg)
+                except aiosmtplib.SMTPServerDisconnected:
+                    server.close()
+                    server = await self._connect()
+                    await server.send_message(msg)
+            except BaseException:
+                server.close()
+                raise
+            self._idle.append(server)
+
+    async def close(self) -> None:
+        while self._idle:
+            server = self._idle.pop()
+            try:
+                await server.quit()
+            except (aiosmtplib.SMTPException, OSError):
+                server.close()
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        server = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            start_tls=self.use_starttls,
+        )
+        await server.connect()
+        try:
+            await server.login(self.username, self.password)
+        except BaseException:
+            server.close()
+            raise
+        return server
@@ -0,0 +1,119 @@
+from hashlib import blake2b
+from typing import Callable, Iterable, Optional
+import logging
+import math
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, item: str):
+        # Double hashing: k positions out of two independent 64-bit hashes.
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        positions = self._positions(item)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class RefreshableBloomFilter:
+    """
+    Bloom filter that is periodically rebuilt from the source of truth, so
+    that items added by other processes are eventually seen. Until the first
+    build completes every lookup is a possible match.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter: Optional[BloomFilter] = None
+        self._pending: Optional[set] = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def might_contain(self, item: str) -> bool:
+        current = self._filter
+        return current is None or item in current
+
+    def add(self, item: str) -> None:
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(item)
+            if self._pending is not None:
+                self._pending.add(item)
+
+    def rebuild(self, items: Iterable[str]) -> None:
+        with self._lock:
+            self._pending = set()
+        try:
+            rebuilt = BloomFilter(self.capacity, self.error_rate)
+            for item in items:
+                rebuilt.add(item)
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            # Items added while we were reading may not be in `items` yet.
+            for item in self._pending:
+                rebuilt.add(item)
+            self._pending = None
+            self._filter = rebuilt
+        if rebuilt.count > 0.9 * self.capacity:
+            logger.warning(
+                "Bloom filter holds %d of %d items, growing it for the next rebuild",
+                rebuilt.count,
+                self.capacity,
+            )
+            self.capacity *= 2
+
+    def start_refreshing(
+        self, load: Callable[[], Iterable[str]], interval: float
+    ) -> "RefreshableBloomFilter":
+        threading.Thread(
+            target=self._refresh_loop,
+            args=(load, interval),
+            name="bloom-refresh",
+            daemon=True,
+        ).start()
+        return self
+
+    def close(self) -> None:
+        self._closed.set()
+
+    def _refresh_loop(self, load: Callable[[], Iterable[str]], interval: float):
+        while not self._closed.is_set():
+            try:
+                self.rebuild(load())
+            except Exception:
+                logger.exception("Failed to rebuild bloom filter")
+            if self._closed.wait(interval):
+                return
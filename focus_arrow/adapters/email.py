@@ -1,6 +1,35 @@
 from abc import ABC, abstractmethod
+import logging
+import queue
 import smtplib
+import threading
+import time
 from email.mime import multipart, text
+from typing import Dict, Optional
+from focus_arrow.adapters.metrics import EMAIL_DURATION
+from focus_arrow.adapters.outbox import AbstractOutbox, OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+
+# Encoded bodies of emails that never change, e.g. the uninstallation notice.
+# Other bodies carry a token, so caching them would only keep secrets around.
+_static_payloads: Dict[str, str] = {}
+
+
+def add_static_body(content: str) -> None:
+    _static_payloads[content] = text.MIMEText(content, "html", "utf-8").get_payload()
+
+
+def html_part(content: str) -> text.MIMEText:
+    # Every message gets its own part; for static bodies only the encoding,
+    # which is the expensive step, is reused.
+    payload = _static_payloads.get(content)
+    if payload is None:
+        return text.MIMEText(content, "html", "utf-8")
+    part = text.MIMEText("", "html", "utf-8")
+    part.set_payload(payload)
+    return part
 
 
 class AbstractEmailClient(ABC):
@@ -10,19 +39,216 @@ class AbstractEmailClient(ABC):
 
 
 class GmailClient(AbstractEmailClient):
-    def __init__(self, username: str, password: str) -> None:
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        host: str = "smtp.gmail.com",
+        port: int = 587,
+        use_starttls: bool = True,
+    ) -> None:
         self.username = username
         self.password = password
+        self.host = host
+        self.port = port
+        self.use_starttls = use_starttls
 
-    def send(self, to_address: str, subject: str, content: str):
+    def _build_message(self, to_address: str, subject: str, content: str) -> str:
         msg = multipart.MIMEMultipart("alternative")
         msg["Subject"] = subject
         msg["From"] = self.username
         msg["To"] = to_address
-        msg.attach(text.MIMEText(content, "html"))
-        server = smtplib.SMTP("smtp.gmail.com", 587)
-        server.ehlo()
-        server.starttls()
-        server.login(self.username, self.password)
-        server.sendmail(self.username, to_address, msg.as_string())
-        server.quit()
+        msg.attach(html_part(content))
+        return msg.as_string()
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port)
+        try:
+            server.ehlo()
+            if self.use_starttls:
+                server.starttls()
+                server.ehlo()
+            server.login(self.username, self.password)
+        except BaseException:
+            server.close()
+            raise
+        return server
+
+    def send(self, to_address: str, subject: str, content: str):
+        msg = self._build_message(to_address, subject, content)
+        with EMAIL_DURATION.time():
+            server = self._connect()
+            server.sendmail(self.username, to_address, msg)
+            server.quit()
+
+
+class PooledGmailClient(GmailClient):
+    """
+    Keeps up to `size` authenticated SMTP connections open and reuses them
+    between sends, so the EHLO/STARTTLS/LOGIN handshake is only paid once per
+    connection.
+    """
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        host: str = "smtp.gmail.com",
+        port: int = 587,
+        use_starttls: bool = True,
+        size: int = 2,
+        keepalive_interval: Optional[float] = 60,
+    ) -> None:
+        super().__init__(username, password, host, port, use_starttls)
+        self.size = size
+        self.keepalive_interval = keepalive_interval
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = threading.Event()
+        if keepalive_interval:
+            threading.Thread(
+                target=self._keepalive_loop, name="smtp-keepalive", daemon=True
+            ).start()
+
+    def send(self, to_address: str, subject: str, content: str):
+        msg = self._build_message(to_address, subject, content)
+        with EMAIL_DURATION.time(), self._slots:
+            server = self._acquire()
+            try:
+                try:
+                    server.sendmail(self.username, to_address, msg)
+                except smtplib.SMTPServerDisconnected:
+                    # The server dropped an idle connection; retry once on a
+                    # fresh one.
+                    self._close(server)
+                    server = self._connect()
+                    server.sendmail(self.username, to_address, msg)
+            except BaseException:
+                self._close(server)
+                raise
+            self._release(server)
+
+    def keepalive(self) -> None:
+        servers = []
+        while True:
+            try:
+                servers.append(self._idle.get_nowait()[0])
+            except queue.Empty:
+                break
+        for server in servers:
+            if self._is_alive(server):
+                self._release(server)
+            else:
+                self._close(server)
+
+    def close(self) -> None:
+        self._closed.set()
+        while True:
+            try:
+                server = self._idle.get_nowait()[0]
+            except queue.Empty:
+                break
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+
+    def _acquire(self) -> smtplib.SMTP:
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if (
+                self.keepalive_interval is None
+                or time.monotonic() - last_used < self.keepalive_interval
+                or self._is_alive(server)
+            ):
+                return server
+            self._close(server)
+
+    def _release(self, server: smtplib.SMTP) -> None:
+        try:
+            self._idle.put_nowait((server, time.monotonic()))
+        except queue.Full:
+            self._close(server)
+
+    def _is_alive(self, server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _close(self, server: smtplib.SMTP) -> None:
+        try:
+            server.close()
+        except OSError:
+            pass
+
+    def _keepalive_loop(self) -> None:
+        while not self._closed.wait(self.keepalive_interval):
+            self.keepalive()
+
+
+class QueuedEmailClient(AbstractEmailClient):
+    """
+    Puts emails in an outbox and returns immediately. A pool of worker threads
+    delivers them through `delegate`, retrying failures with exponential
+    backoff.
+    """
+
+    def __init__(
+        self,
+        delegate: AbstractEmailClient,
+        outbox: AbstractOutbox,
+        workers: int = 2,
+        max_attempts: int = 5,
+        backoff: float = 2,
+        max_backoff: float = 300,
+        poll_interval: float = 1,
+    ) -> None:
+        self.delegate = delegate
+        self.outbox = outbox
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self._closed = threading.Event()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"email-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def send(self, to_address: str, subject: str, content: str):
+        self.outbox.put(OutgoingEmail(to_address, subject, content))
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        self._closed.set()
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def _work(self) -> None:
+        while not self._closed.is_set():
+            email = self.outbox.get(timeout=self.poll_interval)
+            if email is not None:
+                self._deliver(email)
+
+    def _deliver(self, email: OutgoingEmail) -> None:
+        try:
+            self.delegate.send(email.to_address, email.subject, email.content)
+        except Exception:
+            if email.attempts + 1 >= self.max_attempts:
+                logger.exception("Giving up on email to %s", email.to_address)
+                self.outbox.fail(email)
+            else:
+                logger.warning(
+                    "Failed to send email to %s, retrying",
+                    email.to_address,
+                    exc_info=True,
+                )
+                delay = min(self.backoff * 2**email.attempts, self.max_backoff)
+                self.outbox.retry(email, delay)
+        else:
+            self.outbox.ack(email)
@@ -0,0 +1,242 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+logger = logging.getLogger(__name__)
+trace_logger = logging.getLogger("focus_arrow.trace")
+
+# Spans timed while a trace is active are collected here, so a request can
+# log where its time went once it finishes.
+_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "focus_arrow_spans", default=None
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+class Histogram:
+    """
+    Thread-safe latency histogram with a fixed set of label names, rendered
+    in the Prometheus text format.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # Per label values: observations per bucket (the last one is +Inf),
+        # then the sum of all observations.
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.observe(duration, *labels)
+            spans = _spans.get()
+            if spans is not None:
+                spans.append((".".join(labels) or self.name, duration))
+
+    def snapshot(self) -> Dict[Tuple[str, ...], List[float]]:
+        with self._lock:
+            return {labels: list(values) for labels, values in self._series.items()}
+
+    def render(
+        self, series: Optional[Dict[Tuple[str, ...], List[float]]] = None
+    ) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        if series is None:
+            series = self.snapshot()
+        for labels, values in sorted(series.items()):
+            pairs = [
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.label_names, labels)
+            ]
+            label_text = ",".join(pairs)
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.name}_sum{suffix} {values[-1]}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    The metrics of one process. Under gunicorn every worker has its own, so
+    once `share` is called they are also written to a directory every few
+    seconds, and `render` adds up what all processes wrote there. A scrape
+    then reports every worker, whichever one answers it.
+    """
+
+    def __init__(self):
+        self._metrics: List[Histogram] = []
+        self._directory: Optional[str] = None
+        self._path: Optional[str] = None
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        histogram = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(histogram)
+        return histogram
+
+    def share(self, directory: str, interval: float = 5) -> None:
+        if self._directory is not None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._path = os.path.join(directory, f"{os.getpid()}.json")
+        threading.Thread(
+            target=self._share_loop, args=(interval,), name="metrics-share", daemon=True
+        ).start()
+        atexit.register(self.dump)
+
+    def dump(self) -> None:
+        # Written aside and renamed, so readers never see half a file.
+        snapshot = {
+            metric.name: [
+                [list(labels), values] for labels, values in metric.snapshot().items()
+            ]
+            for metric in self._metrics
+        }
+        temporary = f"{self._path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(temporary, self._path)
+
+    def _share_loop(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                self.dump()
+            except Exception:
+                logger.exception("Failed to write metrics to %s", self._path)
+
+    def _merged(self) -> Dict[str, Dict[Tuple[str, ...], List[float]]]:
+        merged = {metric.name: metric.snapshot() for metric in self._metrics}
+        if self._directory is None:
+            return merged
+        # Files of workers that have exited are kept, so that their counts
+        # do not go backwards. Our own file is older than what we hold.
+        for entry in os.scandir(self._directory):
+            if not entry.name.endswith(".json") or entry.path == self._path:
+                continue
+            try:
+                with open(entry.path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, series in snapshot.items():
+                target = merged.get(name)
+                if target is None:
+                    continue
+                for labels, values in series:
+                    current = target.setdefault(tuple(labels), [0] * len(values))
+                    if len(current) == len(values):
+                        target[tuple(labels)] = [a + b for a, b in zip(current, values)]
+        return merged
+
+    def render(self) -> str:
+        merged = self._merged()
+        return (
+            "\n".join(line for m in self._metrics for line in m.render(merged[m.name]))
+            + "\n"
+        )
+
+
+REGISTRY = MetricsRegistry()
+REQUEST_DURATION = REGISTRY.histogram(
+    "focus_arrow_request_duration_seconds",
+    "Time spent answering an HTTP request.",
+    ("endpoint", "status"),
+)
+COMMAND_DURATION = REGISTRY.histogram(
+    "focus_arrow_command_duration_seconds",
+    "Time spent handling a command, including its commit.",
+    ("command",),
+)
+REPOSITORY_DURATION = REGISTRY.histogram(
+    "focus_arrow_repository_duration_seconds",
+    "Time spent in unit of work and repository calls.",
+    ("repository", "method"),
+)
+TEMPLATE_DURATION = REGISTRY.histogram(
+    "focus_arrow_template_render_duration_seconds",
+    "Time spent rendering a template.",
+    ("template",),
+)
+EMAIL_DURATION = REGISTRY.histogram(
+    "focus_arrow_email_send_duration_seconds",
+    "Time spent handing an email over to the SMTP server.",
+)
+
+
+def start_trace() -> Token:
+    return _spans.set([])
+
+
+def finish_trace(token: Token, name: str, duration: float) -> None:
+    spans = _spans.get()
+    _spans.reset(token)
+    trace_logger.info(
+        "%s %.2fms %s",
+        name,
+        duration * 1000,
+        " ".join(f"{span}={elapsed * 1000:.2f}ms" for span, elapsed in spans or ()),
+    )
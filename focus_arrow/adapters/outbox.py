@@ -0,0 +1,188 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from typing import Optional
+import heapq
+import itertools
+import sqlite3
+import threading
+import time
+
+
+@dataclass(frozen=True)
+class OutgoingEmail:
+    to_address: str
+    subject: str
+    content: str
+    attempts: int = 0
+    id: Optional[int] = None
+
+
+class AbstractOutbox(ABC):
+    @abstractmethod
+    def put(self, email: OutgoingEmail) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, timeout: float) -> Optional[OutgoingEmail]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def ack(self, email: OutgoingEmail) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def retry(self, email: OutgoingEmail, delay: float) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def fail(self, email: OutgoingEmail) -> None:
+        raise NotImplementedError
+
+
+class InMemoryOutbox(AbstractOutbox):
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+
+    def put(self, email: OutgoingEmail, delay: float = 0) -> None:
+        with self._condition:
+            heapq.heappush(
+                self._heap, (time.monotonic() + delay, next(self._counter), email)
+            )
+            self._condition.notify()
+
+    def get(self, timeout: float) -> Optional[OutgoingEmail]:
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if self._heap and self._heap[0][0] <= now:
+                    return heapq.heappop(self._heap)[2]
+                if now >= deadline:
+                    return None
+                wait = deadline - now
+                if self._heap:
+                    wait = min(wait, self._heap[0][0] - now)
+                self._condition.wait(wait)
+
+    def ack(self, email: OutgoingEmail) -> None:
+        pass
+
+    def retry(self, email: OutgoingEmail, delay: float) -> None:
+        self.put(replace(email, attempts=email.attempts + 1), delay)
+
+    def fail(self, email: OutgoingEmail) -> None:
+        pass
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._heap)
+
+
+class SqliteOutbox(AbstractOutbox):
+    """
+    Durable outbox stored in a local SQLite table. Messages that were claimed
+    by a worker but never acknowledged become available again after `lease`
+    seconds, so a crash does not lose them.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.5, lease: float = 300):
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                to_address TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                content TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                failed INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        self._conn.execute("""
+            CREATE INDEX IF NOT EXISTS outbox_available_at
+                ON outbox (failed, available_at);
+        """)
+
+    def put(self, email: OutgoingEmail) -> None:
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO outbox (to_address, subject, content, attempts, available_at)
+                        VALUES (?, ?, ?, ?, ?);
+            """,
+                (
+                    email.to_address,
+                    email.subject,
+                    email.content,
+                    email.attempts,
+                    time.time(),
+                ),
+            )
+
+    def get(self, timeout: float) -> Optional[OutgoingEmail]:
+        deadline = time.monotonic() + timeout
+        while True:
+            email = self._claim()
+            if email is not None:
+                return email
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(self.poll_interval, remaining))
+
+    def ack(self, email: OutgoingEmail) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE id = ?;", (email.id,))
+
+    def retry(self, email: OutgoingEmail, delay: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET attempts = ?, available_at = ? WHERE id = ?;",
+                (email.attempts + 1, time.time() + delay, email.id),
+            )
+
+    def fail(self, email: OutgoingEmail) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET failed = 1 WHERE id = ?;", (email.id,)
+            )
+
+    def _claim(self) -> Optional[OutgoingEmail]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE;")
+            try:
+                row = self._conn.execute(
+                    """
+                    SELECT id, to_address, subject, content, attempts FROM outbox
+                        WHERE failed = 0 AND available_at <= ?
+                        ORDER BY available_at LIMIT 1;
+                """,
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE outbox SET available_at = ? WHERE id = ?;",
+                        (now + self.lease, row[0]),
+                    )
+                self._conn.execute("COMMIT;")
+            except BaseException:
+                self._conn.execute("ROLLBACK;")
+                raise
+        if row is None:
+            return None
+        return OutgoingEmail(
+            id=row[0],
+            to_address=row[1],
+            subject=row[2],
+            content=row[3],
+            attempts=row[4],
+        )
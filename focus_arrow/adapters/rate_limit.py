@@ -0,0 +1,160 @@
+from abc import ABC, abstractmethod
+from typing import Iterator, NamedTuple, Optional, Tuple
+from focus_arrow.adapters.cache import LruTtlCache
+import psycopg
+from psycopg_pool import ConnectionPool
+import threading
+import time
+
+
+class AbstractRateLimiter(ABC):
+    """
+    Token bucket per key: every key starts with `capacity` tokens, each
+    request takes one and tokens come back at `rate` per second.
+    """
+
+    # Whether `acquire` does I/O, and so has to be kept off an event loop.
+    blocking = False
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+
+    @property
+    def retry_after(self) -> float:
+        return 1 / self.rate
+
+    @abstractmethod
+    def acquire(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def purge_idle(self, prefix: str, limit: int) -> int:
+        # Deletes up to `limit` buckets under `prefix` that have been idle long
+        # enough to be full again, returning how many. Buckets kept in memory
+        # expire on their own.
+        return 0
+
+
+class InMemoryRateLimiter(AbstractRateLimiter):
+    # A bucket that has not been touched for capacity / rate seconds is full
+    # again, so it can expire from the cache instead of being kept around.
+    def __init__(self, capacity: float, rate: float, maxsize: int = 100000):
+        super().__init__(capacity, rate)
+        self._buckets = LruTtlCache(maxsize, capacity / rate)
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                return False
+            self._buckets.set(key, (tokens - 1, now))
+            return True
+
+
+class PostgreRateLimiter(AbstractRateLimiter):
+    # Refilling and taking a token happen in one UPSERT, so concurrent workers
+    # sharing the database never hand out more tokens than the bucket has.
+    blocking = True
+
+    def __init__(
+        self,
+        conn_str: str,
+        pool: Optional[ConnectionPool],
+        capacity: float,
+        rate: float,
+    ):
+        super().__init__(capacity, rate)
+        self.conn_str = conn_str
+        self.pool = pool
+
+    def _connect(self):
+        if self.pool is not None:
+            return self.pool.connection()
+        return psycopg.connect(self.conn_str)
+
+    def acquire(self, key: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                INSERT INTO rate_limit_buckets AS b (key, tokens, updated)
+                VALUES (%(key)s, %(capacity)s - 1, now())
+                ON CONFLICT (key) DO UPDATE SET
+                    tokens = LEAST(
+                        %(capacity)s,
+                        b.tokens + EXTRACT(EPOCH FROM now() - b.updated)
+                            * %(rate)s
+                    ) - 1,
+                    updated = now()
+                WHERE LEAST(
+                    %(capacity)s,
+                    b.tokens + EXTRACT(EPOCH FROM now() - b.updated)
+                        * %(rate)s
+                ) >= 1
+                RETURNING 1
+                """,
+                {"key": key, "capacity": self.capacity, "rate": self.rate},
+            ).fetchone()
+        return row is not None
+
+    def purge_idle(self, prefix: str, limit: int) -> int:
+        with self._connect() as conn:
+            return conn.execute(
+                """
+                DELETE FROM rate_limit_buckets WHERE key IN (
+                    SELECT key FROM rate_limit_buckets
+                        WHERE updated < now() - make_interval(secs => %(idle)s)
+                            AND key LIKE %(prefix)s
+                        LIMIT %(limit)s
+                );
+                """,
+                {
+                    "idle": self.capacity / self.rate,
+                    "prefix": prefix + "%",
+                    "limit": limit,
+                },
+            ).rowcount
+
+
+class RateLimits(NamedTuple):
+    per_ip: Optional[AbstractRateLimiter] = None
+    per_address: Optional[AbstractRateLimiter] = None
+
+    @property
+    def blocking(self) -> bool:
+        return any(limiter.blocking for limiter in self if limiter is not None)
+
+    def check(
+        self, scope: str, ip: Optional[str], address: Optional[str]
+    ) -> Optional[float]:
+        """
+        Takes a token for the email address and the client IP from the
+        buckets of `scope`, returning how many seconds to wait if either of
+        them is exhausted. Each scope has its own buckets, so running out on
+        one endpoint leaves the others usable. The address goes first, so a
+        request turned away for its address costs the IP nothing.
+        """
+        for limiter, kind, key in self._limiters(address, ip):
+            if key and not limiter.acquire(f"{kind}:{scope}:{key}"):
+                return limiter.retry_after
+        return None
+
+    def purge_idle(self, chunk_size: int = 1000) -> int:
+        purged = 0
+        for limiter, kind, _ in self._limiters():
+            while True:
+                deleted = limiter.purge_idle(f"{kind}:", chunk_size)
+                purged += deleted
+                if deleted < chunk_size:
+                    break
+        return purged
+
+    def _limiters(
+        self, address: Optional[str] = None, ip: Optional[str] = None
+    ) -> Iterator[Tuple[AbstractRateLimiter, str, Optional[str]]]:
+        checks = ((self.per_address, "address", address), (self.per_ip, "ip", ip))
+        for limiter, kind, key in checks:
+            if limiter is not None:
+                yield limiter, kind, key
@@ -1,5 +1,15 @@
 from abc import ABC, abstractmethod
-from jinja2 import Environment, PackageLoader, select_autoescape
+from typing import Dict, List, Optional, Union
+from jinja2 import (
+    BaseLoader,
+    Environment,
+    FileSystemBytecodeCache,
+    Template,
+    nodes,
+    select_autoescape,
+)
+from markupsafe import escape
+from focus_arrow.adapters.metrics import TEMPLATE_DURATION
 
 
 class AbstractTemplateRenderer(ABC):
@@ -8,10 +18,93 @@ class AbstractTemplateRenderer(ABC):
         raise NotImplementedError
 
 
+class TemplateSkeleton:
+    """
+    A template made only of literal text and `{{ name }}` substitutions, kept
+    as a list of parts so that rendering it is a string join.
+    """
+
+    def __init__(self, parts: List[Union[str, nodes.Name]], autoescape: bool):
+        self.parts = [part if isinstance(part, str) else part.name for part in parts]
+        self.is_variable = [not isinstance(part, str) for part in parts]
+        self.autoescape = autoescape
+
+    @classmethod
+    def from_ast(
+        cls, ast: nodes.Template, autoescape: bool
+    ) -> Optional["TemplateSkeleton"]:
+        parts = []
+        for node in ast.body:
+            if not isinstance(node, nodes.Output):
+                return None
+            for child in node.nodes:
+                if isinstance(child, nodes.TemplateData):
+                    parts.append(child.data)
+                elif isinstance(child, nodes.Name) and child.ctx == "load":
+                    parts.append(child)
+                else:
+                    return None
+        return cls(parts, autoescape)
+
+    def render(self, kwargs: Dict) -> str:
+        rendered = []
+        for part, is_variable in zip(self.parts, self.is_variable):
+            if not is_variable:
+                rendered.append(part)
+            elif part in kwargs:
+                value = kwargs[part]
+                rendered.append(escape(value) if self.autoescape else str(value))
+        return "".join(rendered)
+
+
 class JinjaTemplateRenderer(AbstractTemplateRenderer):
-    def __init__(self, loader):
-        self.env = Environment(loader=loader, autoescape=select_autoescape())
+    def __init__(
+        self,
+        loader: BaseLoader,
+        bytecode_cache_dir: Optional[str] = None,
+        precompile: bool = True,
+    ):
+        # Templates ship with the package and never change while running, so
+        # there is no need to stat them on every render.
+        self.env = Environment(
+            loader=loader,
+            autoescape=select_autoescape(),
+            auto_reload=False,
+            cache_size=-1,
+            bytecode_cache=(
+                FileSystemBytecodeCache(bytecode_cache_dir)
+                if bytecode_cache_dir
+                else None
+            ),
+        )
+        self._templates: Dict[str, Template] = {}
+        self._skeletons: Dict[str, Optional[TemplateSkeleton]] = {}
+        self._static: Dict[str, str] = {}
+        if precompile:
+            for template_name in self.env.list_templates():
+                self._load(template_name)
 
     def render(self, template_name: str, **kwargs) -> str:
+        with TEMPLATE_DURATION.time(template_name):
+            if template_name not in self._templates:
+                self._load(template_name)
+            if template_name in self._static:
+                return self._static[template_name]
+            skeleton = self._skeletons[template_name]
+            if skeleton is not None:
+                return skeleton.render(kwargs)
+            return self._templates[template_name].render(**kwargs)
+
+    def _load(self, template_name: str) -> None:
         template = self.env.get_template(template_name)
-        return template.render(**kwargs)
+        source = self.env.loader.get_source(self.env, template_name)[0]
+        autoescape = self.env.autoescape
+        if callable(autoescape):
+            autoescape = autoescape(template_name)
+        skeleton = TemplateSkeleton.from_ast(
+            self.env.parse(source, template_name), autoescape
+        )
+        if skeleton is not None and not any(skeleton.is_variable):
+            self._static[template_name] = skeleton.render({})
+        self._skeletons[template_name] = skeleton
+        self._templates[template_name] = template
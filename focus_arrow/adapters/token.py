@@ -1,6 +1,12 @@
 from abc import ABC, abstractmethod
+from collections import deque
 from string import ascii_lowercase, ascii_uppercase, digits
+from threading import Event, Thread
+from typing import List
 import random
+import secrets
+
+DEFAULT_ALPHABET = ascii_lowercase + ascii_uppercase + digits
 
 
 class AbstractTokenGenerator(ABC):
@@ -11,9 +17,74 @@ class AbstractTokenGenerator(ABC):
 
 class RandomTokenGenerator(AbstractTokenGenerator):
     def generate(self) -> str:
-        return "".join(
-            [
-                random.choice(ascii_lowercase + ascii_uppercase + digits)
-                for _ in range(8)
-            ]
-        )
+        return "".join([random.choice(DEFAULT_ALPHABET) for _ in range(8)])
+
+
+class SecureTokenGenerator(AbstractTokenGenerator):
+    # Random bytes are mapped onto the alphabet with a translation table, and
+    # bytes that would make some characters more likely than others are
+    # dropped, so every token is drawn uniformly from the OS CSPRNG.
+    def __init__(self, length: int = 8, alphabet: str = DEFAULT_ALPHABET):
+        if length < 1:
+            raise ValueError("Token length must be positive")
+        if not alphabet or len(set(alphabet)) != len(alphabet):
+            raise ValueError("Token alphabet must be non-empty and without repeats")
+        if not alphabet.isascii() or len(alphabet) > 256:
+            raise ValueError("Token alphabet must have at most 256 ASCII characters")
+        self.length = length
+        encoded = alphabet.encode("ascii")
+        limit = 256 - 256 % len(encoded)
+        self._table = bytes(encoded[byte % len(encoded)] for byte in range(256))
+        self._rejected = bytes(range(limit, 256))
+
+    def generate(self) -> str:
+        return self.generate_many(1)[0]
+
+    def generate_many(self, count: int) -> List[str]:
+        needed = count * self.length
+        drawn = b""
+        while len(drawn) < needed:
+            missing = needed - len(drawn)
+            drawn += secrets.token_bytes(missing + missing // 4 + 8).translate(
+                self._table, self._rejected
+            )
+        text = drawn[:needed].decode("ascii")
+        return [text[i : i + self.length] for i in range(0, needed, self.length)]
+
+
+class BufferedTokenGenerator(AbstractTokenGenerator):
+    # Tokens are handed out from a buffer that a background thread tops up
+    # once it falls under half its size. An empty buffer never blocks, the
+    # token is generated inline instead.
+    def __init__(self, generator: SecureTokenGenerator, size: int = 256):
+        self._generator = generator
+        self._size = size
+        self._buffer = deque(generator.generate_many(size))
+        self._refill = Event()
+        self._closed = False
+        self._thread = Thread(target=self._run, name="token-buffer", daemon=True)
+        self._thread.start()
+
+    def generate(self) -> str:
+        try:
+            token = self._buffer.popleft()
+        except IndexError:
+            token = self._generator.generate()
+        if len(self._buffer) < self._size // 2:
+            self._refill.set()
+        return token
+
+    def _run(self) -> None:
+        while True:
+            self._refill.wait()
+            self._refill.clear()
+            if self._closed:
+                return
+            missing = self._size - len(self._buffer)
+            if missing > 0:
+                self._buffer.extend(self._generator.generate_many(missing))
+
+    def close(self) -> None:
+        self._closed = True
+        self._refill.set()
+        self._thread.join()
@@ -1,7 +1,11 @@
-from flask import Flask, render_template, request
+from hashlib import sha256
+from typing import Optional, Tuple
+from flask import Flask, g, make_response, render_template, request
 from flask_cors import CORS
 from focus_arrow import bootstrap
+from focus_arrow.services.message_bus import MessageBus
 from focus_arrow.domain.commands import (
+    Command,
     VerifyEmail,
     SendTokenToEmail,
     SendVerificationEmail,
@@ -12,12 +16,150 @@ from focus_arrow.domain.model import (
     ConfirmationEmailRateExceeded,
     ConfirmationLinkNotValid,
     EmailNotVerified,
+    normalize_address,
 )
+from focus_arrow.adapters.cache import LruTtlCache
+from focus_arrow.adapters.metrics import (
+    REGISTRY,
+    REQUEST_DURATION,
+    finish_trace,
+    start_trace,
+)
+from focus_arrow.adapters.rate_limit import RateLimits
+from math import ceil
+from os import getenv
+import time
+
+# Only lookups can be batched: commands that send email would let a single
+# unauthenticated request send as many as the batch holds.
+BATCH_COMMANDS = {"CheckEmailConfirmed": CheckEmailConfirmed}
+
+RATE_LIMITED_ENDPOINTS = {
+    "email_token",
+    "check_email_confirmed",
+    "email_verification",
+    "confirm_email",
+    "uninstall",
+    "batch",
+}
+# Endpoints that send email are limited per address as well. check-email is
+# polled by the extension, so it only counts against the client's IP.
+ADDRESS_LIMITED_ENDPOINTS = {"email_token", "email_verification", "uninstall"}
+
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def rate_limited(retry_after: float):
+    return (
+        {"error": "Too many requests. Try again later."},
+        429,
+        {"Retry-After": str(ceil(retry_after))},
+    )
+
+
+def client_ip(
+    remote_addr: Optional[str], forwarded_for: Optional[str], trusted_proxies: int
+) -> Optional[str]:
+    # Every proxy appends the address it got the request from, so behind
+    # `trusted_proxies` of them the client is that many entries from the end.
+    # Anything further left was sent by the client and cannot be trusted.
+    if trusted_proxies <= 0 or not forwarded_for:
+        return remote_addr
+    hops = [hop.strip() for hop in forwarded_for.split(",")]
+    if len(hops) < trusted_proxies:
+        return remote_addr
+    return hops[-trusted_proxies]
+
+
+def rate_limit_key(req, trusted_proxies: int) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Returns the client IP and, for endpoints limited per address, the
+    normalized address to charge a Flask or Quart request to.
+    """
+    ip = client_ip(req.remote_addr, req.headers.get("X-Forwarded-For"), trusted_proxies)
+    address = req.args.get("email")
+    if req.endpoint not in ADDRESS_LIMITED_ENDPOINTS or not address:
+        return ip, None
+    return ip, normalize_address(address)
+
+
+def parse_batch_command(item) -> Command:
+    if not isinstance(item, dict) or item.get("type") not in BATCH_COMMANDS:
+        raise ValueError("Unknown command type")
+    arguments = {key: value for key, value in item.items() if key != "type"}
+    try:
+        return BATCH_COMMANDS[item["type"]](**arguments)
+    except (TypeError, AttributeError):
+        raise ValueError("Invalid command arguments")
+
+
+class BlockScreenCache:
+    # Block screens only depend on the screen name and the message, so their
+    # rendered bodies and ETags are kept in a bounded LRU. Overly long messages
+    # are rendered but not cached, so they cannot push out the common ones.
+    def __init__(self, maxsize: int = 1024, max_message_length: int = 512):
+        self.max_message_length = max_message_length
+        self._cache = LruTtlCache(maxsize)
 
+    def get(self, screen: str, message: str) -> Optional[Tuple[str, str]]:
+        return self._cache.get((screen, message))
 
-def create_app() -> Flask:
+    def put(self, screen: str, message: str, body: str) -> Tuple[str, str]:
+        rendered = (body, sha256(body.encode()).hexdigest())
+        if len(message) <= self.max_message_length:
+            self._cache.set((screen, message), rendered)
+        return rendered
+
+
+def create_app(
+    bus: Optional[MessageBus] = None, rate_limits: Optional[RateLimits] = None
+) -> Flask:
     app = Flask(__name__)
     CORS(app)
+    if bus is None:
+        bus = bootstrap.bootstrap()
+    if rate_limits is None:
+        rate_limits = bootstrap.build_rate_limits()
+    batch_max_size = int(getenv("BATCH_MAX_SIZE", "1000"))
+    block_screen_cache = BlockScreenCache(
+        int(getenv("BLOCK_SCREEN_CACHE_SIZE", "1024"))
+    )
+    block_screen_max_age = int(getenv("BLOCK_SCREEN_MAX_AGE", "86400"))
+    trace_requests = getenv("TRACE_REQUESTS", "0") == "1"
+    trusted_proxies = int(getenv("TRUSTED_PROXY_COUNT", "0"))
+    metrics_dir = getenv("METRICS_DIR")
+    if metrics_dir:
+        REGISTRY.share(metrics_dir, float(getenv("METRICS_SHARE_INTERVAL", "5")))
+
+    @app.before_request
+    def start_timer():
+        g.started = time.perf_counter()
+        g.trace = start_trace() if trace_requests else None
+
+    @app.after_request
+    def record_duration(response):
+        duration = time.perf_counter() - g.started
+        endpoint = request.endpoint or "unknown"
+        REQUEST_DURATION.observe(duration, endpoint, str(response.status_code))
+        if g.trace is not None:
+            finish_trace(g.trace, f"{request.method} {request.path}", duration)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return REGISTRY.render(), 200, {"Content-Type": METRICS_CONTENT_TYPE}
+
+    @app.before_request
+    def enforce_rate_limits():
+        if request.endpoint not in RATE_LIMITED_ENDPOINTS:
+            return None
+        retry_after = rate_limits.check(
+            request.endpoint, *rate_limit_key(request, trusted_proxies)
+        )
+        if retry_after is not None:
+            return rate_limited(retry_after)
+        return None
 
     @app.route("/block-screens/<block_screen_name>")
     def render_block_screen(block_screen_name):
@@ -25,16 +167,27 @@ def create_app() -> Flask:
         message = request.args.get("message", "You're not allowed to enter this site")
         if block_screen_name not in block_screens:
             block_screen_name = "default"
-        return render_template(
-            f"block-screens/{block_screen_name}.html", message=message
-        )
+        rendered = block_screen_cache.get(block_screen_name, message)
+        if rendered is None:
+            rendered = block_screen_cache.put(
+                block_screen_name,
+                message,
+                render_template(
+                    f"block-screens/{block_screen_name}.html", message=message
+                ),
+            )
+        body, etag = rendered
+        response = make_response(body)
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = block_screen_max_age
+        return response.make_conditional(request)
 
     @app.route("/send-token")
     def email_token():
         to_address = request.args.get("email")
         if not to_address:
             return {"error": "No email address included"}, 400
-        bus = bootstrap.bootstrap()
         try:
             result = bus.handle_message(SendTokenToEmail(to_address))
             return {"result": result}, 201, {"Access-Control-Allow-Origin": "*"}
@@ -48,7 +201,6 @@ def create_app() -> Flask:
         to_address = request.args.get("email")
         if not to_address:
             return {"error": "No email address included"}, 400
-        bus = bootstrap.bootstrap()
         result = bus.handle_message(CheckEmailConfirmed(to_address))
         return {"confirmed": result}, 200
 
@@ -57,7 +209,6 @@ def create_app() -> Flask:
         to_address = request.args.get("email")
         if not to_address:
             return {"error": "No email address included"}, 400
-        bus = bootstrap.bootstrap()
         try:
             bus.handle_message(SendVerificationEmail(to_address))
             return "OK", 201
@@ -71,7 +222,6 @@ def create_app() -> Flask:
         token = request.args.get("token")
         if not token:
             return {"error": "No token included"}, 400
-        bus = bootstrap.bootstrap()
         try:
             bus.handle_message(VerifyEmail(token))
             return "OK", 201
@@ -83,10 +233,31 @@ def create_app() -> Flask:
         email = request.args.get("email")
         if email:
             try:
-                bus = bootstrap.bootstrap()
                 bus.handle_message(SendUninstallationEmail(email))
             except EmailNotVerified:
                 return "Email is not verified", 403
         return "OK", 201
 
+    @app.route("/batch", methods=["POST"])
+    def batch():
+        body = request.get_json(silent=True)
+        items = body.get("commands") if isinstance(body, dict) else None
+        if not isinstance(items, list):
+            return {"error": "No commands included"}, 400
+        if len(items) > batch_max_size:
+            return {"error": f"At most {batch_max_size} commands per batch"}, 413
+        commands, results = [], [None] * len(items)
+        for index, item in enumerate(items):
+            try:
+                commands.append((index, parse_batch_command(item)))
+            except ValueError as e:
+                results[index] = {"error": str(e)}
+        outcomes = bus.handle_many([command for _, command in commands])
+        for (index, _), outcome in zip(commands, outcomes):
+            if outcome.error is None:
+                results[index] = {"result": outcome.result}
+            else:
+                results[index] = {"error": type(outcome.error).__name__}
+        return {"results": results}, 200
+
     return app
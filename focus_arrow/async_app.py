@@ -0,0 +1,173 @@
+from typing import Optional
+from os import getenv
+import time
+from quart import Quart, g, make_response, render_template, request
+from quart.utils import run_sync
+from focus_arrow.adapters.metrics import (
+    REGISTRY,
+    REQUEST_DURATION,
+    finish_trace,
+    start_trace,
+)
+from focus_arrow.adapters.rate_limit import RateLimits
+from focus_arrow.app import (
+    BlockScreenCache,
+    METRICS_CONTENT_TYPE,
+    RATE_LIMITED_ENDPOINTS,
+    rate_limit_key,
+    rate_limited,
+)
+from focus_arrow.async_bootstrap import bootstrap_async
+from focus_arrow.bootstrap import build_rate_limits
+from focus_arrow.services.async_message_bus import AsyncMessageBus
+from focus_arrow.domain.commands import (
+    VerifyEmail,
+    SendTokenToEmail,
+    SendVerificationEmail,
+    CheckEmailConfirmed,
+    SendUninstallationEmail,
+)
+from focus_arrow.domain.model import (
+    ConfirmationEmailRateExceeded,
+    ConfirmationLinkNotValid,
+    EmailNotVerified,
+)
+
+
+def create_async_app(
+    bus: Optional[AsyncMessageBus] = None, rate_limits: Optional[RateLimits] = None
+) -> Quart:
+    app = Quart(__name__)
+    if bus is None:
+        bus = bootstrap_async()
+    if rate_limits is None:
+        rate_limits = build_rate_limits()
+    block_screen_cache = BlockScreenCache(
+        int(getenv("BLOCK_SCREEN_CACHE_SIZE", "1024"))
+    )
+    block_screen_max_age = int(getenv("BLOCK_SCREEN_MAX_AGE", "86400"))
+    trace_requests = getenv("TRACE_REQUESTS", "0") == "1"
+    trusted_proxies = int(getenv("TRUSTED_PROXY_COUNT", "0"))
+    metrics_dir = getenv("METRICS_DIR")
+    if metrics_dir:
+        REGISTRY.share(metrics_dir, float(getenv("METRICS_SHARE_INTERVAL", "5")))
+
+    async def check_rate_limits(scope, ip, address):
+        # The shared limiter does a database round trip, which must not block
+        # the event loop; the in-memory one is cheaper to call directly.
+        if rate_limits.blocking:
+            return await run_sync(rate_limits.check)(scope, ip, address)
+        return rate_limits.check(scope, ip, address)
+
+    @app.before_request
+    async def start_timer():
+        g.started = time.perf_counter()
+        g.trace = start_trace() if trace_requests else None
+
+    @app.after_request
+    async def allow_any_origin(response):
+        response.headers.setdefault("Access-Control-Allow-Origin", "*")
+        return response
+
+    @app.after_request
+    async def record_duration(response):
+        duration = time.perf_counter() - g.started
+        endpoint = request.endpoint or "unknown"
+        REQUEST_DURATION.observe(duration, endpoint, str(response.status_code))
+        if g.trace is not None:
+            finish_trace(g.trace, f"{request.method} {request.path}", duration)
+        return response
+
+    @app.route("/metrics")
+    async def metrics():
+        return REGISTRY.render(), 200, {"Content-Type": METRICS_CONTENT_TYPE}
+
+    @app.before_request
+    async def enforce_rate_limits():
+        if request.endpoint not in RATE_LIMITED_ENDPOINTS:
+            return None
+        retry_after = await check_rate_limits(
+            request.endpoint, *rate_limit_key(request, trusted_proxies)
+        )
+        if retry_after is not None:
+            return rate_limited(retry_after)
+        return None
+
+    @app.route("/block-screens/<block_screen_name>")
+    async def render_block_screen(block_screen_name):
+        block_screens = {"default", "minimalist"}
+        message = request.args.get("message", "You're not allowed to enter this site")
+        if block_screen_name not in block_screens:
+            block_screen_name = "default"
+        rendered = block_screen_cache.get(block_screen_name, message)
+        if rendered is None:
+            rendered = block_screen_cache.put(
+                block_screen_name,
+                message,
+                await render_template(
+                    f"block-screens/{block_screen_name}.html", message=message
+                ),
+            )
+        body, etag = rendered
+        response = await make_response(body)
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = block_screen_max_age
+        return await response.make_conditional(request)
+
+    @app.route("/send-token")
+    async def email_token():
+        to_address = request.args.get("email")
+        if not to_address:
+            return {"error": "No email address included"}, 400
+        try:
+            result = await bus.handle_message(SendTokenToEmail(to_address))
+            return {"result": result}, 201
+        except EmailNotVerified:
+            return {
+                "error": "The given email has to be verified before being used."
+            }, 403
+
+    @app.route("/check-email")
+    async def check_email_confirmed():
+        to_address = request.args.get("email")
+        if not to_address:
+            return {"error": "No email address included"}, 400
+        result = await bus.handle_message(CheckEmailConfirmed(to_address))
+        return {"confirmed": result}, 200
+
+    @app.route("/send-verification")
+    async def email_verification():
+        to_address = request.args.get("email")
+        if not to_address:
+            return {"error": "No email address included"}, 400
+        try:
+            await bus.handle_message(SendVerificationEmail(to_address))
+            return "OK", 201
+        except ConfirmationEmailRateExceeded:
+            return {
+                "error": "Too many confirmation emails have been sent to this address. Try again later."
+            }, 429
+
+    @app.route("/confirm-email")
+    async def confirm_email():
+        token = request.args.get("token")
+        if not token:
+            return {"error": "No token included"}, 400
+        try:
+            await bus.handle_message(VerifyEmail(token))
+            return "OK", 201
+        except ConfirmationLinkNotValid:
+            return {"error": "Confirmation token does not exist or has expired."}, 404
+
+    @app.route("/uninstall")
+    async def uninstall():
+        email = request.args.get("email")
+        if email:
+            try:
+                await bus.handle_message(SendUninstallationEmail(email))
+            except EmailNotVerified:
+                return "Email is not verified", 403
+        return "OK", 201
+
+    return app
@@ -0,0 +1,117 @@
+from concurrent.futures import Executor
+from functools import partial
+from os import getenv
+from typing import Callable, Optional
+from jinja2 import PackageLoader
+from pymongo import AsyncMongoClient
+from focus_arrow.adapters.async_email import AbstractAsyncEmailClient, AsyncGmailClient
+from focus_arrow.adapters.email import add_static_body
+from focus_arrow.adapters.templates import (
+    AbstractTemplateRenderer,
+    JinjaTemplateRenderer,
+)
+from focus_arrow.adapters.token import AbstractTokenGenerator
+from focus_arrow.bootstrap import (
+    EVENT_HANDLERS,
+    build_event_executor,
+    build_token_generator,
+    mongo_client_settings,
+    mongo_uri,
+    postgre_pool_settings,
+)
+from focus_arrow.domain.commands import (
+    VerifyEmail,
+    SendTokenToEmail,
+    SendVerificationEmail,
+    CheckEmailConfirmed,
+    SendUninstallationEmail,
+)
+from focus_arrow.services.async_handlers import (
+    send_confirmation_email,
+    verify_email,
+    send_token_to_email,
+    check_email_confirmed,
+    send_uninstallation_email,
+)
+from focus_arrow.services.handlers import UNINSTALLATION_EMAIL
+from focus_arrow.services.async_message_bus import AsyncMessageBus
+from focus_arrow.services.async_uow import (
+    AbstractAsyncUnitOfWork,
+    AsyncMongoUnitOfWork,
+    AsyncPostgreUnitOfWork,
+    create_async_postgre_pool,
+)
+from focus_arrow.services.uow import create_mongo_client
+
+
+def _build_async_postgre_uow_factory() -> Callable[[], AbstractAsyncUnitOfWork]:
+    conn_str = getenv("SUPABASE_CONN_STR")
+    pool_settings = postgre_pool_settings()
+    if pool_settings is None:
+        return partial(AsyncPostgreUnitOfWork, conn_str)
+    pool = create_async_postgre_pool(conn_str, **pool_settings)
+    return partial(AsyncPostgreUnitOfWork, conn_str, pool)
+
+
+def _build_async_mongo_uow_factory() -> Callable[[], AbstractAsyncUnitOfWork]:
+    client = create_mongo_client(
+        mongo_uri(), client_class=AsyncMongoClient, **mongo_client_settings()
+    )
+    return partial(AsyncMongoUnitOfWork, client)
+
+
+def _build_async_uow_factory() -> Callable[[], AbstractAsyncUnitOfWork]:
+    # Reads the same DATABASE_BACKEND as bootstrap(). The async stack only
+    # has Postgres and Mongo units of work, and none of the in-process
+    # wrappers: the verified email cache, the Bloom filter and replica
+    # routing are only available through bootstrap().
+    backend = getenv("DATABASE_BACKEND", "postgres")
+    if backend == "postgres":
+        return _build_async_postgre_uow_factory()
+    if backend == "mongo":
+        return _build_async_mongo_uow_factory()
+    raise ValueError(f"DATABASE_BACKEND {backend} is not supported by the async app")
+
+
+def bootstrap_async(
+    uow_factory: Optional[Callable[[], AbstractAsyncUnitOfWork]] = None,
+    email_client: Optional[AbstractAsyncEmailClient] = None,
+    pin_generator: Optional[AbstractTokenGenerator] = None,
+    template_renderer: Optional[AbstractTemplateRenderer] = None,
+    event_executor: Optional[Executor] = None,
+) -> AsyncMessageBus:
+    if uow_factory is None:
+        uow_factory = _build_async_uow_factory()
+    if email_client is None:
+        email_client = AsyncGmailClient(
+            getenv("GMAIL_USERNAME"),
+            getenv("GMAIL_PASSWORD"),
+            size=max(int(getenv("SMTP_POOL_SIZE", "2")), 1),
+        )
+    if pin_generator is None:
+        pin_generator = build_token_generator()
+    if template_renderer is None:
+        template_renderer = JinjaTemplateRenderer(
+            PackageLoader("focus_arrow"), getenv("TEMPLATE_BYTECODE_CACHE_DIR")
+        )
+    add_static_body(template_renderer.render(UNINSTALLATION_EMAIL.template))
+    if event_executor is None:
+        event_executor = build_event_executor()
+
+    command_handlers = {
+        VerifyEmail: verify_email,
+        SendTokenToEmail: partial(
+            send_token_to_email, email_client, pin_generator, template_renderer
+        ),
+        SendVerificationEmail: partial(
+            send_confirmation_email, email_client, pin_generator, template_renderer
+        ),
+        CheckEmailConfirmed: check_email_confirmed,
+        SendUninstallationEmail: partial(
+            send_uninstallation_email, email_client, template_renderer
+        ),
+    }
+
+    return AsyncMessageBus(
+        uow_factory, command_handlers, EVENT_HANDLERS, event_executor
+    )
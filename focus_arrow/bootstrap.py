@@ -1,7 +1,30 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
 from jinja2 import PackageLoader
-from focus_arrow.adapters.email import GmailClient
-from focus_arrow.adapters.templates import JinjaTemplateRenderer
-from focus_arrow.adapters.token import RandomTokenGenerator
+from focus_arrow.adapters.email import (
+    AbstractEmailClient,
+    GmailClient,
+    PooledGmailClient,
+    QueuedEmailClient,
+    add_static_body,
+)
+from focus_arrow.adapters.rate_limit import (
+    AbstractRateLimiter,
+    InMemoryRateLimiter,
+    PostgreRateLimiter,
+    RateLimits,
+)
+from focus_arrow.adapters.outbox import AbstractOutbox, InMemoryOutbox, SqliteOutbox
+from focus_arrow.adapters.templates import (
+    AbstractTemplateRenderer,
+    JinjaTemplateRenderer,
+)
+from focus_arrow.adapters.token import (
+    DEFAULT_ALPHABET,
+    AbstractTokenGenerator,
+    BufferedTokenGenerator,
+    SecureTokenGenerator,
+)
 from focus_arrow.services.message_bus import MessageBus
 from focus_arrow.domain.commands import (
     VerifyEmail,
@@ -10,24 +33,338 @@ from focus_arrow.domain.commands import (
     CheckEmailConfirmed,
     SendUninstallationEmail,
 )
+from focus_arrow.domain.events import (
+    EmailVerified,
+    TokenSent,
+    UninstallationEmailSent,
+    VerificationEmailSent,
+)
 from focus_arrow.services.handlers import (
     send_confirmation_email,
     verify_email,
     send_token_to_email,
     check_email_confirmed,
+    check_emails_confirmed,
     send_uninstallation_email,
+    log_event,
+    UNINSTALLATION_EMAIL,
 )
 from functools import partial
-from focus_arrow.services.uow import PostgreUnitOfWork
+from focus_arrow.adapters.bloom import RefreshableBloomFilter
+from focus_arrow.adapters.cache import LruTtlCache
+from focus_arrow.services.uow import (
+    AbstractUnitOfWork,
+    BloomFilteredUnitOfWork,
+    CachedUnitOfWork,
+    InMemoryUnitOfWork,
+    InstrumentedUnitOfWork,
+    MongoUnitOfWork,
+    PostgreUnitOfWork,
+    Replica,
+    ReplicaSet,
+    RoutingUnitOfWork,
+    SqliteConnections,
+    SqliteUnitOfWork,
+    connect_sqlite,
+    create_mongo_client,
+    create_postgre_pool,
+    ping_postgre,
+    ping_postgre_pool,
+)
+from focus_arrow.migrations import sqlite as sqlite_migrations
+from focus_arrow.services.repositories import InMemoryStore
+from focus_arrow.services.retention import RetentionWorker, purge_expired_history
 from os import getenv
 
 
-def bootstrap() -> MessageBus:
+def postgre_pool_settings() -> Optional[Dict[str, Any]]:
+    max_size = int(getenv("POSTGRES_POOL_MAX_SIZE", "5"))
+    if max_size <= 0:
+        return None
+    return {
+        "min_size": min(int(getenv("POSTGRES_POOL_MIN_SIZE", "1")), max_size),
+        "max_size": max_size,
+        "max_lifetime": float(getenv("POSTGRES_POOL_MAX_LIFETIME", "1800")),
+        "max_idle": float(getenv("POSTGRES_POOL_MAX_IDLE", "300")),
+    }
+
+
+def _build_postgre_uow_factory() -> Callable[[], AbstractUnitOfWork]:
     conn_str = getenv("SUPABASE_CONN_STR")
-    uow = PostgreUnitOfWork(conn_str)
-    email_client = GmailClient(getenv("GMAIL_USERNAME"), getenv("GMAIL_PASSWORD"))
-    pin_generator = RandomTokenGenerator()
-    template_renderer = JinjaTemplateRenderer(PackageLoader("focus_arrow"))
+    uow_factory = _build_postgre_connection_factory(conn_str)
+    replica_conn_strs = [
+        replica.strip()
+        for replica in getenv("POSTGRES_REPLICA_CONN_STRS", "").split(",")
+        if replica.strip()
+    ]
+    if not replica_conn_strs:
+        return uow_factory
+    pool_settings = postgre_pool_settings()
+    replicas = []
+    for index, replica_conn_str in enumerate(replica_conn_strs):
+        if pool_settings is None:
+            replica_factory = partial(PostgreUnitOfWork, replica_conn_str)
+            ping = partial(ping_postgre, replica_conn_str)
+        else:
+            pool = create_postgre_pool(replica_conn_str, **pool_settings)
+            replica_factory = partial(PostgreUnitOfWork, replica_conn_str, pool)
+            ping = partial(ping_postgre_pool, pool)
+        replicas.append(Replica(f"replica-{index}", replica_factory, ping))
+    replica_set = ReplicaSet(replicas).start_checking(
+        float(getenv("POSTGRES_REPLICA_CHECK_INTERVAL", "5"))
+    )
+    recent_writes = LruTtlCache(
+        100000, float(getenv("POSTGRES_REPLICA_STICKY_SECONDS", "5"))
+    )
+    return partial(RoutingUnitOfWork, uow_factory, replica_set, recent_writes)
+
+
+def _build_postgre_connection_factory(
+    conn_str: str,
+) -> Callable[[], AbstractUnitOfWork]:
+    pool_settings = postgre_pool_settings()
+    if pool_settings is None:
+        return partial(PostgreUnitOfWork, conn_str)
+    pool = create_postgre_pool(conn_str, **pool_settings)
+    return partial(PostgreUnitOfWork, conn_str, pool)
+
+
+def _build_in_memory_uow_factory() -> Callable[[], AbstractUnitOfWork]:
+    store = InMemoryStore(getenv("MEMORY_SNAPSHOT_PATH") or None)
+    if store.snapshot_path is not None:
+        store.start_snapshotting(float(getenv("MEMORY_SNAPSHOT_INTERVAL", "60")))
+    return partial(InMemoryUnitOfWork, store)
+
+
+def mongo_uri() -> str:
+    return getenv("MONGODB_URI") or (
+        f"mongodb+srv://{getenv('MONGODB_USER')}:{getenv('MONGODB_PASSWORD')}"
+        f"@{getenv('MONGODB_HOST')}/?retryWrites=true&w=majority"
+    )
+
+
+def mongo_client_settings() -> Dict[str, Any]:
+    return {
+        "max_pool_size": int(getenv("MONGODB_POOL_MAX_SIZE", "20")),
+        "min_pool_size": int(getenv("MONGODB_POOL_MIN_SIZE", "1")),
+        "max_idle": float(getenv("MONGODB_POOL_MAX_IDLE", "300")),
+        "timeout": float(getenv("MONGODB_TIMEOUT", "10")),
+        "read_preference": getenv("MONGODB_READ_PREFERENCE", "primary"),
+    }
+
+
+def _build_mongo_uow_factory() -> Callable[[], AbstractUnitOfWork]:
+    client = create_mongo_client(mongo_uri(), **mongo_client_settings())
+    return partial(MongoUnitOfWork, client)
+
+
+def _build_sqlite_uow_factory() -> Callable[[], AbstractUnitOfWork]:
+    # The database is local to this node, so its schema is brought up to
+    # date on startup instead of through a separate migration step.
+    path = getenv("SQLITE_PATH", "focus_arrow.sqlite3")
+    conn = connect_sqlite(path)
+    try:
+        sqlite_migrations.migrate(conn)
+    finally:
+        conn.close()
+    return partial(SqliteUnitOfWork, SqliteConnections(path))
+
+
+def _build_database_uow_factory(backend: str) -> Callable[[], AbstractUnitOfWork]:
+    if backend == "postgres":
+        return _build_postgre_uow_factory()
+    if backend == "mongo":
+        return _build_mongo_uow_factory()
+    if backend == "sqlite":
+        return _build_sqlite_uow_factory()
+    if backend == "memory":
+        return _build_in_memory_uow_factory()
+    raise ValueError(f"Unknown DATABASE_BACKEND: {backend}")
+
+
+def _build_uow_factory() -> Callable[[], AbstractUnitOfWork]:
+    backend = getenv("DATABASE_BACKEND", "postgres")
+    uow_factory = _wrap(_build_database_uow_factory(backend), InstrumentedUnitOfWork)
+    purge_interval = float(getenv("HISTORY_PURGE_INTERVAL", "0"))
+    if purge_interval > 0:
+        RetentionWorker(
+            partial(
+                purge_expired_history,
+                uow_factory,
+                chunk_size=int(getenv("HISTORY_PURGE_CHUNK_SIZE", "1000")),
+                pause=0.1,
+            ),
+            purge_interval,
+            "expired verification email records",
+        ).start()
+    if backend == "memory":
+        # Lookups are already dictionary reads, a cache or filter would only
+        # add work.
+        return uow_factory
+    cache_size = int(getenv("VERIFIED_EMAIL_CACHE_SIZE", "10000"))
+    if cache_size > 0:
+        cache = LruTtlCache(
+            cache_size, float(getenv("VERIFIED_EMAIL_CACHE_TTL", "3600"))
+        )
+        negative_ttl = float(getenv("VERIFIED_EMAIL_NEGATIVE_TTL", "0")) or None
+        uow_factory = _wrap(uow_factory, CachedUnitOfWork, cache, negative_ttl)
+    filter_capacity = int(getenv("VERIFIED_EMAIL_FILTER_CAPACITY", "0"))
+    if filter_capacity > 0:
+        bloom_filter = RefreshableBloomFilter(filter_capacity).start_refreshing(
+            partial(_load_verified_addresses, uow_factory),
+            float(getenv("VERIFIED_EMAIL_FILTER_REFRESH_INTERVAL", "60")),
+        )
+        uow_factory = _wrap(uow_factory, BloomFilteredUnitOfWork, bloom_filter)
+    return uow_factory
+
+
+def _load_verified_addresses(uow_factory: Callable[[], AbstractUnitOfWork]):
+    with uow_factory() as uow:
+        yield from uow.verified_emails.iter_addresses()
+
+
+def _wrap(
+    uow_factory: Callable[[], AbstractUnitOfWork], wrapper: type, *args
+) -> Callable[[], AbstractUnitOfWork]:
+    return lambda: wrapper(uow_factory(), *args)
+
+
+def _build_email_client() -> AbstractEmailClient:
+    username, password = getenv("GMAIL_USERNAME"), getenv("GMAIL_PASSWORD")
+    pool_size = int(getenv("SMTP_POOL_SIZE", "2"))
+    if pool_size <= 0:
+        email_client = GmailClient(username, password)
+    else:
+        email_client = PooledGmailClient(
+            username,
+            password,
+            size=pool_size,
+            keepalive_interval=float(getenv("SMTP_KEEPALIVE_INTERVAL", "60")),
+        )
+    outbox = _build_outbox()
+    if outbox is None:
+        return email_client
+    return QueuedEmailClient(
+        email_client,
+        outbox,
+        workers=int(getenv("EMAIL_QUEUE_WORKERS", "2")),
+        max_attempts=int(getenv("EMAIL_QUEUE_MAX_ATTEMPTS", "5")),
+    )
+
+
+def _build_outbox() -> Optional[AbstractOutbox]:
+    # Confirmation emails are sent while the history is locked, which on
+    # SQLite locks the whole database. Queueing them keeps that to a write to
+    # the outbox instead of a round trip to the mail server.
+    default = "sqlite" if getenv("DATABASE_BACKEND", "postgres") == "sqlite" else "off"
+    kind = getenv("EMAIL_QUEUE") or default
+    if kind == "memory":
+        return InMemoryOutbox()
+    if kind == "sqlite":
+        return SqliteOutbox(getenv("EMAIL_QUEUE_PATH", "outbox.sqlite3"))
+    if kind != "off":
+        raise ValueError(f"Unknown EMAIL_QUEUE: {kind}")
+    return None
+
+
+def rate_limit_backend() -> str:
+    # In-memory buckets are per process, so under several workers every
+    # limit would be multiplied by their number. Deployments on Postgres
+    # share theirs through the database unless told otherwise.
+    default = (
+        "postgres" if getenv("DATABASE_BACKEND", "postgres") == "postgres" else "memory"
+    )
+    return getenv("RATE_LIMIT_BACKEND") or default
+
+
+def build_rate_limits() -> RateLimits:
+    backend = rate_limit_backend()
+    if backend == "off":
+        return RateLimits()
+    if backend == "postgres":
+        conn_str = getenv("SUPABASE_CONN_STR")
+        pool_settings = postgre_pool_settings()
+        pool = None
+        if pool_settings is not None:
+            pool = create_postgre_pool(conn_str, **pool_settings)
+        limiter_factory = partial(PostgreRateLimiter, conn_str, pool)
+    elif backend == "memory":
+        limiter_factory = InMemoryRateLimiter
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+    rate_limits = RateLimits(
+        _build_rate_limiter(limiter_factory, "IP", "60", "1"),
+        _build_rate_limiter(limiter_factory, "ADDRESS", "10", "0.01"),
+    )
+    purge_interval = float(getenv("RATE_LIMIT_PURGE_INTERVAL", "3600"))
+    if backend == "postgres" and purge_interval > 0:
+        RetentionWorker(
+            rate_limits.purge_idle, purge_interval, "idle rate limit buckets"
+        ).start()
+    return rate_limits
+
+
+def _build_rate_limiter(
+    limiter_factory: Callable[[float, float], AbstractRateLimiter],
+    scope: str,
+    default_capacity: str,
+    default_rate: str,
+) -> Optional[AbstractRateLimiter]:
+    capacity = float(getenv(f"RATE_LIMIT_{scope}_CAPACITY", default_capacity))
+    if capacity <= 0:
+        return None
+    rate = float(getenv(f"RATE_LIMIT_{scope}_RATE", default_rate))
+    return limiter_factory(capacity, rate)
+
+
+EVENT_HANDLERS = {
+    VerificationEmailSent: [log_event],
+    EmailVerified: [log_event],
+    TokenSent: [log_event],
+    UninstallationEmailSent: [log_event],
+}
+
+
+def build_event_executor() -> Optional[Executor]:
+    event_workers = int(getenv("EVENT_HANDLER_WORKERS", "2"))
+    if event_workers <= 0:
+        return None
+    return ThreadPoolExecutor(event_workers, thread_name_prefix="event-handler")
+
+
+def build_token_generator() -> AbstractTokenGenerator:
+    generator = SecureTokenGenerator(
+        int(getenv("TOKEN_LENGTH", "8")), getenv("TOKEN_ALPHABET") or DEFAULT_ALPHABET
+    )
+    buffer_size = int(getenv("TOKEN_BUFFER_SIZE", "0"))
+    if buffer_size > 0:
+        return BufferedTokenGenerator(generator, buffer_size)
+    return generator
+
+
+def bootstrap(
+    uow_factory: Optional[Callable[[], AbstractUnitOfWork]] = None,
+    email_client: Optional[AbstractEmailClient] = None,
+    pin_generator: Optional[AbstractTokenGenerator] = None,
+    template_renderer: Optional[AbstractTemplateRenderer] = None,
+    event_executor: Optional[Executor] = None,
+) -> MessageBus:
+    # Everything built here lives for the whole process and is shared between
+    # requests, so it has to be thread-safe. Only the unit of work is created
+    # per message, through `uow_factory`.
+    if uow_factory is None:
+        uow_factory = _build_uow_factory()
+    if email_client is None:
+        email_client = _build_email_client()
+    if pin_generator is None:
+        pin_generator = build_token_generator()
+    if template_renderer is None:
+        template_renderer = JinjaTemplateRenderer(
+            PackageLoader("focus_arrow"), getenv("TEMPLATE_BYTECODE_CACHE_DIR")
+        )
+    add_static_body(template_renderer.render(UNINSTALLATION_EMAIL.template))
+    if event_executor is None:
+        event_executor = build_event_executor()
 
     command_handlers = {
         VerifyEmail: verify_email,
@@ -43,4 +380,10 @@ def bootstrap() -> MessageBus:
         ),
     }
 
-    return MessageBus(uow, command_handlers)
+    batch_handlers = {
+        CheckEmailConfirmed: check_emails_confirmed,
+    }
+
+    return MessageBus(
+        uow_factory, command_handlers, batch_handlers, EVENT_HANDLERS, event_executor
+    )
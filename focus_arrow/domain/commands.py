@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from focus_arrow.domain.model import normalize_address
 
 
 @dataclass(frozen=True)
@@ -7,9 +8,17 @@ class Command:
 
 
 @dataclass(frozen=True)
-class SendVerificationEmail(Command):
+class AddressCommand(Command):
     address: str
 
+    def __post_init__(self):
+        object.__setattr__(self, "address", normalize_address(self.address))
+
+
+@dataclass(frozen=True)
+class SendVerificationEmail(AddressCommand):
+    pass
+
 
 @dataclass(frozen=True)
 class VerifyEmail(Command):
@@ -17,15 +26,15 @@ class VerifyEmail(Command):
 
 
 @dataclass(frozen=True)
-class SendTokenToEmail(Command):
-    address: str
+class SendTokenToEmail(AddressCommand):
+    pass
 
 
 @dataclass(frozen=True)
-class CheckEmailConfirmed(Command):
-    address: str
+class CheckEmailConfirmed(AddressCommand):
+    pass
 
 
 @dataclass(frozen=True)
-class SendUninstallationEmail(Command):
-    address: str
+class SendUninstallationEmail(AddressCommand):
+    pass
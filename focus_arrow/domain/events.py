@@ -0,0 +1,26 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Event:
+    pass
+
+
+@dataclass(frozen=True)
+class VerificationEmailSent(Event):
+    address: str
+
+
+@dataclass(frozen=True)
+class EmailVerified(Event):
+    address: str
+
+
+@dataclass(frozen=True)
+class TokenSent(Event):
+    address: str
+
+
+@dataclass(frozen=True)
+class UninstallationEmailSent(Event):
+    address: str
@@ -1,5 +1,24 @@
 from datetime import datetime
 from dataclasses import dataclass
+from typing import Optional
+import hashlib
+import unicodedata
+
+
+def normalize_address(address: str) -> str:
+    """
+    Returns the canonical form of an email address, so that differently typed
+    versions of the same address are stored and looked up as one.
+    """
+    return unicodedata.normalize("NFC", address.strip()).lower()
+
+
+def address_key(address: str) -> bytes:
+    """
+    Fixed-width key that normalized addresses are indexed by. It is the first
+    16 bytes of their SHA-256, which Postgres can compute too.
+    """
+    return hashlib.sha256(address.encode()).digest()[:16]
 
 
 @dataclass(frozen=True)
@@ -10,6 +29,9 @@ class VerifiedEmailEntry:
 
     address: str
 
+    def __post_init__(self):
+        object.__setattr__(self, "address", normalize_address(self.address))
+
 
 @dataclass(frozen=True)
 class VerificationEmailHistoryEntry:
@@ -21,6 +43,9 @@ class VerificationEmailHistoryEntry:
     sent: datetime
     token: str
 
+    def __post_init__(self):
+        object.__setattr__(self, "address", normalize_address(self.address))
+
 
 class ConfirmationEmailRateExceeded(Exception):
     pass
@@ -32,3 +57,35 @@ class ConfirmationLinkNotValid(Exception):
 
 class EmailNotVerified(Exception):
     pass
+
+
+class TokenSpaceExhausted(Exception):
+    pass
+
+
+# The rules below are shared by the sync and async handlers, which only
+# differ in how they reach the repositories.
+
+
+def check_confirmation_allowed(
+    verified: bool, last_record: Optional[VerificationEmailHistoryEntry]
+) -> None:
+    # One confirmation email per address and day, and none once verified.
+    if verified or (
+        last_record is not None and last_record.sent.date() == datetime.today().date()
+    ):
+        raise ConfirmationEmailRateExceeded
+
+
+def check_confirmation_link(
+    record: Optional[VerificationEmailHistoryEntry],
+) -> VerificationEmailHistoryEntry:
+    # Links are only valid on the day they were sent.
+    if record is None or record.sent.date() != datetime.today().date():
+        raise ConfirmationLinkNotValid
+    return record
+
+
+def check_verified(verified: bool) -> None:
+    if not verified:
+        raise EmailNotVerified
@@ -0,0 +1,34 @@
+from argparse import ArgumentParser
+from os import getenv
+from dotenv import load_dotenv
+import psycopg
+from focus_arrow.bootstrap import mongo_uri
+from focus_arrow.migrations import mongo, postgres, sqlite
+from focus_arrow.services.uow import connect_sqlite, create_mongo_client
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Apply pending schema migrations.")
+    parser.add_argument("backend", choices=["postgres", "mongo", "sqlite"])
+    args = parser.parse_args()
+    load_dotenv(".env")
+    if args.backend == "postgres":
+        with psycopg.connect(getenv("SUPABASE_CONN_STR")) as conn:
+            applied = postgres.migrate(conn)
+    elif args.backend == "sqlite":
+        conn = connect_sqlite(getenv("SQLITE_PATH", "focus_arrow.sqlite3"))
+        try:
+            applied = sqlite.migrate(conn)
+        finally:
+            conn.close()
+    else:
+        conn_pool = create_mongo_client(mongo_uri(), timeout=60)
+        try:
+            applied = mongo.migrate(conn_pool)
+        finally:
+            conn_pool.close()
+    print(f"Applied migrations: {applied or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+import pymongo
+from pymongo import DeleteOne, UpdateOne
+from pymongo.collection import Collection
+from pymongo.database import Database
+from focus_arrow.domain.model import address_key, normalize_address
+
+Migration = Tuple[int, str, Callable[[Database], None]]
+
+
+BATCH_SIZE = 1000
+
+
+def flush(collection: Collection, requests: list) -> None:
+    if requests:
+        collection.bulk_write(requests, ordered=False)
+        requests.clear()
+
+
+def merge_duplicates(collection: Collection, sort: Optional[str] = None) -> None:
+    """
+    Deletes all but one record per normalized address, keeping the first one
+    in `sort` order (newest first), so that a unique index can be built over
+    what is left.
+    """
+    records = collection.find({}, {"address": 1})
+    if sort is not None:
+        records = records.sort(sort, pymongo.DESCENDING)
+    seen = set()
+    deletes: list = []
+    for record in records.batch_size(BATCH_SIZE):
+        key = address_key(normalize_address(record["address"]))
+        if key in seen:
+            deletes.append(DeleteOne({"_id": record["_id"]}))
+            if len(deletes) >= BATCH_SIZE:
+                flush(collection, deletes)
+        seen.add(key)
+    flush(collection, deletes)
+
+
+def set_keys(collection: Collection, index: str, old_index: str) -> None:
+    # Sparse, the unique index can be built before any record has a key, and
+    # it guards every key written after it. Records already rewritten by an
+    # earlier, interrupted run are skipped, so this can always be run again.
+    collection.create_index("key", unique=True, sparse=True, name=index)
+    updates: list = []
+    for record in collection.find({}, {"address": 1, "key": 1}).batch_size(BATCH_SIZE):
+        address = normalize_address(record["address"])
+        key = address_key(address)
+        if record["address"] == address and record.get("key") == key:
+            continue
+        updates.append(
+            UpdateOne(
+                {"_id": record["_id"]}, {"$set": {"address": address, "key": key}}
+            )
+        )
+        if len(updates) >= BATCH_SIZE:
+            flush(collection, updates)
+    flush(collection, updates)
+    if old_index in collection.index_information():
+        collection.drop_index(old_index)
+
+
+def create_initial_indexes(db: Database) -> None:
+    db["verified-emails"].create_index(
+        "address", unique=True, name="verified_emails_address_key"
+    )
+    history = db["verification-email-history"]
+    history.create_index(
+        [("address", pymongo.ASCENDING), ("sent", pymongo.DESCENDING)],
+        name="verification_email_history_address_sent_idx",
+    )
+    history.create_index(
+        "token", unique=True, name="verification_email_history_token_key"
+    )
+
+
+def create_latest_history_indexes(db: Database) -> None:
+    history = db["verification-email-history"]
+    merge_duplicates(history, sort="sent")
+    history.create_index(
+        "address", unique=True, name="verification_email_history_address_key"
+    )
+    history.create_index("sent", name="verification_email_history_sent_idx")
+    if "verification_email_history_address_sent_idx" in history.index_information():
+        history.drop_index("verification_email_history_address_sent_idx")
+
+
+def key_by_normalized_address(db: Database) -> None:
+    # Earlier migrations already left one record per normalized address, but
+    # records written since by older code may not have been normalized.
+    verified = db["verified-emails"]
+    merge_duplicates(verified)
+    set_keys(verified, "verified_emails_key_key", "verified_emails_address_key")
+
+    history = db["verification-email-history"]
+    merge_duplicates(history, sort="sent")
+    set_keys(
+        history,
+        "verification_email_history_key_key",
+        "verification_email_history_address_key",
+    )
+
+
+def merge_duplicate_addresses(db: Database) -> None:
+    # Applied migrations are never edited, so databases that built the
+    # initial indexes before records were merged get merged here. Merging
+    # is idempotent, so it costs nothing where there is nothing to merge.
+    merge_duplicates(db["verified-emails"])
+    merge_duplicates(db["verification-email-history"], sort="sent")
+
+
+MIGRATIONS: List[Migration] = [
+    (1, "initial", create_initial_indexes),
+    (2, "latest_history_per_address", create_latest_history_indexes),
+    (3, "address_keys", key_by_normalized_address),
+    (4, "merge_duplicate_addresses", merge_duplicate_addresses),
+]
+
+
+def migrate(conn_pool: pymongo.MongoClient) -> List[int]:
+    db = conn_pool["Focus-Arrow"]
+    migrations = db["schema-migrations"]
+    applied = {doc["_id"] for doc in migrations.find({}, {"_id": 1})}
+    applied_now = []
+    for version, name, apply in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied:
+            continue
+        apply(db)
+        migrations.insert_one(
+            {"_id": version, "name": name, "applied_at": datetime.now()}
+        )
+        applied_now.append(version)
+    return applied_now
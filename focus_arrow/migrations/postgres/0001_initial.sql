@@ -0,0 +1,26 @@
+CREATE TABLE IF NOT EXISTS verified_emails (
+    email_address text NOT NULL
+);
+
+DELETE FROM verified_emails a
+    USING verified_emails b
+    WHERE a.email_address = b.email_address AND a.ctid < b.ctid;
+
+CREATE UNIQUE INDEX IF NOT EXISTS verified_emails_email_address_key
+    ON verified_emails (email_address);
+
+CREATE TABLE IF NOT EXISTS verification_email_history (
+    address text NOT NULL,
+    sent timestamp NOT NULL,
+    token text NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS verification_email_history_address_sent_idx
+    ON verification_email_history (address, sent DESC);
+
+DELETE FROM verification_email_history a
+    USING verification_email_history b
+    WHERE a.token = b.token AND (a.sent, a.ctid) < (b.sent, b.ctid);
+
+CREATE UNIQUE INDEX IF NOT EXISTS verification_email_history_token_key
+    ON verification_email_history (token);
@@ -0,0 +1,11 @@
+DELETE FROM verification_email_history a
+    USING verification_email_history b
+    WHERE a.address = b.address AND (a.sent, a.ctid) < (b.sent, b.ctid);
+
+DROP INDEX IF EXISTS verification_email_history_address_sent_idx;
+
+CREATE UNIQUE INDEX IF NOT EXISTS verification_email_history_address_key
+    ON verification_email_history (address);
+
+CREATE INDEX IF NOT EXISTS verification_email_history_sent_idx
+    ON verification_email_history (sent);
@@ -0,0 +1,7 @@
+-- Buckets only hold short-lived counters, so they do not need to survive a
+-- crash and can skip the write-ahead log.
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+    key text PRIMARY KEY,
+    tokens double precision NOT NULL,
+    updated timestamptz NOT NULL
+);
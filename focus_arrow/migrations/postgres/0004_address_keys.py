@@ -0,0 +1,73 @@
+"""
+Addresses are stored in their canonical form and looked up by a 16-byte key,
+the first half of their SHA-256. Existing rows are normalized here, with the
+same normalize_address the application uses, because Postgres' lower() and
+btrim() neither fold nor strip quite the same characters as Python does.
+"""
+
+import psycopg
+from focus_arrow.domain.model import normalize_address
+
+BATCH_SIZE = 10000
+
+
+def normalize_column(conn: psycopg.Connection, table: str, column: str) -> None:
+    # The cursor reads from the snapshot it was opened with, so rows updated
+    # along the way are not read a second time.
+    with conn.cursor(name=f"normalize_{table}") as rows, conn.cursor() as cur:
+        rows.itersize = BATCH_SIZE
+        rows.execute(f"SELECT ctid::text, {column} FROM {table};")
+        while batch := rows.fetchmany(BATCH_SIZE):
+            updates = [
+                (normalize_address(address), ctid)
+                for ctid, address in batch
+                if normalize_address(address) != address
+            ]
+            if updates:
+                cur.executemany(
+                    f"UPDATE {table} SET {column} = %s WHERE ctid = %s::tid;",
+                    updates,
+                )
+
+
+def migrate(conn: psycopg.Connection) -> None:
+    conn.execute("""
+        CREATE OR REPLACE FUNCTION focus_arrow_address_key(address text) RETURNS bytea
+            LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+            AS $$ SELECT substring(sha256(convert_to(address, 'UTF8')) FOR 16) $$;
+    """)
+
+    # Addresses that only differed before normalization collide once they are
+    # rewritten, so the old unique indexes go first. This all runs in the
+    # migration's transaction, so a failure leaves the tables as they were.
+    conn.execute("DROP INDEX IF EXISTS verified_emails_email_address_key;")
+    normalize_column(conn, "verified_emails", "email_address")
+    conn.execute("""
+        DELETE FROM verified_emails a
+            USING verified_emails b
+            WHERE a.email_address = b.email_address AND a.ctid < b.ctid;
+    """)
+    conn.execute("""
+        ALTER TABLE verified_emails ADD COLUMN IF NOT EXISTS address_key bytea
+            GENERATED ALWAYS AS (focus_arrow_address_key(email_address)) STORED;
+    """)
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS verified_emails_address_key_key
+            ON verified_emails (address_key);
+    """)
+
+    conn.execute("DROP INDEX IF EXISTS verification_email_history_address_key;")
+    normalize_column(conn, "verification_email_history", "address")
+    conn.execute("""
+        DELETE FROM verification_email_history a
+            USING verification_email_history b
+            WHERE a.address = b.address AND (a.sent, a.ctid) < (b.sent, b.ctid);
+    """)
+    conn.execute("""
+        ALTER TABLE verification_email_history ADD COLUMN IF NOT EXISTS address_key bytea
+            GENERATED ALWAYS AS (focus_arrow_address_key(address)) STORED;
+    """)
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS verification_email_history_address_key_key
+            ON verification_email_history (address_key);
+    """)
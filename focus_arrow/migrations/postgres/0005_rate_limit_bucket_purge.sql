@@ -0,0 +1,3 @@
+-- Idle buckets are purged by their last update, see RateLimits.purge_idle.
+CREATE INDEX IF NOT EXISTS rate_limit_buckets_updated_idx
+    ON rate_limit_buckets (updated);
@@ -0,0 +1,59 @@
+from datetime import datetime
+from importlib import import_module, resources
+from typing import Callable, List, Tuple, Union
+import psycopg
+
+# Arbitrary key for pg_advisory_xact_lock, so that two processes starting at
+# the same time do not apply the same migration twice.
+LOCK_KEY = 0x466F637573
+
+# A migration is either a SQL script or, when it has to share code with the
+# application, a module named the same way whose migrate(conn) is called.
+Step = Union[str, Callable[[psycopg.Connection], None]]
+Migration = Tuple[int, str, Step]
+
+
+def load_migrations() -> List[Migration]:
+    migrations = []
+    for resource in resources.files(__name__).iterdir():
+        stem, _, suffix = resource.name.partition(".")
+        if not stem[:1].isdigit():
+            continue
+        if suffix == "sql":
+            step: Step = resource.read_text()
+        elif suffix == "py":
+            step = import_module(f"{__name__}.{stem}").migrate
+        else:
+            continue
+        version, name = stem.split("_", 1)
+        migrations.append((int(version), name, step))
+    return sorted(migrations, key=lambda migration: migration[0])
+
+
+def migrate(conn: psycopg.Connection) -> List[int]:
+    applied_now = []
+    with conn.transaction():
+        conn.execute("SELECT pg_advisory_xact_lock(%s);", (LOCK_KEY,))
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version integer PRIMARY KEY,
+                name text NOT NULL,
+                applied_at timestamp NOT NULL
+            );
+        """)
+        applied = {
+            row[0] for row in conn.execute("SELECT version FROM schema_migrations;")
+        }
+        for version, name, step in load_migrations():
+            if version in applied:
+                continue
+            if callable(step):
+                step(conn)
+            else:
+                conn.execute(step)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, %s);",
+                (version, name, datetime.now()),
+            )
+            applied_now.append(version)
+    return applied_now
@@ -0,0 +1,139 @@
+from datetime import datetime
+from typing import List, Tuple
+import sqlite3
+from focus_arrow.domain.model import normalize_address
+
+# SQLite runs one statement per execute() call and executescript() would
+# commit the surrounding transaction, so migrations are lists of statements.
+Migration = Tuple[int, str, List[str]]
+
+MIGRATIONS: List[Migration] = [
+    (
+        1,
+        "initial",
+        [
+            """
+            CREATE TABLE verified_emails (
+                email_address TEXT PRIMARY KEY
+            ) WITHOUT ROWID;
+            """,
+            """
+            CREATE TABLE verification_email_history (
+                address TEXT PRIMARY KEY,
+                sent TEXT NOT NULL,
+                token TEXT NOT NULL
+            ) WITHOUT ROWID;
+            """,
+            """
+            CREATE UNIQUE INDEX verification_email_history_token_key
+                ON verification_email_history (token);
+            """,
+            """
+            CREATE INDEX verification_email_history_sent_idx
+                ON verification_email_history (sent);
+            """,
+        ],
+    ),
+    (
+        2,
+        "normalized_addresses",
+        # SQLite's lower() only folds ASCII, which covers what was stored
+        # before addresses were normalized on the way in.
+        [
+            """
+            DELETE FROM verified_emails WHERE EXISTS (
+                SELECT 1 FROM verified_emails other
+                    WHERE lower(trim(other.email_address))
+                            = lower(trim(verified_emails.email_address))
+                        AND other.email_address < verified_emails.email_address
+            );
+            """,
+            """
+            UPDATE verified_emails SET email_address = lower(trim(email_address))
+                WHERE email_address <> lower(trim(email_address));
+            """,
+            """
+            DELETE FROM verification_email_history WHERE EXISTS (
+                SELECT 1 FROM verification_email_history other
+                    WHERE lower(trim(other.address))
+                            = lower(trim(verification_email_history.address))
+                        AND (other.sent, other.address)
+                            > (verification_email_history.sent,
+                                verification_email_history.address)
+            );
+            """,
+            """
+            UPDATE verification_email_history SET address = lower(trim(address))
+                WHERE address <> lower(trim(address));
+            """,
+        ],
+    ),
+    (
+        3,
+        "python_normalized_addresses",
+        # Redoes the above with the normalize_address the application looks
+        # addresses up by, which also handles Unicode case and composition.
+        [
+            """
+            DELETE FROM verified_emails WHERE EXISTS (
+                SELECT 1 FROM verified_emails other
+                    WHERE normalize_address(other.email_address)
+                            = normalize_address(verified_emails.email_address)
+                        AND other.email_address < verified_emails.email_address
+            );
+            """,
+            """
+            UPDATE verified_emails SET email_address = normalize_address(email_address)
+                WHERE email_address <> normalize_address(email_address);
+            """,
+            """
+            DELETE FROM verification_email_history WHERE EXISTS (
+                SELECT 1 FROM verification_email_history other
+                    WHERE normalize_address(other.address)
+                            = normalize_address(verification_email_history.address)
+                        AND (other.sent, other.address)
+                            > (verification_email_history.sent,
+                                verification_email_history.address)
+            );
+            """,
+            """
+            UPDATE verification_email_history SET address = normalize_address(address)
+                WHERE address <> normalize_address(address);
+            """,
+        ],
+    ),
+]
+
+
+def migrate(conn: sqlite3.Connection) -> List[int]:
+    applied_now = []
+    conn.create_function("normalize_address", 1, normalize_address, deterministic=True)
+    # BEGIN IMMEDIATE takes the write lock up front, so two processes starting
+    # at the same time apply each migration once.
+    conn.execute("BEGIN IMMEDIATE;")
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TEXT NOT NULL
+            );
+        """)
+        applied = {
+            row[0] for row in conn.execute("SELECT version FROM schema_migrations;")
+        }
+        for version, name, statements in MIGRATIONS:
+            if version in applied:
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?);",
+                (version, name, datetime.now().isoformat()),
+            )
+            applied_now.append(version)
+    except BaseException:
+        conn.execute("ROLLBACK;")
+        raise
+    conn.execute("COMMIT;")
+    return applied_now
@@ -0,0 +1,111 @@
+from datetime import datetime
+from focus_arrow.adapters.async_email import AbstractAsyncEmailClient
+from focus_arrow.adapters.token import AbstractTokenGenerator
+from focus_arrow.adapters.templates import AbstractTemplateRenderer
+from focus_arrow.domain.model import (
+    VerificationEmailHistoryEntry,
+    TokenSpaceExhausted,
+    VerifiedEmailEntry,
+    check_confirmation_allowed,
+    check_confirmation_link,
+    check_verified,
+)
+from focus_arrow.services.async_uow import AbstractAsyncUnitOfWork
+from focus_arrow.services.handlers import (
+    CONFIRMATION_EMAIL,
+    MAX_TOKEN_ATTEMPTS,
+    TOKEN_EMAIL,
+    UNINSTALLATION_EMAIL,
+)
+from focus_arrow.domain.events import (
+    EmailVerified,
+    TokenSent,
+    UninstallationEmailSent,
+    VerificationEmailSent,
+)
+from focus_arrow.domain.commands import (
+    SendVerificationEmail,
+    VerifyEmail,
+    SendTokenToEmail,
+    CheckEmailConfirmed,
+    SendUninstallationEmail,
+)
+
+# The rules live in the domain and the emails in handlers.py; these only
+# await the repositories and the email client.
+
+
+async def _generate_unique_token(
+    token_generator: AbstractTokenGenerator, uow: AbstractAsyncUnitOfWork
+) -> str:
+    for _ in range(MAX_TOKEN_ATTEMPTS):
+        token = token_generator.generate()
+        if await uow.email_history.get_record_by_token(token) is None:
+            return token
+    raise TokenSpaceExhausted
+
+
+async def send_confirmation_email(
+    email_client: AbstractAsyncEmailClient,
+    token_generator: AbstractTokenGenerator,
+    template_renderer: AbstractTemplateRenderer,
+    uow: AbstractAsyncUnitOfWork,
+    command: SendVerificationEmail,
+) -> None:
+    await uow.email_history.lock_address(command.address)
+    check_confirmation_allowed(
+        await uow.verified_emails.contains(VerifiedEmailEntry(command.address)),
+        await uow.email_history.get_record_by_address(command.address),
+    )
+    token = await _generate_unique_token(token_generator, uow)
+    content = template_renderer.render(CONFIRMATION_EMAIL.template, token=token)
+    await email_client.send(command.address, CONFIRMATION_EMAIL.subject, content)
+    await uow.email_history.add_record(
+        VerificationEmailHistoryEntry(command.address, datetime.now(), token)
+    )
+    uow.add_message(VerificationEmailSent(command.address))
+
+
+async def verify_email(uow: AbstractAsyncUnitOfWork, command: VerifyEmail) -> None:
+    record = check_confirmation_link(
+        await uow.email_history.get_record_by_token(command.token)
+    )
+    await uow.verified_emails.add(VerifiedEmailEntry(record.address))
+    uow.add_message(EmailVerified(record.address))
+
+
+async def check_email_confirmed(
+    uow: AbstractAsyncUnitOfWork, command: CheckEmailConfirmed
+) -> bool:
+    return await uow.verified_emails.contains(VerifiedEmailEntry(command.address))
+
+
+async def send_token_to_email(
+    email_client: AbstractAsyncEmailClient,
+    token_generator: AbstractTokenGenerator,
+    template_renderer: AbstractTemplateRenderer,
+    uow: AbstractAsyncUnitOfWork,
+    command: SendTokenToEmail,
+) -> str:
+    check_verified(
+        await uow.verified_emails.contains(VerifiedEmailEntry(command.address))
+    )
+    token = token_generator.generate()
+    content = template_renderer.render(TOKEN_EMAIL.template, token=token)
+    await email_client.send(command.address, TOKEN_EMAIL.subject, content)
+    uow.add_message(TokenSent(command.address))
+    return token
+
+
+async def send_uninstallation_email(
+    email_client: AbstractAsyncEmailClient,
+    template_renderer: AbstractTemplateRenderer,
+    uow: AbstractAsyncUnitOfWork,
+    command: SendUninstallationEmail,
+):
+    check_verified(
+        await uow.verified_emails.contains(VerifiedEmailEntry(command.address))
+    )
+    content = template_renderer.render(UNINSTALLATION_EMAIL.template)
+    await email_client.send(command.address, UNINSTALLATION_EMAIL.subject, content)
+    uow.add_message(UninstallationEmailSent(command.address))
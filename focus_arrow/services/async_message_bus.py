@@ -0,0 +1,64 @@
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+from focus_arrow.adapters.metrics import COMMAND_DURATION
+from focus_arrow.domain.commands import Command
+from focus_arrow.domain.events import Event
+from focus_arrow.services.async_uow import AbstractAsyncUnitOfWork
+from focus_arrow.services.message_bus import Message
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncMessageBus:
+    def __init__(
+        self,
+        uow_factory: Callable[[], AbstractAsyncUnitOfWork],
+        command_handlers: Dict[
+            type, Callable[[AbstractAsyncUnitOfWork, Command], Awaitable[Any]]
+        ],
+        event_handlers: Optional[Dict[type, List[Callable[[Event], None]]]] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.uow_factory = uow_factory
+        self.command_handlers = command_handlers
+        self.event_handlers = event_handlers or {}
+        self.executor = executor
+
+    async def handle_command(self, uow: AbstractAsyncUnitOfWork, command: Command):
+        with COMMAND_DURATION.time(type(command).__name__):
+            result = await self.command_handlers[type(command)](uow, command)
+            await uow.commit()
+        return result
+
+    def handle_event(self, event: Event) -> None:
+        # Event handlers are plain functions shared with MessageBus. With an
+        # executor they run on its threads without being awaited.
+        for handler in self.event_handlers.get(type(event), []):
+            if self.executor is None:
+                self._run_event_handler(handler, event)
+            else:
+                asyncio.get_running_loop().run_in_executor(
+                    self.executor, self._run_event_handler, handler, event
+                )
+
+    async def handle_message(self, message: Message) -> Any:
+        async with self.uow_factory() as uow:
+            messages = deque([message])
+            results = []
+            while messages:
+                to_handle = messages.popleft()
+                if isinstance(to_handle, Command):
+                    results.append(await self.handle_command(uow, to_handle))
+                elif isinstance(to_handle, Event):
+                    self.handle_event(to_handle)
+                messages.extend(uow.flush_messages())
+        return results[0] if results else None
+
+    def _run_event_handler(self, handler: Callable[[Event], None], event: Event):
+        try:
+            handler(event)
+        except Exception:
+            logger.exception("Event handler %r failed for %r", handler, event)
@@ -0,0 +1,217 @@
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional, Set, Union
+import psycopg
+from psycopg.rows import dict_row
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.client_session import AsyncClientSession
+from focus_arrow.domain.model import (
+    VerifiedEmailEntry,
+    VerificationEmailHistoryEntry,
+    address_key,
+)
+from focus_arrow.services.repositories import HISTORY_PROJECTION
+
+
+class AbstractAsyncVerifiedEmailRepository(ABC):
+    @abstractmethod
+    async def contains(self, entry: VerifiedEmailEntry) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def add(self, entry: VerifiedEmailEntry) -> None:
+        raise NotImplementedError
+
+    async def contains_many(self, entries: Iterable[VerifiedEmailEntry]) -> Set[str]:
+        return {entry.address for entry in entries if await self.contains(entry)}
+
+
+class AsyncMongoVerifiedEmailRepository(AbstractAsyncVerifiedEmailRepository):
+    def __init__(
+        self,
+        conn_pool: AsyncMongoClient,
+        session: Optional[AsyncClientSession] = None,
+    ):
+        db_conn = conn_pool["Focus-Arrow"]
+        self._collection = db_conn["verified-emails"]
+        self._session = session
+
+    async def contains(self, entry: VerifiedEmailEntry) -> bool:
+        record = await self._collection.find_one(
+            {"key": address_key(entry.address)},
+            {"_id": 0, "key": 1},
+            session=self._session,
+        )
+        return record is not None
+
+    async def contains_many(self, entries: Iterable[VerifiedEmailEntry]) -> Set[str]:
+        keys = list({address_key(entry.address) for entry in entries})
+        cursor = self._collection.find(
+            {"key": {"$in": keys}},
+            {"_id": 0, "address": 1},
+            session=self._session,
+        )
+        return {record["address"] async for record in cursor}
+
+    async def add(self, entry: VerifiedEmailEntry) -> None:
+        await self._collection.update_one(
+            {"key": address_key(entry.address)},
+            {"$setOnInsert": {"address": entry.address}},
+            upsert=True,
+            session=self._session,
+        )
+
+
+class AsyncPostgreVerifiedEmailRepository(AbstractAsyncVerifiedEmailRepository):
+    def __init__(self, conn: psycopg.AsyncConnection):
+        self._conn = conn
+
+    async def contains(self, entry: VerifiedEmailEntry) -> bool:
+        async with self._conn.cursor() as cur:
+            await cur.execute(
+                "SELECT 1 FROM verified_emails WHERE address_key = %s;",
+                (address_key(entry.address),),
+            )
+            result = await cur.fetchone()
+        return result is not None
+
+    async def contains_many(self, entries: Iterable[VerifiedEmailEntry]) -> Set[str]:
+        keys = list({address_key(entry.address) for entry in entries})
+        async with self._conn.cursor() as cur:
+            await cur.execute(
+                "SELECT email_address FROM verified_emails WHERE address_key = ANY(%s);",
+                (keys,),
+            )
+            return {address async for (address,) in cur}
+
+    async def add(self, entry: VerifiedEmailEntry) -> None:
+        async with self._conn.cursor() as cur:
+            await cur.execute(
+                "INSERT INTO verified_emails (email_address) VALUES (%s) ON CONFLICT DO NOTHING;",
+                (entry.address,),
+            )
+
+
+class AbstractAsyncEmailHistoryRepository(ABC):
+    @abstractmethod
+    async def add_record(self, entry: VerificationEmailHistoryEntry) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_record_by_address(
+        self, address: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_record_by_token(
+        self, token: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        raise NotImplementedError
+
+    async def lock_address(self, address: str) -> None:
+        pass
+
+
+class AsyncMongoEmailHistoryRepository(AbstractAsyncEmailHistoryRepository):
+    def __init__(
+        self,
+        conn_pool: AsyncMongoClient,
+        session: Optional[AsyncClientSession] = None,
+    ):
+        db_conn = conn_pool["Focus-Arrow"]
+        self._collection = db_conn["verification-email-history"]
+        self._session = session
+
+    async def add_record(self, entry: VerificationEmailHistoryEntry) -> None:
+        await self._collection.update_one(
+            {"key": address_key(entry.address)},
+            {
+                "$set": {"sent": entry.sent, "token": entry.token},
+                "$setOnInsert": {"address": entry.address},
+            },
+            True,
+            session=self._session,
+        )
+
+    async def get_record_by_address(
+        self, address: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        return self._to_entry(
+            await self._collection.find_one(
+                {"key": address_key(address)}, HISTORY_PROJECTION, session=self._session
+            )
+        )
+
+    async def get_record_by_token(
+        self, token: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        return self._to_entry(
+            await self._collection.find_one(
+                {"token": token}, HISTORY_PROJECTION, session=self._session
+            )
+        )
+
+    def _to_entry(self, record) -> Optional[VerificationEmailHistoryEntry]:
+        if record is None:
+            return None
+        return VerificationEmailHistoryEntry(
+            address=record["address"], sent=record["sent"], token=record["token"]
+        )
+
+
+class AsyncPostgreEmailHistoryRepository(AbstractAsyncEmailHistoryRepository):
+    def __init__(self, conn: psycopg.AsyncConnection):
+        self._conn = conn
+
+    async def lock_address(self, address: str) -> None:
+        async with self._conn.cursor() as cur:
+            await cur.execute(
+                "SELECT pg_advisory_xact_lock(hashtextextended(%s, 0));",
+                (address,),
+            )
+
+    async def add_record(self, entry: VerificationEmailHistoryEntry) -> None:
+        async with self._conn.cursor() as cur:
+            await cur.execute(
+                """
+                INSERT INTO verification_email_history (address, sent, token)
+                        VALUES (%s, %s, %s)
+                    ON CONFLICT (address_key)
+                        DO UPDATE SET sent = EXCLUDED.sent, token = EXCLUDED.token;
+            """,
+                (entry.address, entry.sent, entry.token),
+            )
+
+    async def get_record_by_address(
+        self, address: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        return await self._fetch_one(
+            """
+            SELECT address, sent, token FROM verification_email_history
+                WHERE address_key = %s;
+        """,
+            address_key(address),
+        )
+
+    async def get_record_by_token(
+        self, token: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        return await self._fetch_one(
+            """
+            SELECT address, sent, token FROM verification_email_history
+                WHERE token = %s;
+        """,
+            token,
+        )
+
+    async def _fetch_one(
+        self, query: str, value: Union[str, bytes]
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        async with self._conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(query, (value,))
+            result = await cur.fetchone()
+        if result is None:
+            return None
+        return VerificationEmailHistoryEntry(
+            address=result["address"], sent=result["sent"], token=result["token"]
+        )
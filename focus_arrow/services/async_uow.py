@@ -0,0 +1,165 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Union
+import psycopg
+from psycopg_pool import AsyncConnectionPool
+from pymongo import AsyncMongoClient, ReadPreference
+from focus_arrow.domain.commands import Command
+from focus_arrow.domain.events import Event
+from focus_arrow.services.async_repositories import (
+    AbstractAsyncEmailHistoryRepository,
+    AbstractAsyncVerifiedEmailRepository,
+    AsyncMongoEmailHistoryRepository,
+    AsyncMongoVerifiedEmailRepository,
+    AsyncPostgreEmailHistoryRepository,
+    AsyncPostgreVerifiedEmailRepository,
+)
+
+
+class AbstractAsyncUnitOfWork(ABC):
+    @property
+    @abstractmethod
+    def verified_emails() -> AbstractAsyncVerifiedEmailRepository:
+        raise NotImplementedError
+
+    @property
+    @abstractmethod
+    def email_history() -> AbstractAsyncEmailHistoryRepository:
+        raise NotImplementedError
+
+    async def __aenter__(self) -> "AbstractAsyncUnitOfWork":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.rollback()
+
+    @abstractmethod
+    async def commit(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def rollback(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_message(self, message: Union[Command, Event]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def flush_messages(self) -> List[Union[Command, Event]]:
+        raise NotImplementedError
+
+
+class AsyncMongoUnitOfWork(AbstractAsyncUnitOfWork):
+    def __init__(self, conn_pool: AsyncMongoClient):
+        self._conn_pool = conn_pool
+        self.messages = []
+
+    async def __aenter__(self) -> "AsyncMongoUnitOfWork":
+        self._session = self._conn_pool.start_session()
+        await self._session.start_transaction(read_preference=ReadPreference.PRIMARY)
+        self._emails = AsyncMongoVerifiedEmailRepository(self._conn_pool, self._session)
+        self._email_history = AsyncMongoEmailHistoryRepository(
+            self._conn_pool, self._session
+        )
+        return await super().__aenter__()
+
+    async def __aexit__(self, *args) -> None:
+        try:
+            await super().__aexit__(*args)
+        finally:
+            await self._session.end_session()
+
+    @property
+    def verified_emails(self):
+        return self._emails
+
+    @property
+    def email_history(self):
+        return self._email_history
+
+    async def commit(self) -> None:
+        await self._session.commit_transaction()
+        await self._session.start_transaction(read_preference=ReadPreference.PRIMARY)
+
+    async def rollback(self) -> None:
+        if self._session.in_transaction:
+            await self._session.abort_transaction()
+
+    def add_message(self, message: Union[Command, Event]) -> None:
+        self.messages.append(message)
+
+    def flush_messages(self) -> List[Union[Command, Event]]:
+        ret = self.messages
+        self.messages = []
+        return ret
+
+
+def create_async_postgre_pool(
+    conn_str: str,
+    min_size: int = 1,
+    max_size: int = 5,
+    max_lifetime: float = 30 * 60,
+    max_idle: float = 5 * 60,
+    timeout: float = 10,
+) -> AsyncConnectionPool:
+    # Async pools can only be opened inside a running event loop, so this one
+    # is opened by the first unit of work that uses it.
+    return AsyncConnectionPool(
+        conn_str,
+        min_size=min_size,
+        max_size=max_size,
+        max_lifetime=max_lifetime,
+        max_idle=max_idle,
+        timeout=timeout,
+        check=AsyncConnectionPool.check_connection,
+        name="focus-arrow-async",
+        open=False,
+    )
+
+
+class AsyncPostgreUnitOfWork(AbstractAsyncUnitOfWork):
+    def __init__(self, conn_str: str, pool: Optional[AsyncConnectionPool] = None):
+        self.conn_str = conn_str
+        self._pool = pool
+        self.messages = []
+
+    async def __aenter__(self) -> "AsyncPostgreUnitOfWork":
+        if self._pool is not None:
+            await self._pool.open()
+            self._conn = await self._pool.getconn()
+        else:
+            self._conn = await psycopg.AsyncConnection.connect(self.conn_str)
+        self._emails = AsyncPostgreVerifiedEmailRepository(self._conn)
+        self._email_history = AsyncPostgreEmailHistoryRepository(self._conn)
+        return await super().__aenter__()
+
+    async def __aexit__(self, *args) -> None:
+        try:
+            await super().__aexit__(*args)
+        finally:
+            if self._pool is not None:
+                await self._pool.putconn(self._conn)
+            else:
+                await self._conn.close()
+
+    @property
+    def verified_emails(self):
+        return self._emails
+
+    @property
+    def email_history(self):
+        return self._email_history
+
+    async def commit(self) -> None:
+        await self._conn.commit()
+
+    async def rollback(self) -> None:
+        await self._conn.rollback()
+
+    def add_message(self, message: Union[Command, Event]) -> None:
+        self.messages.append(message)
+
+    def flush_messages(self) -> List[Union[Command, Event]]:
+        ret = self.messages
+        self.messages = []
+        return ret
@@ -1,15 +1,25 @@
 from datetime import datetime
+from typing import List, NamedTuple
+import logging
 from focus_arrow.adapters.token import AbstractTokenGenerator
 from focus_arrow.adapters.email import AbstractEmailClient
 from focus_arrow.adapters.templates import AbstractTemplateRenderer
 from focus_arrow.domain.model import (
-    ConfirmationEmailRateExceeded,
-    ConfirmationLinkNotValid,
-    EmailNotVerified,
     VerificationEmailHistoryEntry,
+    TokenSpaceExhausted,
     VerifiedEmailEntry,
+    check_confirmation_allowed,
+    check_confirmation_link,
+    check_verified,
 )
 from focus_arrow.services.uow import AbstractUnitOfWork
+from focus_arrow.domain.events import (
+    EmailVerified,
+    Event,
+    TokenSent,
+    UninstallationEmailSent,
+    VerificationEmailSent,
+)
 from focus_arrow.domain.commands import (
     SendVerificationEmail,
     VerifyEmail,
@@ -18,6 +28,35 @@ from focus_arrow.domain.commands import (
     SendUninstallationEmail,
 )
 
+audit_logger = logging.getLogger("focus_arrow.audit")
+
+
+class Email(NamedTuple):
+    template: str
+    subject: str
+
+
+CONFIRMATION_EMAIL = Email("emails/confirmation.html", "Confirm your Focus Arrow token")
+TOKEN_EMAIL = Email("emails/token.html", "Focus Arrow token")
+UNINSTALLATION_EMAIL = Email(
+    "emails/uninstallation.html", "Focus Arrow was uninstalled"
+)
+
+MAX_TOKEN_ATTEMPTS = 10
+
+
+def _generate_unique_token(
+    token_generator: AbstractTokenGenerator, uow: AbstractUnitOfWork
+) -> str:
+    # Confirmation links are looked up by token, so a token still present in
+    # the history would confirm the wrong address. Collisions are rare with a
+    # healthy generator, so running out of attempts means it is not one.
+    for _ in range(MAX_TOKEN_ATTEMPTS):
+        token = token_generator.generate()
+        if uow.email_history.get_record_by_token(token) is None:
+            return token
+    raise TokenSpaceExhausted
+
 
 def send_confirmation_email(
     email_client: AbstractEmailClient,
@@ -26,31 +65,41 @@ def send_confirmation_email(
     uow: AbstractUnitOfWork,
     command: SendVerificationEmail,
 ) -> None:
-    email_history_record = uow.email_history.get_record_by_address(command.address)
-    if uow.verified_emails.contains(VerifiedEmailEntry(command.address)) or (
-        email_history_record is not None
-        and email_history_record.sent.date() == datetime.today().date()
-    ):
-        raise ConfirmationEmailRateExceeded
-    token = token_generator.generate()
-    content = template_renderer.render("emails/confirmation.html", token=token)
-    email_client.send(command.address, "Confirm your Focus Arrow token", content)
+    uow.email_history.lock_address(command.address)
+    check_confirmation_allowed(
+        uow.verified_emails.contains(VerifiedEmailEntry(command.address)),
+        uow.email_history.get_record_by_address(command.address),
+    )
+    token = _generate_unique_token(token_generator, uow)
+    content = template_renderer.render(CONFIRMATION_EMAIL.template, token=token)
+    email_client.send(command.address, CONFIRMATION_EMAIL.subject, content)
     uow.email_history.add_record(
         VerificationEmailHistoryEntry(command.address, datetime.now(), token)
     )
+    uow.add_message(VerificationEmailSent(command.address))
 
 
 def verify_email(uow: AbstractUnitOfWork, command: VerifyEmail) -> None:
-    record = uow.email_history.get_record_by_token(command.token)
-    if record is None or record.sent.date() != datetime.today().date():
-        raise ConfirmationLinkNotValid
+    record = check_confirmation_link(
+        uow.email_history.get_record_by_token(command.token)
+    )
     uow.verified_emails.add(VerifiedEmailEntry(record.address))
+    uow.add_message(EmailVerified(record.address))
 
 
 def check_email_confirmed(
     uow: AbstractUnitOfWork, command: CheckEmailConfirmed
 ) -> bool:
-    return uow.verified_emails.contains(VerifiedEmailEntry(command.address))
+    return uow.verified_emails.contains_eventually(VerifiedEmailEntry(command.address))
+
+
+def check_emails_confirmed(
+    uow: AbstractUnitOfWork, commands: List[CheckEmailConfirmed]
+) -> List[bool]:
+    verified = uow.verified_emails.contains_many(
+        VerifiedEmailEntry(command.address) for command in commands
+    )
+    return [command.address in verified for command in commands]
 
 
 def send_token_to_email(
@@ -60,11 +109,11 @@ def send_token_to_email(
     uow: AbstractUnitOfWork,
     command: SendTokenToEmail,
 ) -> str:
-    if not uow.verified_emails.contains(VerifiedEmailEntry(command.address)):
-        raise EmailNotVerified
+    check_verified(uow.verified_emails.contains(VerifiedEmailEntry(command.address)))
     token = token_generator.generate()
-    content = template_renderer.render("emails/token.html", token=token)
-    email_client.send(command.address, "Focus Arrow token", content)
+    content = template_renderer.render(TOKEN_EMAIL.template, token=token)
+    email_client.send(command.address, TOKEN_EMAIL.subject, content)
+    uow.add_message(TokenSent(command.address))
     return token
 
 
@@ -74,7 +123,11 @@ def send_uninstallation_email(
     uow: AbstractUnitOfWork,
     command: SendUninstallationEmail,
 ):
-    if not uow.verified_emails.contains(VerifiedEmailEntry(command.address)):
-        raise EmailNotVerified
-    content = template_renderer.render("emails/uninstallation.html")
-    email_client.send(command.address, "Focus Arrow was uninstalled", content)
+    check_verified(uow.verified_emails.contains(VerifiedEmailEntry(command.address)))
+    content = template_renderer.render(UNINSTALLATION_EMAIL.template)
+    email_client.send(command.address, UNINSTALLATION_EMAIL.subject, content)
+    uow.add_message(UninstallationEmailSent(command.address))
+
+
+def log_event(event: Event) -> None:
+    audit_logger.info("%s", event)
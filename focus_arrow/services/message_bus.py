@@ -1,28 +1,114 @@
-from typing import Any, Callable, Dict
+from collections import defaultdict, deque
+from concurrent.futures import Executor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
+import logging
+from focus_arrow.adapters.metrics import COMMAND_DURATION
 from focus_arrow.domain.commands import Command
+from focus_arrow.domain.events import Event
 from focus_arrow.services.uow import AbstractUnitOfWork
 
-Message = Command
+logger = logging.getLogger(__name__)
+
+Message = Union[Command, Event]
+
+
+class BatchResult(NamedTuple):
+    result: Any
+    error: Optional[Exception]
 
 
 class MessageBus:
     def __init__(
         self,
-        uow: AbstractUnitOfWork,
-        command_handlers: Dict[type, Callable[[Command], None]],
+        uow_factory: Callable[[], AbstractUnitOfWork],
+        command_handlers: Dict[type, Callable[[AbstractUnitOfWork, Command], Any]],
+        batch_handlers: Optional[
+            Dict[type, Callable[[AbstractUnitOfWork, List[Command]], List[Any]]]
+        ] = None,
+        event_handlers: Optional[Dict[type, List[Callable[[Event], None]]]] = None,
+        executor: Optional[Executor] = None,
     ):
-        self.uow = uow
+        self.uow_factory = uow_factory
         self.command_handlers = command_handlers
+        self.batch_handlers = batch_handlers or {}
+        self.event_handlers = event_handlers or {}
+        self.executor = executor
+
+    def handle_command(self, uow: AbstractUnitOfWork, command: Command):
+        with COMMAND_DURATION.time(type(command).__name__):
+            result = self.command_handlers[type(command)](uow, command)
+            uow.commit()
+        return result
 
-    def handle_command(self, command: Command):
-        return self.command_handlers[type(command)](self.uow, command)
+    def handle_event(self, event: Event) -> None:
+        # Events are side effects of a command that already committed, so
+        # their handlers run off the request thread when an executor is given
+        # and their failures never reach the caller.
+        for handler in self.event_handlers.get(type(event), []):
+            if self.executor is None:
+                self._run_event_handler(handler, event)
+            else:
+                self.executor.submit(self._run_event_handler, handler, event)
 
     def handle_message(self, message: Message) -> Any:
-        messages = [message]
-        results = []
-        while len(messages) > 0:
-            to_handle = messages.pop(0)
-            if isinstance(to_handle, Command):
-                results.append(self.handle_command(to_handle))
-            messages.extend(self.uow.flush_messages())
-        return results[0]
+        with self.uow_factory() as uow:
+            messages = deque([message])
+            results = []
+            while messages:
+                to_handle = messages.popleft()
+                if isinstance(to_handle, Command):
+                    results.append(self.handle_command(uow, to_handle))
+                elif isinstance(to_handle, Event):
+                    self.handle_event(to_handle)
+                messages.extend(uow.flush_messages())
+        return results[0] if results else None
+
+    def handle_many(self, commands: Sequence[Command]) -> List[BatchResult]:
+        # Commands of a type with a batch handler are answered together in a
+        # single unit of work; everything else is handled one by one, so a
+        # failure only affects its own item.
+        results: List[Optional[BatchResult]] = [None] * len(commands)
+        groups = defaultdict(list)
+        for index, command in enumerate(commands):
+            groups[type(command)].append(index)
+        for command_type, indexes in groups.items():
+            batch_handler = self.batch_handlers.get(command_type)
+            if batch_handler is None:
+                for index in indexes:
+                    results[index] = self._try_handle(commands[index])
+                continue
+            try:
+                with self.uow_factory() as uow:
+                    batch = batch_handler(uow, [commands[i] for i in indexes])
+                    uow.commit()
+                    events = uow.flush_messages()
+            except Exception as e:
+                for index in indexes:
+                    results[index] = BatchResult(None, e)
+            else:
+                for index, result in zip(indexes, batch):
+                    results[index] = BatchResult(result, None)
+                for event in events:
+                    self.handle_event(event)
+        return results
+
+    def _try_handle(self, command: Command) -> BatchResult:
+        try:
+            return BatchResult(self.handle_message(command), None)
+        except Exception as e:
+            return BatchResult(None, e)
+
+    def _run_event_handler(self, handler: Callable[[Event], None], event: Event):
+        try:
+            handler(event)
+        except Exception:
+            logger.exception("Event handler %r failed for %r", handler, event)
@@ -1,9 +1,28 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
 import pymongo
+from pymongo.client_session import ClientSession
 import psycopg
 from psycopg.rows import dict_row
-from focus_arrow.domain.model import VerifiedEmailEntry, VerificationEmailHistoryEntry
+from focus_arrow.adapters.bloom import RefreshableBloomFilter
+from focus_arrow.adapters.cache import LruTtlCache
+from focus_arrow.adapters.metrics import REPOSITORY_DURATION
+from focus_arrow.domain.model import (
+    VerifiedEmailEntry,
+    VerificationEmailHistoryEntry,
+    address_key,
+)
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PROJECTION = {"_id": 0, "address": 1, "sent": 1, "token": 1}
 
 
 class AbstractVerifiedEmailRepository(ABC):
@@ -15,41 +34,203 @@ class AbstractVerifiedEmailRepository(ABC):
     def add(self, entry: VerifiedEmailEntry) -> None:
         raise NotImplementedError
 
+    @abstractmethod
+    def iter_addresses(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def contains_many(self, entries: Iterable[VerifiedEmailEntry]) -> Set[str]:
+        # Returns the verified addresses among `entries`. Backends override it
+        # to answer in one round trip.
+        return {entry.address for entry in entries if self.contains(entry)}
+
+    def contains_eventually(self, entry: VerifiedEmailEntry) -> bool:
+        # Like contains(), but may still answer False for a little while after
+        # another process verifies the address. Only for lookups that are
+        # asked again, such as the extension polling /check-email.
+        return self.contains(entry)
+
 
 class MongoVerifiedEmailRepository(AbstractVerifiedEmailRepository):
-    def __init__(self, conn_pool: pymongo.MongoClient):
+    def __init__(
+        self, conn_pool: pymongo.MongoClient, session: Optional[ClientSession] = None
+    ):
         db_conn = conn_pool["Focus-Arrow"]
         self._collection = db_conn["verified-emails"]
+        self._session = session
 
     def contains(self, entry: VerifiedEmailEntry) -> bool:
-        return self._collection.find_one({"address": entry.address}) is not None
+        # Leaving _id out makes this a covered query, answered from the
+        # unique key index without fetching the document.
+        return (
+            self._collection.find_one(
+                {"key": address_key(entry.address)},
+                {"_id": 0, "key": 1},
+                session=self._session,
+            )
+            is not None
+        )
+
+    def contains_many(self, entries: Iterable[VerifiedEmailEntry]) -> Set[str]:
+        keys = list({address_key(entry.address) for entry in entries})
+        cursor = self._collection.find(
+            {"key": {"$in": keys}},
+            {"_id": 0, "address": 1},
+            session=self._session,
+        )
+        return {record["address"] for record in cursor}
 
     def add(self, entry: VerifiedEmailEntry) -> None:
-        if not self.contains(entry):
-            self._collection.insert_one({"address": entry.address})
+        self._collection.update_one(
+            {"key": address_key(entry.address)},
+            {"$setOnInsert": {"address": entry.address}},
+            upsert=True,
+            session=self._session,
+        )
+
+    def iter_addresses(self) -> Iterator[str]:
+        # A full scan does not need the transaction, which would also hold
+        # it open for as long as the scan takes. Outside of it the client's
+        # read preference applies, so it can be served by a secondary.
+        cursor = self._collection.find({}, {"_id": 0, "address": 1}).batch_size(10000)
+        for record in cursor:
+            yield record["address"]
 
 
 class PostgreVerifiedEmailRepository(AbstractVerifiedEmailRepository):
-    def __init__(self, conn_str: str):
-        self.conn_str = conn_str
+    def __init__(self, conn: psycopg.Connection):
+        self._conn = conn
 
     def contains(self, entry: VerifiedEmailEntry) -> bool:
-        with psycopg.connect(self.conn_str) as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "SELECT * FROM verified_emails WHERE email_address = %s;",
-                    (entry.address,),
-                )
-                result = cur.fetchone()
+        with self._conn.cursor() as cur:
+            cur.execute(
+                "SELECT 1 FROM verified_emails WHERE address_key = %s;",
+                (address_key(entry.address),),
+            )
+            result = cur.fetchone()
         return result is not None
 
+    def contains_many(self, entries: Iterable[VerifiedEmailEntry]) -> Set[str]:
+        keys = list({address_key(entry.address) for entry in entries})
+        with self._conn.cursor() as cur:
+            cur.execute(
+                "SELECT email_address FROM verified_emails WHERE address_key = ANY(%s);",
+                (keys,),
+            )
+            return {address for (address,) in cur}
+
     def add(self, entry: VerifiedEmailEntry) -> None:
-        with psycopg.connect(self.conn_str) as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO verified_emails (email_address) VALUES (%s);",
-                    (entry.address,),
-                )
+        with self._conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO verified_emails (email_address) VALUES (%s) ON CONFLICT DO NOTHING;",
+                (entry.address,),
+            )
+
+    def iter_addresses(self) -> Iterator[str]:
+        # A named cursor is a server-side cursor, so rows are streamed instead
+        # of loaded all at once.
+        with self._conn.cursor(name="verified_emails_scan") as cur:
+            cur.itersize = 10000
+            cur.execute("SELECT email_address FROM verified_emails;")
+            for (address,) in cur:
+                yield address
+
+
+class CachedVerifiedEmailRepository(AbstractVerifiedEmailRepository):
+    # Verification is never revoked, so a positive answer can be cached for as
+    # long as the cache keeps it. Negative answers go stale as soon as another
+    # process verifies the address, so they are only cached when
+    # `negative_ttl` is given, and for that long.
+    def __init__(
+        self,
+        repository: AbstractVerifiedEmailRepository,
+        cache: LruTtlCache,
+        negative_ttl: Optional[float] = None,
+    ):
+        self._repository = repository
+        self._cache = cache
+        self._negative_ttl = negative_ttl
+        self._added: Set[str] = set()
+
+    def contains(self, entry: VerifiedEmailEntry) -> bool:
+        cached = self._cache.get(entry.address)
+        if cached is not None:
+            return cached
+        result = self._repository.contains(entry)
+        if result and entry.address not in self._added:
+            # Our own uncommitted adds are not cached, since a rollback would
+            # undo them.
+            self._cache.set(entry.address, True)
+        elif not result and self._negative_ttl:
+            self._cache.set(entry.address, False, self._negative_ttl)
+        return result
+
+    def contains_many(self, entries: Iterable[VerifiedEmailEntry]) -> Set[str]:
+        verified, missing = set(), []
+        for entry in entries:
+            cached = self._cache.get(entry.address)
+            if cached is None:
+                missing.append(entry)
+            elif cached:
+                verified.add(entry.address)
+        if not missing:
+            return verified
+        found = self._repository.contains_many(missing)
+        for entry in missing:
+            if entry.address in found and entry.address not in self._added:
+                self._cache.set(entry.address, True)
+            elif entry.address not in found and self._negative_ttl:
+                self._cache.set(entry.address, False, self._negative_ttl)
+        return verified | found
+
+    def add(self, entry: VerifiedEmailEntry) -> None:
+        self._repository.add(entry)
+        self._added.add(entry.address)
+        self._cache.delete(entry.address)
+
+    def iter_addresses(self) -> Iterator[str]:
+        return self._repository.iter_addresses()
+
+
+class BloomFilteredVerifiedEmailRepository(AbstractVerifiedEmailRepository):
+    # A Bloom filter has no false negatives for what it was built from, but an
+    # address verified by another worker since the last rebuild is not in it
+    # yet. Polling lookups trust a miss, since the next poll after a rebuild
+    # corrects it. Plain contains() backs the handlers that send email or
+    # refuse to, so it always asks the repository and teaches the filter what
+    # it finds.
+    def __init__(
+        self,
+        repository: AbstractVerifiedEmailRepository,
+        bloom_filter: RefreshableBloomFilter,
+    ):
+        self._repository = repository
+        self._filter = bloom_filter
+
+    def contains(self, entry: VerifiedEmailEntry) -> bool:
+        found = self._repository.contains(entry)
+        if found and not self._filter.might_contain(entry.address):
+            self._filter.add(entry.address)
+        return found
+
+    def contains_eventually(self, entry: VerifiedEmailEntry) -> bool:
+        if not self._filter.might_contain(entry.address):
+            return False
+        return self._repository.contains(entry)
+
+    def contains_many(self, entries: Iterable[VerifiedEmailEntry]) -> Set[str]:
+        candidates = [
+            entry for entry in entries if self._filter.might_contain(entry.address)
+        ]
+        if not candidates:
+            return set()
+        return self._repository.contains_many(candidates)
+
+    def add(self, entry: VerifiedEmailEntry) -> None:
+        self._repository.add(entry)
+        self._filter.add(entry.address)
+
+    def iter_addresses(self) -> Iterator[str]:
+        return self._repository.iter_addresses()
 
 
 class AbstractEmailHistoryRepository(ABC):
@@ -69,23 +250,42 @@ class AbstractEmailHistoryRepository(ABC):
     ) -> Optional[VerificationEmailHistoryEntry]:
         raise NotImplementedError
 
+    @abstractmethod
+    def purge_sent_before(self, cutoff: datetime, limit: int) -> int:
+        raise NotImplementedError
+
+    def lock_address(self, address: str) -> None:
+        # Serializes concurrent units of work that check and then record a
+        # send to `address`. Backends without a shared lock leave this as a
+        # no-op.
+        pass
+
 
 class MongoEmailHistoryRepository(AbstractEmailHistoryRepository):
-    def __init__(self, conn_pool: pymongo.MongoClient):
+    def __init__(
+        self, conn_pool: pymongo.MongoClient, session: Optional[ClientSession] = None
+    ):
         db_conn = conn_pool["Focus-Arrow"]
         self._collection = db_conn["verification-email-history"]
+        self._session = session
 
     def add_record(self, entry: VerificationEmailHistoryEntry) -> None:
         self._collection.update_one(
-            {"address": entry.address},
-            {"$set": {"sent": entry.sent, "token": entry.token}},
+            {"key": address_key(entry.address)},
+            {
+                "$set": {"sent": entry.sent, "token": entry.token},
+                "$setOnInsert": {"address": entry.address},
+            },
             True,
+            session=self._session,
         )
 
     def get_record_by_address(
         self, address: str
     ) -> Optional[VerificationEmailHistoryEntry]:
-        record = self._collection.find_one({"address": address})
+        record = self._collection.find_one(
+            {"key": address_key(address)}, HISTORY_PROJECTION, session=self._session
+        )
         if record is None:
             return None
         return VerificationEmailHistoryEntry(
@@ -95,41 +295,65 @@ class MongoEmailHistoryRepository(AbstractEmailHistoryRepository):
     def get_record_by_token(
         self, token: str
     ) -> Optional[VerificationEmailHistoryEntry]:
-        record = self._collection.find_one({"token": token})
+        record = self._collection.find_one(
+            {"token": token}, HISTORY_PROJECTION, session=self._session
+        )
         if record is None:
             return None
         return VerificationEmailHistoryEntry(
             address=record["address"], sent=record["sent"], token=record["token"]
         )
 
+    def purge_sent_before(self, cutoff: datetime, limit: int) -> int:
+        ids = [
+            record["_id"]
+            for record in self._collection.find(
+                {"sent": {"$lt": cutoff}}, {"_id": 1}, session=self._session
+            ).limit(limit)
+        ]
+        if not ids:
+            return 0
+        result = self._collection.delete_many(
+            {"_id": {"$in": ids}}, session=self._session
+        )
+        return result.deleted_count
+
 
 class PostgreEmailHistoryRepository(AbstractEmailHistoryRepository):
-    def __init__(self, conn_str: str):
-        self.conn_str = conn_str
+    def __init__(self, conn: psycopg.Connection):
+        self._conn = conn
+
+    def lock_address(self, address: str) -> None:
+        with self._conn.cursor() as cur:
+            cur.execute(
+                "SELECT pg_advisory_xact_lock(hashtextextended(%s, 0));",
+                (address,),
+            )
 
     def add_record(self, entry: VerificationEmailHistoryEntry) -> None:
-        with psycopg.connect(self.conn_str) as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO verification_email_history (address, sent, token)
-                            VALUES (%s, %s, %s);
-                """,
-                    (entry.address, entry.sent, entry.token),
-                )
+        with self._conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO verification_email_history (address, sent, token)
+                        VALUES (%s, %s, %s)
+                    ON CONFLICT (address_key)
+                        DO UPDATE SET sent = EXCLUDED.sent, token = EXCLUDED.token;
+            """,
+                (entry.address, entry.sent, entry.token),
+            )
 
     def get_record_by_address(
         self, address: str
     ) -> Optional[VerificationEmailHistoryEntry]:
-        with psycopg.connect(self.conn_str) as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
-                cur.execute(
-                    """
-                    SELECT * FROM verification_email_history WHERE address = %s ORDER BY sent DESC;
-                """,
-                    (address,),
-                )
-                result = cur.fetchone()
+        with self._conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                SELECT address, sent, token FROM verification_email_history
+                    WHERE address_key = %s;
+            """,
+                (address_key(address),),
+            )
+            result = cur.fetchone()
         if result is None:
             return None
         return VerificationEmailHistoryEntry(
@@ -139,17 +363,405 @@ class PostgreEmailHistoryRepository(AbstractEmailHistoryRepository):
     def get_record_by_token(
         self, token: str
     ) -> Optional[VerificationEmailHistoryEntry]:
-        with psycopg.connect(self.conn_str) as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
-                cur.execute(
-                    """
-                    SELECT * FROM verification_email_history WHERE token = %s ORDER BY sent DESC;
-                """,
-                    (token,),
-                )
-                result = cur.fetchone()
+        with self._conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                SELECT address, sent, token FROM verification_email_history
+                    WHERE token = %s;
+            """,
+                (token,),
+            )
+            result = cur.fetchone()
         if result is None:
             return None
         return VerificationEmailHistoryEntry(
             address=result["address"], sent=result["sent"], token=result["token"]
         )
+
+    def purge_sent_before(self, cutoff: datetime, limit: int) -> int:
+        with self._conn.cursor() as cur:
+            cur.execute(
+                """
+                DELETE FROM verification_email_history WHERE ctid IN (
+                    SELECT ctid FROM verification_email_history WHERE sent < %s
+                        LIMIT %s FOR UPDATE SKIP LOCKED
+                );
+            """,
+                (cutoff, limit),
+            )
+            return cur.rowcount
+
+
+def _begin_write(conn: sqlite3.Connection) -> None:
+    # Writes take SQLite's write lock right away instead of upgrading a read
+    # transaction later, which could fail with SQLITE_BUSY mid-transaction.
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE;")
+
+
+def _sqlite_history_entry(
+    row: Optional[tuple],
+) -> Optional[VerificationEmailHistoryEntry]:
+    if row is None:
+        return None
+    address, sent, token = row
+    return VerificationEmailHistoryEntry(address, datetime.fromisoformat(sent), token)
+
+
+class SqliteVerifiedEmailRepository(AbstractVerifiedEmailRepository):
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def contains(self, entry: VerifiedEmailEntry) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM verified_emails WHERE email_address = ?;",
+            (entry.address,),
+        ).fetchone()
+        return row is not None
+
+    def contains_many(self, entries: Iterable[VerifiedEmailEntry]) -> Set[str]:
+        # Passing the addresses as one JSON array keeps the statement text,
+        # and so its cached prepared statement, the same for any batch size.
+        addresses = json.dumps(list({entry.address for entry in entries}))
+        rows = self._conn.execute(
+            """
+            SELECT email_address FROM verified_emails
+                WHERE email_address IN (SELECT value FROM json_each(?));
+            """,
+            (addresses,),
+        )
+        return {address for (address,) in rows}
+
+    def add(self, entry: VerifiedEmailEntry) -> None:
+        _begin_write(self._conn)
+        self._conn.execute(
+            "INSERT INTO verified_emails (email_address) VALUES (?) ON CONFLICT DO NOTHING;",
+            (entry.address,),
+        )
+
+    def iter_addresses(self) -> Iterator[str]:
+        for (address,) in self._conn.execute(
+            "SELECT email_address FROM verified_emails;"
+        ):
+            yield address
+
+
+class SqliteEmailHistoryRepository(AbstractEmailHistoryRepository):
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def lock_address(self, address: str) -> None:
+        # SQLite only has a database-wide write lock, which serializes
+        # confirmation requests for every address, not just this one. It is
+        # held while the email is handed over, which is why SQLite
+        # deployments queue email by default (see bootstrap._build_outbox).
+        _begin_write(self._conn)
+
+    def add_record(self, entry: VerificationEmailHistoryEntry) -> None:
+        _begin_write(self._conn)
+        self._conn.execute(
+            """
+            INSERT INTO verification_email_history (address, sent, token)
+                    VALUES (?, ?, ?)
+                ON CONFLICT (address)
+                    DO UPDATE SET sent = excluded.sent, token = excluded.token;
+            """,
+            (entry.address, entry.sent.isoformat(), entry.token),
+        )
+
+    def get_record_by_address(
+        self, address: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        return _sqlite_history_entry(
+            self._conn.execute(
+                """
+                SELECT address, sent, token FROM verification_email_history
+                    WHERE address = ?;
+                """,
+                (address,),
+            ).fetchone()
+        )
+
+    def get_record_by_token(
+        self, token: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        return _sqlite_history_entry(
+            self._conn.execute(
+                """
+                SELECT address, sent, token FROM verification_email_history
+                    WHERE token = ?;
+                """,
+                (token,),
+            ).fetchone()
+        )
+
+    def purge_sent_before(self, cutoff: datetime, limit: int) -> int:
+        _begin_write(self._conn)
+        return self._conn.execute(
+            """
+            DELETE FROM verification_email_history WHERE address IN (
+                SELECT address FROM verification_email_history WHERE sent < ?
+                    LIMIT ?
+            );
+            """,
+            (cutoff.isoformat(), limit),
+        ).rowcount
+
+
+class RoutingVerifiedEmailRepository(AbstractVerifiedEmailRepository):
+    # Reads go to the unit of work `router` picks for the addresses involved,
+    # writes always to the primary one.
+    def __init__(self, router: Any):
+        self._router = router
+
+    def contains(self, entry: VerifiedEmailEntry) -> bool:
+        return self._router.reader(entry.address).verified_emails.contains(entry)
+
+    def contains_many(self, entries: Iterable[VerifiedEmailEntry]) -> Set[str]:
+        entries = list(entries)
+        reader = self._router.reader(*(entry.address for entry in entries))
+        return reader.verified_emails.contains_many(entries)
+
+    def add(self, entry: VerifiedEmailEntry) -> None:
+        self._router.writer(entry.address).verified_emails.add(entry)
+
+    def iter_addresses(self) -> Iterator[str]:
+        return self._router.reader().verified_emails.iter_addresses()
+
+
+class RoutingEmailHistoryRepository(AbstractEmailHistoryRepository):
+    def __init__(self, router: Any):
+        self._router = router
+
+    def lock_address(self, address: str) -> None:
+        self._router.writer(address).email_history.lock_address(address)
+
+    def add_record(self, entry: VerificationEmailHistoryEntry) -> None:
+        self._router.writer(entry.address).email_history.add_record(entry)
+
+    def get_record_by_address(
+        self, address: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        return self._router.reader(address).email_history.get_record_by_address(address)
+
+    def get_record_by_token(
+        self, token: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        # Confirmation links are usually clicked right after they are sent,
+        # before a lagging replica has the record, so tokens are looked up on
+        # the primary.
+        return self._router.writer().email_history.get_record_by_token(token)
+
+    def purge_sent_before(self, cutoff: datetime, limit: int) -> int:
+        return self._router.writer().email_history.purge_sent_before(cutoff, limit)
+
+
+class InMemoryStore:
+    """
+    Process-wide state shared by every InMemoryUnitOfWork: the verified
+    addresses and the email history indexed by address and by token. Units of
+    work stage their writes and apply them here under one lock when they
+    commit.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None, lock_stripes: int = 64):
+        self.snapshot_path = snapshot_path
+        self.verified: Set[str] = set()
+        self.history_by_address: Dict[str, VerificationEmailHistoryEntry] = {}
+        self.history_by_token: Dict[str, VerificationEmailHistoryEntry] = {}
+        self.lock = threading.Lock()
+        # Stand-ins for the Postgres advisory locks, striped so their number
+        # stays fixed however many addresses are seen.
+        self._address_locks = [threading.RLock() for _ in range(lock_stripes)]
+        self._dirty = False
+        self._closed = threading.Event()
+        self._snapshotter: Optional[threading.Thread] = None
+        if snapshot_path is not None and os.path.exists(snapshot_path):
+            self.load()
+
+    def address_lock(self, address: str) -> threading.RLock:
+        return self._address_locks[hash(address) % len(self._address_locks)]
+
+    def apply(
+        self,
+        verified: Set[str],
+        history: Dict[str, VerificationEmailHistoryEntry],
+        purged: Dict[str, VerificationEmailHistoryEntry],
+    ) -> None:
+        if not (verified or history or purged):
+            return
+        with self.lock:
+            self.verified |= verified
+            for address, entry in purged.items():
+                # A record replaced since it was picked for purging stays.
+                if self.history_by_address.get(address) == entry:
+                    del self.history_by_address[address]
+                    self.history_by_token.pop(entry.token, None)
+            for address, entry in history.items():
+                previous = self.history_by_address.get(address)
+                if previous is not None:
+                    self.history_by_token.pop(previous.token, None)
+                self.history_by_address[address] = entry
+                self.history_by_token[entry.token] = entry
+            self._dirty = True
+
+    def load(self) -> None:
+        with open(self.snapshot_path) as f:
+            snapshot = json.load(f)
+        with self.lock:
+            self.verified = set(snapshot["verified_emails"])
+            self.history_by_address = {
+                address: VerificationEmailHistoryEntry(
+                    address, datetime.fromisoformat(sent), token
+                )
+                for address, sent, token in snapshot["email_history"]
+            }
+            self.history_by_token = {
+                entry.token: entry for entry in self.history_by_address.values()
+            }
+
+    def save(self) -> None:
+        with self.lock:
+            snapshot = {
+                "verified_emails": sorted(self.verified),
+                "email_history": [
+                    [entry.address, entry.sent.isoformat(), entry.token]
+                    for entry in self.history_by_address.values()
+                ],
+            }
+            self._dirty = False
+        # Written next to the snapshot and renamed over it, so a crash while
+        # saving never leaves a truncated file behind. The name is per
+        # process, so two processes saving at once cannot mix their writes.
+        partial_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(partial_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(partial_path, self.snapshot_path)
+
+    def start_snapshotting(self, interval: float) -> "InMemoryStore":
+        self._snapshotter = threading.Thread(
+            target=self._snapshot_loop,
+            args=(interval,),
+            name="memory-snapshot",
+            daemon=True,
+        )
+        self._snapshotter.start()
+        atexit.register(self.close)
+        return self
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+        if self.snapshot_path is not None and self._dirty:
+            self.save()
+
+    def _snapshot_loop(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            if self._dirty:
+                try:
+                    self.save()
+                except Exception:
+                    logger.exception("Saving the in-memory snapshot failed")
+
+
+class InMemoryVerifiedEmailRepository(AbstractVerifiedEmailRepository):
+    def __init__(self, store: InMemoryStore):
+        self._store = store
+        self.added: Set[str] = set()
+
+    def contains(self, entry: VerifiedEmailEntry) -> bool:
+        return entry.address in self.added or entry.address in self._store.verified
+
+    def contains_many(self, entries: Iterable[VerifiedEmailEntry]) -> Set[str]:
+        return {entry.address for entry in entries if self.contains(entry)}
+
+    def add(self, entry: VerifiedEmailEntry) -> None:
+        self.added.add(entry.address)
+
+    def clear(self) -> None:
+        self.added.clear()
+
+    def iter_addresses(self) -> Iterator[str]:
+        with self._store.lock:
+            addresses = list(self._store.verified)
+        return iter(addresses + list(self.added - self._store.verified))
+
+
+class InMemoryEmailHistoryRepository(AbstractEmailHistoryRepository):
+    def __init__(self, store: InMemoryStore):
+        self._store = store
+        self.added: Dict[str, VerificationEmailHistoryEntry] = {}
+        self.purged: Dict[str, VerificationEmailHistoryEntry] = {}
+        self._locks: List[threading.RLock] = []
+
+    def lock_address(self, address: str) -> None:
+        lock = self._store.address_lock(address)
+        lock.acquire()
+        self._locks.append(lock)
+
+    def release_locks(self) -> None:
+        while self._locks:
+            self._locks.pop().release()
+
+    def clear(self) -> None:
+        self.added.clear()
+        self.purged.clear()
+
+    def add_record(self, entry: VerificationEmailHistoryEntry) -> None:
+        self.added[entry.address] = entry
+
+    def get_record_by_address(
+        self, address: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        if address in self.added:
+            return self.added[address]
+        if address in self.purged:
+            return None
+        return self._store.history_by_address.get(address)
+
+    def get_record_by_token(
+        self, token: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        for entry in self.added.values():
+            if entry.token == token:
+                return entry
+        entry = self._store.history_by_token.get(token)
+        if entry is None or entry.address in self.purged:
+            return None
+        if entry.address in self.added:
+            return None
+        return entry
+
+    def purge_sent_before(self, cutoff: datetime, limit: int) -> int:
+        with self._store.lock:
+            expired = [
+                entry
+                for entry in self._store.history_by_address.values()
+                if entry.sent < cutoff and entry.address not in self.purged
+            ]
+        for entry in expired[:limit]:
+            self.purged[entry.address] = entry
+        return min(len(expired), limit)
+
+
+class InstrumentedRepository:
+    """
+    Proxies a repository, recording how long each of its method calls takes
+    under the given repository name.
+    """
+
+    def __init__(self, repository: Any, name: str):
+        self._repository = repository
+        self._name = name
+
+    def __getattr__(self, attribute: str) -> Any:
+        value = getattr(self._repository, attribute)
+        if not callable(value):
+            return value
+
+        def timed(*args, **kwargs):
+            with REPOSITORY_DURATION.time(self._name, attribute):
+                return value(*args, **kwargs)
+
+        return timed
@@ -0,0 +1,59 @@
+from datetime import datetime
+from typing import Callable, Optional
+import logging
+import threading
+import time
+from focus_arrow.services.uow import AbstractUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+
+def purge_expired_history(
+    uow_factory: Callable[[], AbstractUnitOfWork],
+    now: Optional[datetime] = None,
+    chunk_size: int = 1000,
+    pause: float = 0,
+) -> int:
+    # Tokens and the one-email-per-day rule only look at records sent today,
+    # so anything older is dead weight. Records are deleted and committed in
+    # chunks so that no transaction holds many row locks at once.
+    now = now or datetime.now()
+    cutoff = datetime.combine(now.date(), datetime.min.time())
+    purged = 0
+    while True:
+        with uow_factory() as uow:
+            deleted = uow.email_history.purge_sent_before(cutoff, chunk_size)
+            uow.commit()
+        purged += deleted
+        if deleted < chunk_size:
+            return purged
+        time.sleep(pause)
+
+
+class RetentionWorker:
+    """
+    Calls `purge` every `interval` seconds on a background thread. `purge`
+    returns how many records it deleted, which are logged as `what`.
+    """
+
+    def __init__(self, purge: Callable[[], int], interval: float, what: str):
+        self.purge = purge
+        self.interval = interval
+        self.what = what
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+
+    def start(self) -> "RetentionWorker":
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._closed.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._closed.wait(self.interval):
+            try:
+                logger.info("Purged %d %s", self.purge(), self.what)
+            except Exception:
+                logger.exception("Failed to purge %s", self.what)
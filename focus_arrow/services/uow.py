@@ -1,16 +1,38 @@
 from abc import ABC, abstractmethod
-from typing import List
-from pymongo import MongoClient
+from typing import Callable, Dict, List, Optional, Union
+import logging
+import sqlite3
+import threading
+import time
+import psycopg
+from pymongo import MongoClient, ReadPreference
+from psycopg_pool import ConnectionPool
+from focus_arrow.adapters.bloom import RefreshableBloomFilter
+from focus_arrow.adapters.cache import LruTtlCache
+from focus_arrow.adapters.metrics import REPOSITORY_DURATION
 from focus_arrow.domain.commands import Command
+from focus_arrow.domain.events import Event
 from focus_arrow.services.repositories import (
     AbstractEmailHistoryRepository,
     AbstractVerifiedEmailRepository,
+    BloomFilteredVerifiedEmailRepository,
+    CachedVerifiedEmailRepository,
+    InMemoryEmailHistoryRepository,
+    InMemoryStore,
+    InMemoryVerifiedEmailRepository,
+    InstrumentedRepository,
     MongoEmailHistoryRepository,
     MongoVerifiedEmailRepository,
     PostgreEmailHistoryRepository,
     PostgreVerifiedEmailRepository,
+    RoutingEmailHistoryRepository,
+    RoutingVerifiedEmailRepository,
+    SqliteEmailHistoryRepository,
+    SqliteVerifiedEmailRepository,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class AbstractUnitOfWork(ABC):
     @property
@@ -23,21 +45,50 @@ class AbstractUnitOfWork(ABC):
     def email_history() -> AbstractEmailHistoryRepository:
         raise NotImplementedError
 
+    def __enter__(self) -> "AbstractUnitOfWork":
+        return self
+
+    def __exit__(self, *args) -> None:
+        # Anything that was not explicitly committed is discarded.
+        self.rollback()
+
+    @abstractmethod
+    def commit(self) -> None:
+        raise NotImplementedError
+
     @abstractmethod
-    def add_message(self, message: Command) -> None:
+    def rollback(self) -> None:
         raise NotImplementedError
 
     @abstractmethod
-    def flush_messages(self) -> List[Command]:
+    def add_message(self, message: Union[Command, Event]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def flush_messages(self) -> List[Union[Command, Event]]:
         raise NotImplementedError
 
 
 class MongoUnitOfWork(AbstractUnitOfWork):
     def __init__(self, conn_pool: MongoClient):
-        self._emails = MongoVerifiedEmailRepository(conn_pool)
-        self._email_history = MongoEmailHistoryRepository(conn_pool)
+        self._conn_pool = conn_pool
         self.messages = []
 
+    def __enter__(self) -> "MongoUnitOfWork":
+        self._session = self._conn_pool.start_session()
+        self._session.start_transaction(read_preference=ReadPreference.PRIMARY)
+        self._emails = MongoVerifiedEmailRepository(self._conn_pool, self._session)
+        self._email_history = MongoEmailHistoryRepository(
+            self._conn_pool, self._session
+        )
+        return super().__enter__()
+
+    def __exit__(self, *args) -> None:
+        try:
+            super().__exit__(*args)
+        finally:
+            self._session.end_session()
+
     @property
     def verified_emails(self):
         return self._emails
@@ -46,21 +97,236 @@ class MongoUnitOfWork(AbstractUnitOfWork):
     def email_history(self):
         return self._email_history
 
-    def add_message(self, message: Command) -> None:
+    def commit(self) -> None:
+        self._session.commit_transaction()
+        self._session.start_transaction(read_preference=ReadPreference.PRIMARY)
+
+    def rollback(self) -> None:
+        if self._session.in_transaction:
+            self._session.abort_transaction()
+
+    def add_message(self, message: Union[Command, Event]) -> None:
         self.messages.append(message)
 
-    def flush_messages(self) -> List[Command]:
+    def flush_messages(self) -> List[Union[Command, Event]]:
         ret = self.messages
         self.messages = []
         return ret
 
 
+def create_mongo_client(
+    uri: str,
+    max_pool_size: int = 20,
+    min_pool_size: int = 1,
+    max_idle: float = 300,
+    timeout: float = 10,
+    read_preference: str = "primary",
+    client_class: type = MongoClient,
+) -> MongoClient:
+    # Transactions always read from the primary (see MongoUnitOfWork), so
+    # `read_preference` only affects reads made outside of one. Passing
+    # AsyncMongoClient as `client_class` tunes the async client the same way.
+    return client_class(
+        uri,
+        maxPoolSize=max_pool_size,
+        minPoolSize=min_pool_size,
+        maxIdleTimeMS=int(max_idle * 1000),
+        connectTimeoutMS=int(timeout * 1000),
+        serverSelectionTimeoutMS=int(timeout * 1000),
+        waitQueueTimeoutMS=int(timeout * 1000),
+        readPreference=read_preference,
+        retryWrites=True,
+        w="majority",
+        appname="focus-arrow",
+    )
+
+
+def create_postgre_pool(
+    conn_str: str,
+    min_size: int = 1,
+    max_size: int = 5,
+    max_lifetime: float = 30 * 60,
+    max_idle: float = 5 * 60,
+    timeout: float = 10,
+) -> ConnectionPool:
+    return ConnectionPool(
+        conn_str,
+        min_size=min_size,
+        max_size=max_size,
+        max_lifetime=max_lifetime,
+        max_idle=max_idle,
+        timeout=timeout,
+        check=ConnectionPool.check_connection,
+        name="focus-arrow",
+        open=True,
+    )
+
+
 class PostgreUnitOfWork(AbstractUnitOfWork):
-    def __init__(self, conn_str: str):
-        self._emails = PostgreVerifiedEmailRepository(conn_str)
-        self._email_history = PostgreEmailHistoryRepository(conn_str)
+    def __init__(self, conn_str: str, pool: Optional[ConnectionPool] = None):
+        self.conn_str = conn_str
+        self._pool = pool
+        self.messages = []
+
+    def __enter__(self) -> "PostgreUnitOfWork":
+        if self._pool is not None:
+            self._conn = self._pool.getconn()
+        else:
+            self._conn = psycopg.connect(self.conn_str)
+        self._emails = PostgreVerifiedEmailRepository(self._conn)
+        self._email_history = PostgreEmailHistoryRepository(self._conn)
+        return super().__enter__()
+
+    def __exit__(self, *args) -> None:
+        try:
+            super().__exit__(*args)
+        finally:
+            if self._pool is not None:
+                self._pool.putconn(self._conn)
+            else:
+                self._conn.close()
+
+    @property
+    def verified_emails(self):
+        return self._emails
+
+    @property
+    def email_history(self):
+        return self._email_history
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def rollback(self) -> None:
+        self._conn.rollback()
+
+    def pool_stats(self) -> Dict[str, int]:
+        if self._pool is None:
+            return {}
+        return self._pool.get_stats()
+
+    def add_message(self, message: Union[Command, Event]) -> None:
+        self.messages.append(message)
+
+    def flush_messages(self) -> List[Union[Command, Event]]:
+        ret = self.messages
+        self.messages = []
+        return ret
+
+
+def ping_postgre_pool(pool: ConnectionPool) -> None:
+    with pool.connection() as conn:
+        conn.execute("SELECT 1;")
+
+
+def ping_postgre(conn_str: str, timeout: float = 10) -> None:
+    with psycopg.connect(conn_str, connect_timeout=int(timeout)) as conn:
+        conn.execute("SELECT 1;")
+
+
+class Replica:
+    def __init__(
+        self,
+        name: str,
+        uow_factory: Callable[[], AbstractUnitOfWork],
+        ping: Callable[[], None],
+    ):
+        self.name = name
+        self.uow_factory = uow_factory
+        self.ping = ping
+        self.healthy = True
+        self.latency = 0.0
+
+
+class ReplicaSet:
+    """
+    Read replicas with their health and a moving average of their ping
+    latency, refreshed by `check`. `choose` returns the fastest healthy one.
+    """
+
+    def __init__(self, replicas: List[Replica], smoothing: float = 0.3):
+        self.replicas = replicas
+        self.smoothing = smoothing
+        self._closed = threading.Event()
+        self._checker: Optional[threading.Thread] = None
+
+    def choose(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return min(healthy, key=lambda replica: replica.latency)
+
+    def check(self) -> None:
+        for replica in self.replicas:
+            start = time.perf_counter()
+            try:
+                replica.ping()
+            except Exception:
+                if replica.healthy:
+                    logger.warning("Replica %s failed its health check", replica.name)
+                replica.healthy = False
+                continue
+            latency = time.perf_counter() - start
+            if not replica.healthy:
+                # Start over instead of averaging with the latency from
+                # before the outage.
+                replica.latency = latency
+                replica.healthy = True
+            else:
+                replica.latency += self.smoothing * (latency - replica.latency)
+
+    def start_checking(self, interval: float) -> "ReplicaSet":
+        self._checker = threading.Thread(
+            target=self._check_loop, args=(interval,), name="replica-check", daemon=True
+        )
+        self._checker.start()
+        return self
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._checker is not None:
+            self._checker.join()
+
+    def _check_loop(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            self.check()
+
+
+class RoutingUnitOfWork(AbstractUnitOfWork):
+    """
+    Sends reads to a replica and writes to the primary. Once this unit of
+    work has written anything, and for addresses written within the lifetime
+    of `recent_writes`, reads go to the primary too, so they see those writes
+    regardless of replication lag.
+    """
+
+    def __init__(
+        self,
+        primary_factory: Callable[[], AbstractUnitOfWork],
+        replicas: ReplicaSet,
+        recent_writes: LruTtlCache,
+    ):
+        self._primary_factory = primary_factory
+        self._replicas = replicas
+        self._recent_writes = recent_writes
         self.messages = []
 
+    def __enter__(self) -> "RoutingUnitOfWork":
+        self._primary: Optional[AbstractUnitOfWork] = None
+        self._replica: Optional[AbstractUnitOfWork] = None
+        self._wrote = False
+        self._emails = RoutingVerifiedEmailRepository(self)
+        self._email_history = RoutingEmailHistoryRepository(self)
+        return super().__enter__()
+
+    def __exit__(self, *args) -> None:
+        try:
+            super().__exit__(*args)
+        finally:
+            for uow in (self._replica, self._primary):
+                if uow is not None:
+                    uow.__exit__(*args)
+
     @property
     def verified_emails(self):
         return self._emails
@@ -69,10 +335,267 @@ class PostgreUnitOfWork(AbstractUnitOfWork):
     def email_history(self):
         return self._email_history
 
-    def add_message(self, message: Command) -> None:
+    def reader(self, *addresses: str) -> AbstractUnitOfWork:
+        if self._wrote or any(self._recent_writes.get(a) for a in addresses):
+            return self._open_primary()
+        if self._replica is None:
+            replica = self._replicas.choose()
+            if replica is None:
+                return self._open_primary()
+            try:
+                self._replica = replica.uow_factory().__enter__()
+            except Exception:
+                logger.warning("Replica %s is unavailable", replica.name)
+                replica.healthy = False
+                return self._open_primary()
+        return self._replica
+
+    def writer(self, address: Optional[str] = None) -> AbstractUnitOfWork:
+        self._wrote = True
+        if address is not None:
+            self._recent_writes.set(address, True)
+        return self._open_primary()
+
+    def commit(self) -> None:
+        if self._primary is not None:
+            self._primary.commit()
+        if self._replica is not None:
+            self._replica.rollback()
+
+    def rollback(self) -> None:
+        for uow in (self._replica, self._primary):
+            if uow is not None:
+                uow.rollback()
+
+    def add_message(self, message: Union[Command, Event]) -> None:
         self.messages.append(message)
 
-    def flush_messages(self) -> List[Command]:
+    def flush_messages(self) -> List[Union[Command, Event]]:
         ret = self.messages
         self.messages = []
         return ret
+
+    def _open_primary(self) -> AbstractUnitOfWork:
+        if self._primary is None:
+            self._primary = self._primary_factory().__enter__()
+        return self._primary
+
+
+def connect_sqlite(path: str, busy_timeout: float = 5) -> sqlite3.Connection:
+    # Transactions are started explicitly by the repositories. WAL lets
+    # readers carry on while a write is in progress, and with it
+    # synchronous=NORMAL is still safe against corruption.
+    conn = sqlite3.connect(
+        path,
+        timeout=busy_timeout,
+        isolation_level=None,
+        check_same_thread=False,
+        cached_statements=256,
+    )
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    return conn
+
+
+class SqliteConnections:
+    """
+    Hands every thread its own connection to the database at `path`, opened
+    on first use and kept for the life of the thread.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect_sqlite(self.path, self.busy_timeout)
+        return conn
+
+
+class SqliteUnitOfWork(AbstractUnitOfWork):
+    def __init__(self, connections: SqliteConnections):
+        self._connections = connections
+        self.messages = []
+
+    def __enter__(self) -> "SqliteUnitOfWork":
+        self._conn = self._connections.get()
+        self._emails = SqliteVerifiedEmailRepository(self._conn)
+        self._email_history = SqliteEmailHistoryRepository(self._conn)
+        return super().__enter__()
+
+    @property
+    def verified_emails(self):
+        return self._emails
+
+    @property
+    def email_history(self):
+        return self._email_history
+
+    def commit(self) -> None:
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT;")
+
+    def rollback(self) -> None:
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK;")
+
+    def add_message(self, message: Union[Command, Event]) -> None:
+        self.messages.append(message)
+
+    def flush_messages(self) -> List[Union[Command, Event]]:
+        ret = self.messages
+        self.messages = []
+        return ret
+
+
+class InMemoryUnitOfWork(AbstractUnitOfWork):
+    # Writes are staged in the repositories and only reach the shared store
+    # on commit, so a rollback just drops them. The repositories are cleared
+    # rather than replaced, since wrapping units of work hold on to them.
+    def __init__(self, store: InMemoryStore):
+        self.store = store
+        self.messages = []
+
+    def __enter__(self) -> "InMemoryUnitOfWork":
+        self._reset()
+        return super().__enter__()
+
+    @property
+    def verified_emails(self):
+        return self._emails
+
+    @property
+    def email_history(self):
+        return self._email_history
+
+    def commit(self) -> None:
+        try:
+            self.store.apply(
+                self._emails.added,
+                self._email_history.added,
+                self._email_history.purged,
+            )
+        finally:
+            self._email_history.release_locks()
+        self._clear()
+
+    def rollback(self) -> None:
+        self._email_history.release_locks()
+        self._clear()
+
+    def add_message(self, message: Union[Command, Event]) -> None:
+        self.messages.append(message)
+
+    def flush_messages(self) -> List[Union[Command, Event]]:
+        ret = self.messages
+        self.messages = []
+        return ret
+
+    def _reset(self) -> None:
+        self._emails = InMemoryVerifiedEmailRepository(self.store)
+        self._email_history = InMemoryEmailHistoryRepository(self.store)
+
+    def _clear(self) -> None:
+        self._emails.clear()
+        self._email_history.clear()
+
+
+class WrappingUnitOfWork(AbstractUnitOfWork):
+    # Base for units of work that decorate the repositories of another one.
+    def __init__(self, uow: AbstractUnitOfWork):
+        self._uow = uow
+
+    def __enter__(self) -> "WrappingUnitOfWork":
+        self._uow.__enter__()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._uow.__exit__(*args)
+
+    @property
+    def verified_emails(self):
+        return self._uow.verified_emails
+
+    @property
+    def email_history(self):
+        return self._uow.email_history
+
+    def commit(self) -> None:
+        self._uow.commit()
+
+    def rollback(self) -> None:
+        self._uow.rollback()
+
+    def add_message(self, message: Union[Command, Event]) -> None:
+        self._uow.add_message(message)
+
+    def flush_messages(self) -> List[Union[Command, Event]]:
+        return self._uow.flush_messages()
+
+
+class CachedUnitOfWork(WrappingUnitOfWork):
+    def __init__(
+        self,
+        uow: AbstractUnitOfWork,
+        cache: LruTtlCache,
+        negative_ttl: Optional[float] = None,
+    ):
+        super().__init__(uow)
+        self._cache = cache
+        self._negative_ttl = negative_ttl
+
+    def __enter__(self) -> "CachedUnitOfWork":
+        super().__enter__()
+        self._emails = CachedVerifiedEmailRepository(
+            self._uow.verified_emails, self._cache, self._negative_ttl
+        )
+        return self
+
+    @property
+    def verified_emails(self):
+        return self._emails
+
+
+class BloomFilteredUnitOfWork(WrappingUnitOfWork):
+    def __init__(self, uow: AbstractUnitOfWork, bloom_filter: RefreshableBloomFilter):
+        super().__init__(uow)
+        self._filter = bloom_filter
+
+    def __enter__(self) -> "BloomFilteredUnitOfWork":
+        super().__enter__()
+        self._emails = BloomFilteredVerifiedEmailRepository(
+            self._uow.verified_emails, self._filter
+        )
+        return self
+
+    @property
+    def verified_emails(self):
+        return self._emails
+
+
+class InstrumentedUnitOfWork(WrappingUnitOfWork):
+    # Times opening the unit of work (which is where a connection is checked
+    # out or opened), every repository call and the commit.
+    def __enter__(self) -> "InstrumentedUnitOfWork":
+        with REPOSITORY_DURATION.time("uow", "enter"):
+            super().__enter__()
+        self._emails = InstrumentedRepository(
+            self._uow.verified_emails, "verified_emails"
+        )
+        self._history = InstrumentedRepository(self._uow.email_history, "email_history")
+        return self
+
+    @property
+    def verified_emails(self):
+        return self._emails
+
+    @property
+    def email_history(self):
+        return self._history
+
+    def commit(self) -> None:
+        with REPOSITORY_DURATION.time("uow", "commit"):
+            super().commit()
@@ -0,0 +1,254 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from itertools import islice
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import csv
+import json
+import sqlite3
+import sys
+import time
+import psycopg
+import pymongo
+from pymongo.errors import BulkWriteError
+from focus_arrow.domain.model import address_key, normalize_address
+
+# Rows are plain tuples in the column order below, whatever the backend
+# calls its fields, so a chunk costs no more memory than it has to.
+Row = Tuple
+TABLES: Dict[str, Tuple[str, ...]] = {
+    "verified_emails": ("address",),
+    "verification_email_history": ("address", "sent", "token"),
+}
+
+DUPLICATE_KEY = 11000
+
+
+def chunked(rows: Iterable[Row], size: int) -> Iterator[List[Row]]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def normalize_row(row: Row) -> Row:
+    return (normalize_address(row[0]),) + tuple(row[1:])
+
+
+class AbstractStore(ABC):
+    """
+    Somewhere rows can be streamed out of and written into, one chunk at a
+    time. Rows already present in the target are left as they are, so an
+    interrupted transfer can simply be run again.
+    """
+
+    @abstractmethod
+    def read(self, table: str, chunk_size: int) -> Iterator[Row]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def write(self, table: str, rows: List[Row]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class PostgreStore(AbstractStore):
+    # COPY cannot skip rows that conflict, so each chunk is copied into a
+    # temporary table first and moved over with INSERT ... ON CONFLICT.
+    STAGING = {
+        "verified_emails": """
+            CREATE TEMPORARY TABLE IF NOT EXISTS transfer_verified_emails (
+                email_address text
+            ) ON COMMIT DELETE ROWS;
+        """,
+        "verification_email_history": """
+            CREATE TEMPORARY TABLE IF NOT EXISTS transfer_verification_email_history (
+                address text, sent timestamp, token text
+            ) ON COMMIT DELETE ROWS;
+        """,
+    }
+    COLUMNS = {
+        "verified_emails": "email_address",
+        "verification_email_history": "address, sent, token",
+    }
+
+    def __init__(self, conn: psycopg.Connection):
+        self._conn = conn
+
+    def read(self, table: str, chunk_size: int) -> Iterator[Row]:
+        with self._conn.transaction():
+            with self._conn.cursor(name=f"transfer_{table}") as cur:
+                cur.itersize = chunk_size
+                cur.execute(f"SELECT {self.COLUMNS[table]} FROM {table};")
+                yield from cur
+
+    def write(self, table: str, rows: List[Row]) -> None:
+        columns = self.COLUMNS[table]
+        with self._conn.transaction(), self._conn.cursor() as cur:
+            cur.execute(self.STAGING[table])
+            with cur.copy(f"COPY transfer_{table} ({columns}) FROM STDIN;") as copy:
+                for row in rows:
+                    copy.write_row(row)
+            cur.execute(f"""
+                INSERT INTO {table} ({columns})
+                    SELECT {columns} FROM transfer_{table}
+                    ON CONFLICT DO NOTHING;
+                """)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class MongoStore(AbstractStore):
+    COLLECTIONS = {
+        "verified_emails": "verified-emails",
+        "verification_email_history": "verification-email-history",
+    }
+
+    def __init__(self, client: pymongo.MongoClient):
+        self._client = client
+        self._db = client["Focus-Arrow"]
+
+    def read(self, table: str, chunk_size: int) -> Iterator[Row]:
+        fields = TABLES[table]
+        cursor = self._db[self.COLLECTIONS[table]].find(
+            {}, {"_id": 0, **{field: 1 for field in fields}}
+        )
+        for record in cursor.batch_size(chunk_size):
+            yield tuple(record[field] for field in fields)
+
+    def write(self, table: str, rows: List[Row]) -> None:
+        fields = TABLES[table]
+        documents = [
+            {"key": address_key(row[0]), **dict(zip(fields, row))} for row in rows
+        ]
+        # Unordered, the server carries on past duplicate keys instead of
+        # stopping at the first one, and reports them all at the end.
+        try:
+            self._db[self.COLLECTIONS[table]].insert_many(documents, ordered=False)
+        except BulkWriteError as error:
+            errors = error.details.get("writeErrors", [])
+            if any(e["code"] != DUPLICATE_KEY for e in errors):
+                raise
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class SqliteStore(AbstractStore):
+    COLUMNS = PostgreStore.COLUMNS
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def read(self, table: str, chunk_size: int) -> Iterator[Row]:
+        # sqlite3 steps through the result as it is iterated, so this never
+        # holds more than one row.
+        cursor = self._conn.execute(f"SELECT {self.COLUMNS[table]} FROM {table};")
+        for row in cursor:
+            if table == "verification_email_history":
+                row = (row[0], datetime.fromisoformat(row[1]), row[2])
+            yield row
+
+    def write(self, table: str, rows: List[Row]) -> None:
+        columns = self.COLUMNS[table]
+        if table == "verification_email_history":
+            rows = [(a, sent.isoformat(), token) for a, sent, token in rows]
+        placeholders = ", ".join("?" * len(TABLES[table]))
+        self._conn.execute("BEGIN IMMEDIATE;")
+        try:
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO {table} ({columns}) VALUES ({placeholders});",
+                rows,
+            )
+        except BaseException:
+            self._conn.execute("ROLLBACK;")
+            raise
+        self._conn.execute("COMMIT;")
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class FileStore(AbstractStore):
+    """
+    Newline-delimited JSON or CSV with a header row, one file per table.
+    `path` may contain `{table}`, and `-` stands for stdin or stdout.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._format = "csv" if path.endswith(".csv") else "ndjson"
+        self._outputs: Dict[str, Tuple[IO, Optional[Callable[[Row], None]]]] = {}
+
+    def _open(self, table: str, mode: str) -> IO:
+        if self._path == "-":
+            return sys.stdin if mode == "r" else sys.stdout
+        return open(self._path.format(table=table), mode, newline="")
+
+    def read(self, table: str, chunk_size: int) -> Iterator[Row]:
+        fields = TABLES[table]
+        f = self._open(table, "r")
+        try:
+            if self._format == "csv":
+                records: Iterable[dict] = csv.DictReader(f)
+            else:
+                records = (json.loads(line) for line in f if line.strip())
+            for record in records:
+                row = tuple(record[field] for field in fields)
+                if table == "verification_email_history":
+                    row = (row[0], datetime.fromisoformat(row[1]), row[2])
+                yield row
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+    def write(self, table: str, rows: List[Row]) -> None:
+        if table not in self._outputs:
+            f = self._open(table, "w")
+            writer = None
+            if self._format == "csv":
+                writer = csv.writer(f).writerow
+                writer(TABLES[table])
+            self._outputs[table] = (f, writer)
+        f, writer = self._outputs[table]
+        fields = TABLES[table]
+        for row in rows:
+            if table == "verification_email_history":
+                row = (row[0], row[1].isoformat(), row[2])
+            if writer is not None:
+                writer(row)
+            else:
+                f.write(json.dumps(dict(zip(fields, row))) + "\n")
+        f.flush()
+
+    def close(self) -> None:
+        for f, _ in self._outputs.values():
+            if f is not sys.stdout:
+                f.close()
+        self._outputs.clear()
+
+
+def transfer(
+    source: AbstractStore,
+    target: AbstractStore,
+    table: str,
+    chunk_size: int = 10000,
+    report: Optional[Callable[[str, int, float], None]] = None,
+) -> int:
+    """
+    Streams `table` from `source` into `target` in chunks of `chunk_size`
+    rows, calling `report` after every chunk with the rows copied so far and
+    the seconds elapsed. Returns the number of rows read.
+    """
+    started = time.perf_counter()
+    copied = 0
+    for chunk in chunked(source.read(table, chunk_size), chunk_size):
+        target.write(table, [normalize_row(row) for row in chunk])
+        copied += len(chunk)
+        if report is not None:
+            report(table, copied, time.perf_counter() - started)
+    return copied
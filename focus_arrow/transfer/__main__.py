@@ -0,0 +1,81 @@
+from argparse import ArgumentParser
+from os import getenv
+import sys
+from dotenv import load_dotenv
+import psycopg
+from focus_arrow.bootstrap import mongo_uri
+from focus_arrow.migrations import sqlite as sqlite_migrations
+from focus_arrow.services.uow import connect_sqlite, create_mongo_client
+from focus_arrow.transfer import (
+    TABLES,
+    AbstractStore,
+    FileStore,
+    MongoStore,
+    PostgreStore,
+    SqliteStore,
+    transfer,
+)
+
+
+def open_store(spec: str) -> AbstractStore:
+    """
+    `postgres`, `mongo` and `sqlite` use the same settings as the app, and
+    take a connection string or path after a colon to override them.
+    Anything else is a file path.
+    """
+    backend, _, location = spec.partition(":")
+    if backend == "postgres":
+        conn_str = location or getenv("SUPABASE_CONN_STR")
+        return PostgreStore(psycopg.connect(conn_str, autocommit=True))
+    if backend == "mongo":
+        return MongoStore(create_mongo_client(location or mongo_uri(), timeout=60))
+    if backend == "sqlite":
+        # Like the app does on startup, so a new database can be seeded.
+        conn = connect_sqlite(location or getenv("SQLITE_PATH", "focus_arrow.sqlite3"))
+        sqlite_migrations.migrate(conn)
+        return SqliteStore(conn)
+    return FileStore(spec)
+
+
+def print_progress(table: str, copied: int, elapsed: float) -> None:
+    print(
+        f"{table}: {copied} rows, {copied / max(elapsed, 1e-9):.0f} rows/s",
+        file=sys.stderr,
+    )
+
+
+def main() -> None:
+    parser = ArgumentParser(
+        description="Copy verified emails and their history between backends and files."
+    )
+    parser.add_argument("source", help="postgres, mongo, sqlite or a file path")
+    parser.add_argument("target", help="postgres, mongo, sqlite or a file path")
+    parser.add_argument("--table", choices=["all", *TABLES], default="all")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+    tables = list(TABLES) if args.table == "all" else [args.table]
+    for spec in (args.source, args.target):
+        if (
+            spec.partition(":")[0] not in ("postgres", "mongo", "sqlite")
+            and len(tables) > 1
+            and "{table}" not in spec
+        ):
+            parser.error(f"{spec} needs a {{table}} placeholder or a single --table")
+    load_dotenv(".env")
+    source = open_store(args.source)
+    try:
+        target = open_store(args.target)
+        try:
+            for table in tables:
+                copied = transfer(
+                    source, target, table, args.chunk_size, print_progress
+                )
+                print(f"{table}: copied {copied} rows", file=sys.stderr)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+if __name__ == "__main__":
+    main()
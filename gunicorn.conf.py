@@ -0,0 +1,71 @@
+# Production server settings, picked up by running `gunicorn` from the
+# repository root. Every setting can be overridden on the command line.
+from os import getenv
+import os
+import glob
+import tempfile
+
+import wsgi
+from focus_arrow.bootstrap import rate_limit_backend
+
+
+def _cores() -> int:
+    # Honours CPU affinity, e.g. a container limited to some of the cores.
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+wsgi_app = "wsgi:app"
+bind = getenv("BIND", f"0.0.0.0:{getenv('PORT', '8000')}")
+# The in-memory backend keeps its data in each worker, so workers would not
+# see each other's writes and would overwrite each other's snapshots.
+single_process = getenv("DATABASE_BACKEND", "postgres") == "memory"
+workers = int(getenv("WEB_CONCURRENCY", "0")) or (
+    1 if single_process else 2 * _cores() + 1
+)
+# Requests mostly wait on the database and SMTP, so each worker serves a few
+# at once. Keep POSTGRES_POOL_MAX_SIZE at least this high, and mind that
+# every worker opens its own pools.
+worker_class = "gthread"
+threads = int(getenv("GUNICORN_THREADS", "4"))
+preload_app = True
+timeout = int(getenv("GUNICORN_TIMEOUT", "30"))
+# On SIGHUP, or SIGTERM when stopping, workers get this long to finish the
+# requests they have before being killed.
+graceful_timeout = int(getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(getenv("GUNICORN_KEEPALIVE", "5"))
+max_requests = int(getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+accesslog = getenv("GUNICORN_ACCESS_LOG") or None
+# Every worker keeps its own metrics and writes them to this directory, which
+# /metrics adds up (see MetricsRegistry.share). Workers inherit it from here.
+metrics_dir = getenv("METRICS_DIR") or tempfile.mkdtemp(prefix="focus-arrow-metrics-")
+os.environ["METRICS_DIR"] = metrics_dir
+
+
+def _clear_metrics() -> None:
+    for path in glob.glob(os.path.join(metrics_dir, "*.json")):
+        os.remove(path)
+
+
+def on_starting(server):
+    if single_process and server.cfg.workers > 1:
+        raise RuntimeError("DATABASE_BACKEND=memory only supports a single worker")
+    if server.cfg.workers > 1 and rate_limit_backend() == "memory":
+        server.log.warning(
+            "RATE_LIMIT_BACKEND=memory keeps limits per worker, so with %d "
+            "workers clients get up to %d times the configured limits",
+            server.cfg.workers,
+            server.cfg.workers,
+        )
+    # Counts left over from an earlier run would be added to this one's.
+    _clear_metrics()
+
+
+def post_fork(server, worker):
+    wsgi.init_worker()
+
+
+def on_exit(server):
+    _clear_metrics()
@@ -0,0 +1,59 @@
+"""
+Micro-benchmarks for the handlers, the message bus and the Flask app, all
+running on the in-memory fakes, plus a concurrent load test of the app.
+
+    python -m tests.benchmarks [--save baseline.json] [--compare baseline.json]
+"""
+
+from argparse import ArgumentParser
+import sys
+from tests.benchmarks.harness import compare, load, load_baseline, measure, save
+from tests.benchmarks.scenarios import (
+    app_client,
+    app_scenarios,
+    bus_scenarios,
+    handler_scenarios,
+)
+
+
+def main() -> int:
+    parser = ArgumentParser(prog="python -m tests.benchmarks")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--filter", default="", help="Only run matching names")
+    parser.add_argument("--save", metavar="PATH", help="Store results as baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Baseline to check")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = []
+    scenarios = handler_scenarios() + bus_scenarios() + app_scenarios()
+    for name, operation in scenarios:
+        if args.filter in name:
+            results.append(measure(name, operation, args.iterations))
+            print(results[-1].describe())
+    name = f"load.check_email[{args.concurrency}]"
+    if args.filter in name:
+        client = app_client()
+        results.append(
+            load(
+                name,
+                lambda: client.get("/check-email?email=bob@example.com"),
+                args.concurrency,
+                args.duration,
+            )
+        )
+        print(results[-1].describe())
+
+    if args.save:
+        save(results, args.save)
+    if args.compare:
+        regressions = compare(results, load_baseline(args.compare), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+sys.exit(main())
@@ -0,0 +1,141 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+
+
+class Result(NamedTuple):
+    name: str
+    operations: int
+    throughput: float
+    p50: float
+    p99: float
+    allocated: float
+
+    def describe(self) -> str:
+        return (
+            f"{self.name:<40} {self.throughput:>11.0f} ops/s"
+            f" p50 {self.p50 * 1e6:>9.1f}us p99 {self.p99 * 1e6:>9.1f}us"
+            f" {self.allocated:>9.0f} B/op"
+        )
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def allocated_per_call(operation: Callable[[], None], calls: int) -> float:
+    # Allocation tracking slows everything down, so it gets its own pass
+    # instead of skewing the timed one. What is reported is the average peak
+    # of memory allocated while a single call runs.
+    peaks = 0
+    tracemalloc.start()
+    try:
+        for _ in range(calls):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            operation()
+            peaks += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return peaks / calls
+
+
+def measure(
+    name: str, operation: Callable[[], None], iterations: int, warmup: int = 100
+) -> Result:
+    for _ in range(warmup):
+        operation()
+    samples = []
+    gc.collect()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+    return Result(
+        name,
+        iterations,
+        iterations / elapsed,
+        statistics.median(samples),
+        percentile(samples, 0.99),
+        allocated_per_call(operation, min(iterations, 1000)),
+    )
+
+
+def load(
+    name: str, request: Callable[[], None], concurrency: int, duration: float
+) -> Result:
+    """
+    Calls `request` from `concurrency` threads for `duration` seconds, like
+    that many clients hammering the app at once.
+    """
+    deadline = time.perf_counter() + duration
+
+    def client() -> List[float]:
+        samples = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            request()
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        runs = [executor.submit(client) for _ in range(concurrency)]
+        samples = [sample for run in runs for sample in run.result()]
+    elapsed = time.perf_counter() - started
+    return Result(
+        name,
+        len(samples),
+        len(samples) / elapsed,
+        statistics.median(samples),
+        percentile(samples, 0.99),
+        allocated_per_call(request, 100),
+    )
+
+
+def save(results: List[Result], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump({result.name: result._asdict() for result in results}, f, indent=2)
+
+
+def load_baseline(path: str) -> Dict[str, Result]:
+    with open(path) as f:
+        return {name: Result(**values) for name, values in json.load(f).items()}
+
+
+def compare(
+    results: List[Result], baseline: Dict[str, Result], tolerance: float
+) -> List[str]:
+    """
+    Returns a description of every benchmark whose throughput dropped, or
+    whose p99 latency or allocations grew, by more than `tolerance` against
+    the baseline.
+    """
+    regressions = []
+    for result in results:
+        before: Optional[Result] = baseline.get(result.name)
+        if before is None:
+            continue
+        if result.throughput < before.throughput * (1 - tolerance):
+            regressions.append(
+                f"{result.name}: throughput {before.throughput:.0f}"
+                f" -> {result.throughput:.0f} ops/s"
+            )
+        if result.p99 > before.p99 * (1 + tolerance):
+            regressions.append(
+                f"{result.name}: p99 {before.p99 * 1e6:.1f}"
+                f" -> {result.p99 * 1e6:.1f}us"
+            )
+        if result.allocated > before.allocated * (1 + tolerance):
+            regressions.append(
+                f"{result.name}: allocated {before.allocated:.0f}"
+                f" -> {result.allocated:.0f} B/op"
+            )
+    return regressions
@@ -0,0 +1,153 @@
+from datetime import datetime
+from itertools import count
+from typing import Callable, List, Tuple
+import os
+import tempfile
+from focus_arrow.adapters.rate_limit import RateLimits
+from focus_arrow.app import create_app
+from focus_arrow.domain.commands import (
+    CheckEmailConfirmed,
+    SendTokenToEmail,
+    SendVerificationEmail,
+    VerifyEmail,
+)
+from focus_arrow.domain.model import (
+    VerificationEmailHistoryEntry,
+    VerifiedEmailEntry,
+)
+from focus_arrow.services import handlers
+from focus_arrow.migrations import sqlite as sqlite_migrations
+from focus_arrow.services.repositories import InMemoryStore
+from focus_arrow.services.uow import (
+    InMemoryUnitOfWork,
+    SqliteConnections,
+    SqliteUnitOfWork,
+    connect_sqlite,
+)
+from tests.fakes import (
+    FakeEmailClient,
+    FakeTemplateRenderer,
+    FakeTokenGenerator,
+    FakeUnitOfWork,
+    make_bus,
+)
+
+Scenario = Tuple[str, Callable[[], None]]
+
+
+class NullEmailClient(FakeEmailClient):
+    # FakeEmailClient keeps every email, which would grow for the whole run.
+    def send(self, to_address: str, subject: str, content: str) -> None:
+        pass
+
+
+def verified_uow() -> FakeUnitOfWork:
+    uow = FakeUnitOfWork()
+    uow.verified_emails.add(VerifiedEmailEntry("bob@example.com"))
+    uow.email_history.add_record(
+        VerificationEmailHistoryEntry("bob@example.com", datetime.now(), "TOKEN")
+    )
+    return uow
+
+
+def handler_scenarios() -> List[Scenario]:
+    email_client = NullEmailClient()
+    renderer = FakeTemplateRenderer()
+    uow = verified_uow()
+    addresses = (f"user{i}@example.com" for i in count())
+    return [
+        (
+            "handlers.send_confirmation_email",
+            lambda: handlers.send_confirmation_email(
+                email_client,
+                FakeTokenGenerator(),
+                renderer,
+                FakeUnitOfWork(),
+                SendVerificationEmail(next(addresses)),
+            ),
+        ),
+        (
+            "handlers.verify_email",
+            lambda: handlers.verify_email(uow, VerifyEmail("TOKEN")),
+        ),
+        (
+            "handlers.check_email_confirmed",
+            lambda: handlers.check_email_confirmed(
+                uow, CheckEmailConfirmed("bob@example.com")
+            ),
+        ),
+        (
+            "handlers.send_token_to_email",
+            lambda: handlers.send_token_to_email(
+                email_client,
+                FakeTokenGenerator(),
+                renderer,
+                uow,
+                SendTokenToEmail("bob@example.com"),
+            ),
+        ),
+    ]
+
+
+def sqlite_connections() -> SqliteConnections:
+    path = os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3")
+    conn = connect_sqlite(path)
+    sqlite_migrations.migrate(conn)
+    conn.close()
+    return SqliteConnections(path)
+
+
+def bus_scenarios() -> List[Scenario]:
+    uow = verified_uow()
+    bus = make_bus(lambda: uow, NullEmailClient())
+    fresh_bus = make_bus(FakeUnitOfWork, NullEmailClient())
+    store = InMemoryStore()
+    memory_bus = make_bus(lambda: InMemoryUnitOfWork(store), NullEmailClient())
+    connections = sqlite_connections()
+    sqlite_bus = make_bus(lambda: SqliteUnitOfWork(connections), NullEmailClient())
+    addresses = (f"user{i}@example.com" for i in count())
+    batch = [CheckEmailConfirmed(f"user{i}@example.com") for i in range(100)]
+    return [
+        (
+            "bus.check_email_confirmed",
+            lambda: bus.handle_message(CheckEmailConfirmed("bob@example.com")),
+        ),
+        (
+            "bus.send_verification_email",
+            lambda: fresh_bus.handle_message(SendVerificationEmail(next(addresses))),
+        ),
+        (
+            "bus.send_verification_email[memory]",
+            lambda: memory_bus.handle_message(SendVerificationEmail(next(addresses))),
+        ),
+        (
+            "bus.send_verification_email[sqlite]",
+            lambda: sqlite_bus.handle_message(SendVerificationEmail(next(addresses))),
+        ),
+        ("bus.handle_many[100]", lambda: bus.handle_many(batch)),
+        ("bootstrap", lambda: make_bus(FakeUnitOfWork, NullEmailClient())),
+    ]
+
+
+def app_client():
+    uow = verified_uow()
+    app = create_app(make_bus(lambda: uow, NullEmailClient()), RateLimits())
+    return app.test_client()
+
+
+def app_scenarios() -> List[Scenario]:
+    client = app_client()
+    return [
+        (
+            "app.check_email",
+            lambda: client.get("/check-email?email=bob@example.com"),
+        ),
+        (
+            "app.send_token",
+            lambda: client.get("/send-token?email=bob@example.com"),
+        ),
+        (
+            "app.block_screen",
+            lambda: client.get("/block-screens/default?message=Focus"),
+        ),
+    ]
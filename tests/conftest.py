@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def in_memory_rate_limits(monkeypatch):
+    # The rate limiter follows DATABASE_BACKEND by default, which would make
+    # every app built in the tests reach for Postgres.
+    monkeypatch.setenv("RATE_LIMIT_BACKEND", "memory")
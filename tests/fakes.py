@@ -0,0 +1,213 @@
+from datetime import datetime
+from typing import Iterator, List, Optional
+from focus_arrow import bootstrap
+from focus_arrow.adapters.async_email import AbstractAsyncEmailClient
+from focus_arrow.async_bootstrap import bootstrap_async
+from focus_arrow.adapters.email import AbstractEmailClient
+from focus_arrow.adapters.templates import AbstractTemplateRenderer
+from focus_arrow.adapters.token import AbstractTokenGenerator
+from focus_arrow.domain.commands import Command
+from focus_arrow.domain.model import VerificationEmailHistoryEntry, VerifiedEmailEntry
+from focus_arrow.services.repositories import (
+    AbstractEmailHistoryRepository,
+    AbstractVerifiedEmailRepository,
+)
+from focus_arrow.services.async_repositories import (
+    AbstractAsyncEmailHistoryRepository,
+    AbstractAsyncVerifiedEmailRepository,
+)
+from focus_arrow.services.async_uow import AbstractAsyncUnitOfWork
+from focus_arrow.services.uow import AbstractUnitOfWork
+
+
+class FakeEmailClient(AbstractEmailClient):
+    def __init__(self):
+        self.sent = []
+
+    def send(self, to_address: str, subject: str, content: str) -> None:
+        self.sent.append(
+            {"to_address": to_address, "subject": subject, "content": content}
+        )
+
+
+class FakeTokenGenerator(AbstractTokenGenerator):
+    # Tokens have to be unique, so every call after the first one gets a suffix.
+    def __init__(self):
+        self.generated = 0
+
+    def generate(self) -> str:
+        self.generated += 1
+        return "FAKE_TOKEN" if self.generated == 1 else f"FAKE_TOKEN{self.generated}"
+
+
+class FakeVerifiedEmailRepository(AbstractVerifiedEmailRepository):
+    def __init__(self):
+        self.collection = set()
+
+    def contains(self, entry: VerifiedEmailEntry) -> bool:
+        return entry in self.collection
+
+    def add(self, entry: VerifiedEmailEntry) -> None:
+        self.collection.add(entry)
+
+    def iter_addresses(self) -> Iterator[str]:
+        return (entry.address for entry in self.collection)
+
+
+class CountingVerifiedEmailRepository(FakeVerifiedEmailRepository):
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+
+    def contains(self, entry: VerifiedEmailEntry) -> bool:
+        self.lookups += 1
+        return super().contains(entry)
+
+
+class FakeEmailHistoryRepository(AbstractEmailHistoryRepository):
+    def __init__(self):
+        self.collection = []
+
+    def add_record(self, entry: VerificationEmailHistoryEntry) -> None:
+        self.collection.append(entry)
+
+    def get_record_by_address(
+        self, address: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        for record in self.collection:
+            if record.address == address:
+                return record
+        return None
+
+    def get_record_by_token(
+        self, token: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        for record in self.collection:
+            if record.token == token:
+                return record
+        return None
+
+    def purge_sent_before(self, cutoff: datetime, limit: int) -> int:
+        expired = [record for record in self.collection if record.sent < cutoff]
+        for record in expired[:limit]:
+            self.collection.remove(record)
+        return min(len(expired), limit)
+
+
+class FakeUnitOfWork(AbstractUnitOfWork):
+    def __init__(self):
+        self._emails = FakeVerifiedEmailRepository()
+        self._email_history = FakeEmailHistoryRepository()
+        self.messages = []
+        self.committed = False
+
+    @property
+    def verified_emails(self) -> FakeVerifiedEmailRepository:
+        return self._emails
+
+    @property
+    def email_history(self) -> FakeEmailHistoryRepository:
+        return self._email_history
+
+    def commit(self) -> None:
+        self.committed = True
+
+    def rollback(self) -> None:
+        pass
+
+    def add_message(self, message: Command) -> None:
+        self.messages.append(message)
+
+    def flush_messages(self) -> List[Command]:
+        ret = self.messages
+        self.messages = []
+        return ret
+
+
+class FakeTemplateRenderer(AbstractTemplateRenderer):
+    def render(self, template_name: str, **kwargs):
+        return f"{template_name}: {kwargs}"
+
+
+def make_bus(uow_factory, email_client=None):
+    return bootstrap.bootstrap(
+        uow_factory=uow_factory,
+        email_client=email_client or FakeEmailClient(),
+        pin_generator=FakeTokenGenerator(),
+        template_renderer=FakeTemplateRenderer(),
+    )
+
+
+class FakeAsyncEmailClient(AbstractAsyncEmailClient):
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, to_address: str, subject: str, content: str) -> None:
+        self.sent.append(
+            {"to_address": to_address, "subject": subject, "content": content}
+        )
+
+
+class FakeAsyncVerifiedEmailRepository(AbstractAsyncVerifiedEmailRepository):
+    def __init__(self, repository: FakeVerifiedEmailRepository):
+        self._repository = repository
+
+    async def contains(self, entry: VerifiedEmailEntry) -> bool:
+        return self._repository.contains(entry)
+
+    async def add(self, entry: VerifiedEmailEntry) -> None:
+        self._repository.add(entry)
+
+
+class FakeAsyncEmailHistoryRepository(AbstractAsyncEmailHistoryRepository):
+    def __init__(self, repository: FakeEmailHistoryRepository):
+        self._repository = repository
+
+    async def add_record(self, entry: VerificationEmailHistoryEntry) -> None:
+        self._repository.add_record(entry)
+
+    async def get_record_by_address(
+        self, address: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        return self._repository.get_record_by_address(address)
+
+    async def get_record_by_token(
+        self, token: str
+    ) -> Optional[VerificationEmailHistoryEntry]:
+        return self._repository.get_record_by_token(token)
+
+
+class FakeAsyncUnitOfWork(AbstractAsyncUnitOfWork):
+    def __init__(self):
+        self.sync = FakeUnitOfWork()
+        self._emails = FakeAsyncVerifiedEmailRepository(self.sync.verified_emails)
+        self._email_history = FakeAsyncEmailHistoryRepository(self.sync.email_history)
+
+    @property
+    def verified_emails(self) -> FakeAsyncVerifiedEmailRepository:
+        return self._emails
+
+    @property
+    def email_history(self) -> FakeAsyncEmailHistoryRepository:
+        return self._email_history
+
+    async def commit(self) -> None:
+        self.sync.commit()
+
+    async def rollback(self) -> None:
+        self.sync.rollback()
+
+    def add_message(self, message: Command) -> None:
+        self.sync.add_message(message)
+
+    def flush_messages(self) -> List[Command]:
+        return self.sync.flush_messages()
+
+
+def make_async_bus(uow_factory, email_client=None):
+    return bootstrap_async(
+        uow_factory=uow_factory,
+        email_client=email_client or FakeAsyncEmailClient(),
+        pin_generator=FakeTokenGenerator(),
+        template_renderer=FakeTemplateRenderer(),
+    )
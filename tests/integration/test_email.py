@@ -0,0 +1,103 @@
+import socketserver
+import threading
+import pytest
+from focus_arrow.adapters.email import PooledGmailClient
+
+
+class StandInSmtpHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 localhost ready")
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            verb = line.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250-localhost", "250 AUTH PLAIN LOGIN")
+            elif verb == "AUTH":
+                server.logins += 1
+                self.reply("235 Authenticated")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                server.messages += 1
+                self.reply("250 Queued")
+                if server.drop_after_message:
+                    return
+            elif verb == "NOOP":
+                server.noops += 1
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+    def reply(self, *lines):
+        self.wfile.write("".join(f"{line}\r\n" for line in lines).encode())
+
+
+class StandInSmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInSmtpHandler)
+        self.connections = 0
+        self.logins = 0
+        self.messages = 0
+        self.noops = 0
+        self.drop_after_message = False
+
+
+@pytest.fixture
+def smtp_server():
+    server = StandInSmtpServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(smtp_server, **kwargs) -> PooledGmailClient:
+    return PooledGmailClient(
+        "sender@example.com",
+        "password",
+        host="127.0.0.1",
+        port=smtp_server.server_address[1],
+        use_starttls=False,
+        **kwargs,
+    )
+
+
+def test_reuses_authenticated_connections(smtp_server):
+    client = make_client(smtp_server, size=2, keepalive_interval=None)
+    for _ in range(5):
+        client.send("user@example.com", "Subject", "<p>Content</p>")
+    client.close()
+    assert smtp_server.messages == 5
+    assert smtp_server.connections == 1
+    assert smtp_server.logins == 1
+
+
+def test_reconnects_when_the_server_drops_the_connection(smtp_server):
+    smtp_server.drop_after_message = True
+    client = make_client(smtp_server, size=1, keepalive_interval=None)
+    for _ in range(3):
+        client.send("user@example.com", "Subject", "<p>Content</p>")
+    client.close()
+    assert smtp_server.messages == 3
+    assert smtp_server.connections == 3
+
+
+def test_keeps_idle_connections_alive_with_noop(smtp_server):
+    client = make_client(smtp_server, size=1, keepalive_interval=None)
+    client.send("user@example.com", "Subject", "<p>Content</p>")
+    client.keepalive()
+    client.send("user@example.com", "Subject", "<p>Content</p>")
+    client.close()
+    assert smtp_server.noops == 1
+    assert smtp_server.connections == 1
@@ -0,0 +1,52 @@
+from focus_arrow.app import create_app
+from focus_arrow.domain.model import VerifiedEmailEntry
+from tests.fakes import FakeUnitOfWork, make_bus
+
+
+def test_check_email_uses_the_application_bus():
+    uow = FakeUnitOfWork()
+    client = create_app(make_bus(lambda: uow)).test_client()
+    response = client.get("/check-email?email=bob@example.com")
+    assert response.status_code == 200
+    assert response.get_json() == {"confirmed": False}
+
+
+def test_batch_returns_a_result_per_command():
+    uow = FakeUnitOfWork()
+    uow.verified_emails.add(VerifiedEmailEntry("bob@example.com"))
+    client = create_app(make_bus(lambda: uow)).test_client()
+    response = client.post(
+        "/batch",
+        json={
+            "commands": [
+                {"type": "CheckEmailConfirmed", "address": "bob@example.com"},
+                {"type": "CheckEmailConfirmed", "address": "alice@example.com"},
+                {"type": "SendTokenToEmail", "address": "alice@example.com"},
+                {"type": "DropTables"},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    assert response.get_json()["results"] == [
+        {"result": True},
+        {"result": False},
+        {"error": "Unknown command type"},
+        {"error": "Unknown command type"},
+    ]
+
+
+def test_block_screen_supports_conditional_requests():
+    client = create_app(make_bus(FakeUnitOfWork)).test_client()
+    response = client.get("/block-screens/minimalist?message=Focus")
+    assert response.status_code == 200
+    assert b"Focus" in response.data
+    assert "public" in response.headers["Cache-Control"]
+    etag = response.headers["ETag"]
+    response = client.get(
+        "/block-screens/minimalist?message=Focus", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    response = client.get(
+        "/block-screens/minimalist?message=Other", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from focus_arrow.async_app import create_async_app
+from focus_arrow.async_bootstrap import _build_async_uow_factory
+from focus_arrow.domain.commands import (
+    SendTokenToEmail,
+    SendVerificationEmail,
+    VerifyEmail,
+)
+from focus_arrow.domain.model import EmailNotVerified
+from focus_arrow.services.async_uow import AsyncMongoUnitOfWork
+from focus_arrow.domain.events import EmailVerified
+from tests.fakes import (
+    FakeAsyncEmailClient,
+    FakeAsyncUnitOfWork,
+    FakeUnitOfWork,
+    make_async_bus,
+    make_bus,
+)
+
+
+def test_async_bus_verifies_email_and_sends_token():
+    uow = FakeAsyncUnitOfWork()
+    email_client = FakeAsyncEmailClient()
+    bus = make_async_bus(lambda: uow, email_client)
+
+    async def scenario():
+        await bus.handle_message(SendVerificationEmail("bob@example.com"))
+        await bus.handle_message(VerifyEmail("FAKE_TOKEN"))
+        return await bus.handle_message(SendTokenToEmail("bob@example.com"))
+
+    token = asyncio.run(scenario())
+    assert token == "FAKE_TOKEN2"
+    assert len(email_client.sent) == 2
+    assert uow.sync.committed
+
+
+def test_async_bus_rejects_unverified_email():
+    bus = make_async_bus(FakeAsyncUnitOfWork)
+    with pytest.raises(EmailNotVerified):
+        asyncio.run(bus.handle_message(SendTokenToEmail("bob@example.com")))
+
+
+def test_async_app_checks_email():
+    app = create_async_app(make_async_bus(FakeAsyncUnitOfWork))
+
+    async def request():
+        response = await app.test_client().get("/check-email?email=bob@example.com")
+        return response.status_code, await response.get_json()
+
+    assert asyncio.run(request()) == (200, {"confirmed": False})
+
+
+def test_async_bootstrap_follows_the_database_backend(monkeypatch):
+    monkeypatch.setenv("DATABASE_BACKEND", "mongo")
+    monkeypatch.setenv("MONGODB_URI", "mongodb://localhost:27017")
+    assert _build_async_uow_factory().func is AsyncMongoUnitOfWork
+    monkeypatch.setenv("DATABASE_BACKEND", "memory")
+    with pytest.raises(ValueError):
+        _build_async_uow_factory()
+
+
+def test_async_bus_handles_the_same_events_as_the_sync_one():
+    bus = make_async_bus(FakeAsyncUnitOfWork)
+    assert bus.event_handlers == make_bus(FakeUnitOfWork).event_handlers
+    assert bus.event_handlers[EmailVerified]
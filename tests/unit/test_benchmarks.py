@@ -0,0 +1,14 @@
+from tests.benchmarks.harness import Result, compare, measure
+
+
+def test_measures_an_operation():
+    result = measure("noop", lambda: None, iterations=100, warmup=0)
+    assert result.operations == 100
+    assert 0 < result.p50 <= result.p99
+
+
+def test_reports_regressions_against_the_baseline():
+    baseline = {"bus": Result("bus", 100, 1000, 0.001, 0.002, 100)}
+    slower = Result("bus", 100, 700, 0.001, 0.002, 100)
+    assert compare([slower], baseline, 0.2) == ["bus: throughput 1000 -> 700 ops/s"]
+    assert compare([baseline["bus"]], baseline, 0.2) == []
@@ -0,0 +1,74 @@
+from focus_arrow.adapters.bloom import BloomFilter, RefreshableBloomFilter
+from focus_arrow.domain.model import VerifiedEmailEntry
+from focus_arrow.services.repositories import BloomFilteredVerifiedEmailRepository
+from tests.fakes import CountingVerifiedEmailRepository
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    addresses = [f"user{i}@example.com" for i in range(1000)]
+    for address in addresses:
+        bloom.add(address)
+    assert all(address in bloom for address in addresses)
+
+
+def test_bloom_filter_keeps_false_positive_rate_near_target():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"user{i}@example.com")
+    false_positives = sum(f"other{i}@example.org" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_unbuilt_filter_lets_every_lookup_through():
+    bloom = RefreshableBloomFilter(capacity=100)
+    assert not bloom.ready
+    assert bloom.might_contain("bob@example.com")
+
+
+def test_rebuild_keeps_items_added_while_loading():
+    bloom = RefreshableBloomFilter(capacity=100)
+
+    def load():
+        yield "bob@example.com"
+        bloom.add("alice@example.com")
+
+    bloom.rebuild(load())
+    assert bloom.might_contain("bob@example.com")
+    assert bloom.might_contain("alice@example.com")
+
+
+def test_skips_the_repository_for_unknown_addresses_in_batches():
+    inner = CountingVerifiedEmailRepository()
+    bloom = RefreshableBloomFilter(capacity=100)
+    bloom.rebuild([])
+    repo = BloomFilteredVerifiedEmailRepository(inner, bloom)
+    assert repo.contains_many([VerifiedEmailEntry("bob@example.com")]) == set()
+    assert inner.lookups == 0
+    repo.add(VerifiedEmailEntry("bob@example.com"))
+    assert repo.contains_many([VerifiedEmailEntry("bob@example.com")]) == {
+        "bob@example.com"
+    }
+    assert inner.lookups == 1
+
+
+def test_skips_the_repository_for_unknown_addresses_when_polled():
+    inner = CountingVerifiedEmailRepository()
+    bloom = RefreshableBloomFilter(capacity=100)
+    bloom.rebuild([])
+    repo = BloomFilteredVerifiedEmailRepository(inner, bloom)
+    assert not repo.contains_eventually(VerifiedEmailEntry("bob@example.com"))
+    assert inner.lookups == 0
+    repo.add(VerifiedEmailEntry("bob@example.com"))
+    assert repo.contains_eventually(VerifiedEmailEntry("bob@example.com"))
+    assert inner.lookups == 1
+
+
+def test_single_lookups_find_addresses_verified_by_other_workers():
+    inner = CountingVerifiedEmailRepository()
+    bloom = RefreshableBloomFilter(capacity=100)
+    bloom.rebuild([])
+    inner.add(VerifiedEmailEntry("bob@example.com"))
+    repo = BloomFilteredVerifiedEmailRepository(inner, bloom)
+    assert repo.contains(VerifiedEmailEntry("bob@example.com"))
+    assert bloom.might_contain("bob@example.com")
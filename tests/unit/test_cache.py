@@ -0,0 +1,50 @@
+import time
+from focus_arrow.adapters.cache import LruTtlCache
+from focus_arrow.domain.model import VerifiedEmailEntry
+from focus_arrow.services.repositories import CachedVerifiedEmailRepository
+from tests.fakes import CountingVerifiedEmailRepository
+
+
+def test_lru_ttl_cache_evicts_least_recently_used():
+    cache = LruTtlCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_lru_ttl_cache_expires_entries():
+    cache = LruTtlCache(maxsize=10, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_caches_verified_addresses():
+    inner = CountingVerifiedEmailRepository()
+    inner.add(VerifiedEmailEntry("bob@example.com"))
+    repo = CachedVerifiedEmailRepository(inner, LruTtlCache(100))
+    for _ in range(5):
+        assert repo.contains(VerifiedEmailEntry("bob@example.com"))
+    assert inner.lookups == 1
+
+
+def test_does_not_cache_unverified_addresses_by_default():
+    inner = CountingVerifiedEmailRepository()
+    repo = CachedVerifiedEmailRepository(inner, LruTtlCache(100))
+    repo.contains(VerifiedEmailEntry("bob@example.com"))
+    repo.contains(VerifiedEmailEntry("bob@example.com"))
+    assert inner.lookups == 2
+
+
+def test_add_invalidates_cached_negative_answers():
+    inner = CountingVerifiedEmailRepository()
+    repo = CachedVerifiedEmailRepository(inner, LruTtlCache(100), negative_ttl=60)
+    assert not repo.contains(VerifiedEmailEntry("bob@example.com"))
+    assert not repo.contains(VerifiedEmailEntry("bob@example.com"))
+    assert inner.lookups == 1
+    repo.add(VerifiedEmailEntry("bob@example.com"))
+    assert repo.contains(VerifiedEmailEntry("bob@example.com"))
@@ -0,0 +1,16 @@
+from email.mime import text
+from focus_arrow.adapters.email import add_static_body, html_part
+
+
+def test_static_bodies_reuse_their_encoding_in_fresh_parts():
+    body = "<p>Focus Arrow was uninstalled</p>"
+    add_static_body(body)
+    first, second = html_part(body), html_part(body)
+    assert first is not second
+    first["X-Test"] = "1"
+    assert "X-Test" not in second
+    assert second.as_string() == text.MIMEText(body, "html", "utf-8").as_string()
+
+
+def test_other_bodies_are_built_per_message():
+    assert html_part("<p>TOKEN</p>") is not html_part("<p>TOKEN</p>")
@@ -1,9 +1,5 @@
-from typing import Literal, List, Optional
-from focus_arrow.adapters.email import AbstractEmailClient
-from focus_arrow.adapters.templates import AbstractTemplateRenderer
-from focus_arrow.adapters.token import AbstractTokenGenerator
+from datetime import datetime
 from focus_arrow.domain.commands import (
-    Command,
     VerifyEmail,
     SendTokenToEmail,
     SendVerificationEmail,
@@ -12,96 +8,24 @@ from focus_arrow.domain.model import (
     ConfirmationEmailRateExceeded,
     ConfirmationLinkNotValid,
     EmailNotVerified,
+    TokenSpaceExhausted,
     VerificationEmailHistoryEntry,
     VerifiedEmailEntry,
 )
 from focus_arrow.services import handlers
-from focus_arrow.services.repositories import (
-    AbstractEmailHistoryRepository,
-    AbstractVerifiedEmailRepository,
+from focus_arrow.services.repositories import InMemoryStore
+from focus_arrow.services.uow import InMemoryUnitOfWork
+from tests.fakes import (
+    FakeEmailClient,
+    FakeTemplateRenderer,
+    FakeTokenGenerator,
+    FakeUnitOfWork,
+    make_bus,
 )
-from focus_arrow.services.uow import AbstractUnitOfWork
+from functools import partial
 import pytest
 
 
-class FakeEmailClient(AbstractEmailClient):
-    def __init__(self):
-        self.sent = []
-
-    def send(self, to_address: str, subject: str, content: str) -> None:
-        self.sent.append(
-            {"to_address": to_address, "subject": subject, "content": content}
-        )
-
-
-class FakeTokenGenerator(AbstractTokenGenerator):
-    def generate(self) -> Literal["FAKE_TOKEN"]:
-        return "FAKE_TOKEN"
-
-
-class FakeVerifiedEmailRepository(AbstractVerifiedEmailRepository):
-    def __init__(self):
-        self.collection = set()
-
-    def contains(self, entry: VerifiedEmailEntry) -> bool:
-        return entry in self.collection
-
-    def add(self, entry: VerifiedEmailEntry) -> None:
-        self.collection.add(entry)
-
-
-class FakeEmailHistoryRepository(AbstractEmailHistoryRepository):
-    def __init__(self):
-        self.collection = []
-
-    def add_record(self, entry: VerificationEmailHistoryEntry) -> None:
-        self.collection.append(entry)
-
-    def get_record_by_address(
-        self, address: str
-    ) -> Optional[VerificationEmailHistoryEntry]:
-        for record in self.collection:
-            if record.address == address:
-                return record
-        return None
-
-    def get_record_by_token(
-        self, token: str
-    ) -> Optional[VerificationEmailHistoryEntry]:
-        for record in self.collection:
-            if record.token == token:
-                return record
-        return None
-
-
-class FakeUnitOfWork(AbstractUnitOfWork):
-    def __init__(self):
-        self._emails = FakeVerifiedEmailRepository()
-        self._email_history = FakeEmailHistoryRepository()
-        self.messages = []
-
-    @property
-    def verified_emails(self) -> FakeVerifiedEmailRepository:
-        return self._emails
-
-    @property
-    def email_history(self) -> FakeEmailHistoryRepository:
-        return self._email_history
-
-    def add_message(self, message: Command) -> None:
-        self.messages.append(message)
-
-    def flush_messages(self) -> List[Command]:
-        ret = self.messages
-        self.messages = []
-        return ret
-
-
-class FakeTemplateRenderer(AbstractTemplateRenderer):
-    def render(self, template_name: str, **kwargs):
-        return f"{template_name}: {kwargs}"
-
-
 def test_sends_confirmation_email():
     email_client = FakeEmailClient()
     token_generator = FakeTokenGenerator()
@@ -204,7 +128,7 @@ def test_sends_code_to_verified_email():
         SendTokenToEmail("bob@example.com"),
     )
     assert "bob@example.com" == email_client.sent[0]["to_address"]
-    assert code in email_client.sent[0]["content"]
+    assert code in email_client.sent[1]["content"]
 
 
 def test_does_not_send_code_to_unverified_email():
@@ -221,3 +145,92 @@ def test_does_not_send_code_to_unverified_email():
             SendTokenToEmail("bob@example.com"),
         )
     assert len(email_client.sent) == 0
+
+
+def test_confirmation_token_is_not_reused():
+    email_client = FakeEmailClient()
+    template_renderer = FakeTemplateRenderer()
+    uow = FakeUnitOfWork()
+    uow.email_history.add_record(
+        VerificationEmailHistoryEntry("bob@example.com", datetime.now(), "FAKE_TOKEN")
+    )
+    handlers.send_confirmation_email(
+        email_client,
+        FakeTokenGenerator(),
+        template_renderer,
+        uow,
+        SendVerificationEmail("alice@example.com"),
+    )
+    assert "FAKE_TOKEN2" in email_client.sent[0]["content"]
+
+
+def test_addresses_are_matched_regardless_of_case_and_whitespace():
+    uow = FakeUnitOfWork()
+    email_client = FakeEmailClient()
+    token_generator = FakeTokenGenerator()
+    template_renderer = FakeTemplateRenderer()
+    handlers.send_confirmation_email(
+        email_client,
+        token_generator,
+        template_renderer,
+        uow,
+        SendVerificationEmail(" Bob@Example.COM"),
+    )
+    handlers.verify_email(uow, VerifyEmail("FAKE_TOKEN"))
+    assert email_client.sent[0]["to_address"] == "bob@example.com"
+    assert uow.verified_emails.contains(VerifiedEmailEntry("BOB@example.com "))
+    handlers.send_token_to_email(
+        email_client,
+        token_generator,
+        template_renderer,
+        uow,
+        SendTokenToEmail("bob@EXAMPLE.com"),
+    )
+    assert email_client.sent[1]["to_address"] == "bob@example.com"
+
+
+def test_gives_up_when_the_generator_keeps_repeating_tokens():
+    class ConstantTokenGenerator(FakeTokenGenerator):
+        def generate(self) -> str:
+            return "FAKE_TOKEN"
+
+    uow = FakeUnitOfWork()
+    email_client = FakeEmailClient()
+    template_renderer = FakeTemplateRenderer()
+    token_generator = ConstantTokenGenerator()
+    handlers.send_confirmation_email(
+        email_client,
+        token_generator,
+        template_renderer,
+        uow,
+        SendVerificationEmail("bob@example.com"),
+    )
+    with pytest.raises(TokenSpaceExhausted):
+        handlers.send_confirmation_email(
+            email_client,
+            token_generator,
+            template_renderer,
+            uow,
+            SendVerificationEmail("alice@example.com"),
+        )
+    assert len(email_client.sent) == 1
+
+
+def test_address_can_ask_again_when_the_email_cannot_be_sent():
+    class FailingOnceEmailClient(FakeEmailClient):
+        def __init__(self):
+            super().__init__()
+            self.failed = False
+
+        def send(self, to_address: str, subject: str, content: str) -> None:
+            if not self.failed:
+                self.failed = True
+                raise ConnectionError("SMTP server unavailable")
+            super().send(to_address, subject, content)
+
+    email_client = FailingOnceEmailClient()
+    bus = make_bus(partial(InMemoryUnitOfWork, InMemoryStore()), email_client)
+    with pytest.raises(ConnectionError):
+        bus.handle_message(SendVerificationEmail("bob@example.com"))
+    bus.handle_message(SendVerificationEmail("bob@example.com"))
+    assert len(email_client.sent) == 1
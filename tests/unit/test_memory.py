@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from focus_arrow.domain.model import VerificationEmailHistoryEntry, VerifiedEmailEntry
+from focus_arrow.services.repositories import InMemoryStore
+from focus_arrow.services.retention import purge_expired_history
+from focus_arrow.services.uow import InMemoryUnitOfWork, InstrumentedUnitOfWork
+
+
+def test_changes_are_visible_after_commit_only():
+    store = InMemoryStore()
+    with InMemoryUnitOfWork(store) as uow:
+        uow.verified_emails.add(VerifiedEmailEntry("bob@example.com"))
+        assert uow.verified_emails.contains(VerifiedEmailEntry("bob@example.com"))
+    with InMemoryUnitOfWork(store) as uow:
+        assert not uow.verified_emails.contains(VerifiedEmailEntry("bob@example.com"))
+        uow.verified_emails.add(VerifiedEmailEntry("bob@example.com"))
+        uow.commit()
+    with InMemoryUnitOfWork(store) as uow:
+        assert uow.verified_emails.contains(VerifiedEmailEntry("bob@example.com"))
+
+
+def test_history_is_indexed_by_address_and_token():
+    store = InMemoryStore()
+    now = datetime.now()
+    with InMemoryUnitOfWork(store) as uow:
+        uow.email_history.add_record(
+            VerificationEmailHistoryEntry("bob@example.com", now, "OLD")
+        )
+        uow.commit()
+        uow.email_history.add_record(
+            VerificationEmailHistoryEntry("bob@example.com", now, "NEW")
+        )
+        uow.commit()
+    with InMemoryUnitOfWork(store) as uow:
+        assert uow.email_history.get_record_by_token("OLD") is None
+        assert uow.email_history.get_record_by_address("bob@example.com").token == "NEW"
+
+
+def test_purges_old_history():
+    store = InMemoryStore()
+    with InMemoryUnitOfWork(store) as uow:
+        for i, days in enumerate((0, 2, 3)):
+            sent = datetime.now() - timedelta(days=days)
+            uow.email_history.add_record(
+                VerificationEmailHistoryEntry(f"user{i}@example.com", sent, f"T{i}")
+            )
+        uow.commit()
+    assert purge_expired_history(lambda: InMemoryUnitOfWork(store), chunk_size=1) == 2
+    assert list(store.history_by_token) == ["T0"]
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    store = InMemoryStore(path)
+    with InMemoryUnitOfWork(store) as uow:
+        uow.verified_emails.add(VerifiedEmailEntry("bob@example.com"))
+        uow.email_history.add_record(
+            VerificationEmailHistoryEntry("bob@example.com", datetime.now(), "T")
+        )
+        uow.commit()
+    store.close()
+    with InMemoryUnitOfWork(InMemoryStore(path)) as uow:
+        assert uow.verified_emails.contains(VerifiedEmailEntry("bob@example.com"))
+        assert uow.email_history.get_record_by_token("T").address == "bob@example.com"
+
+
+def test_commits_twice_through_a_wrapping_unit_of_work():
+    store = InMemoryStore()
+    with InstrumentedUnitOfWork(InMemoryUnitOfWork(store)) as uow:
+        uow.verified_emails.add(VerifiedEmailEntry("a@example.com"))
+        uow.commit()
+        uow.verified_emails.add(VerifiedEmailEntry("b@example.com"))
+        uow.commit()
+    assert store.verified == {"a@example.com", "b@example.com"}
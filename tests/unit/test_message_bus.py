@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+from focus_arrow.domain.commands import CheckEmailConfirmed, SendVerificationEmail
+from focus_arrow.domain.events import VerificationEmailSent
+from focus_arrow.domain.model import ConfirmationEmailRateExceeded, VerifiedEmailEntry
+from tests.fakes import FakeEmailClient, FakeUnitOfWork, make_bus
+import pytest
+
+
+def test_creates_a_unit_of_work_per_message():
+    created = []
+
+    def uow_factory():
+        created.append(FakeUnitOfWork())
+        return created[-1]
+
+    bus = make_bus(uow_factory)
+    bus.handle_message(CheckEmailConfirmed("bob@example.com"))
+    bus.handle_message(CheckEmailConfirmed("alice@example.com"))
+    assert len(created) == 2
+
+
+def test_reuses_adapters_between_messages():
+    uow = FakeUnitOfWork()
+    email_client = FakeEmailClient()
+    bus = make_bus(lambda: uow, email_client)
+    bus.handle_message(SendVerificationEmail("bob@example.com"))
+    bus.handle_message(SendVerificationEmail("alice@example.com"))
+    assert [email["to_address"] for email in email_client.sent] == [
+        "bob@example.com",
+        "alice@example.com",
+    ]
+
+
+def test_commits_after_handling_a_command():
+    uow = FakeUnitOfWork()
+    bus = make_bus(lambda: uow)
+    bus.handle_message(SendVerificationEmail("bob@example.com"))
+    assert uow.committed
+
+
+def test_does_not_commit_when_the_handler_fails():
+    uow = FakeUnitOfWork()
+    uow.verified_emails.add(VerifiedEmailEntry("bob@example.com"))
+    bus = make_bus(lambda: uow)
+    with pytest.raises(ConfirmationEmailRateExceeded):
+        bus.handle_message(SendVerificationEmail("bob@example.com"))
+    assert not uow.committed
+
+
+def test_handles_many_commands_in_one_unit_of_work_per_type():
+    created = []
+
+    def uow_factory():
+        if not created:
+            created.append(FakeUnitOfWork())
+            created[0].verified_emails.add(VerifiedEmailEntry("bob@example.com"))
+        return created[0]
+
+    bus = make_bus(uow_factory)
+    results = bus.handle_many(
+        [
+            CheckEmailConfirmed("bob@example.com"),
+            CheckEmailConfirmed("alice@example.com"),
+            SendVerificationEmail("bob@example.com"),
+        ]
+    )
+    assert [result.result for result in results[:2]] == [True, False]
+    assert isinstance(results[2].error, ConfirmationEmailRateExceeded)
+
+
+def test_dispatches_events_to_every_subscribed_handler():
+    uow = FakeUnitOfWork()
+    bus = make_bus(lambda: uow)
+    seen = []
+    bus.executor = None
+    bus.event_handlers = {
+        VerificationEmailSent: [seen.append, lambda event: seen.append("second")]
+    }
+    bus.handle_message(SendVerificationEmail("bob@example.com"))
+    assert seen == [VerificationEmailSent("bob@example.com"), "second"]
+
+
+def test_event_handler_failures_do_not_fail_the_command():
+    uow = FakeUnitOfWork()
+    bus = make_bus(lambda: uow)
+
+    def broken_handler(event):
+        raise RuntimeError("Metrics backend is down")
+
+    bus.event_handlers = {VerificationEmailSent: [broken_handler]}
+    bus.executor = ThreadPoolExecutor(2)
+    bus.handle_message(SendVerificationEmail("bob@example.com"))
+    bus.executor.shutdown(wait=True)
+    assert uow.committed
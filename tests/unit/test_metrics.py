@@ -0,0 +1,58 @@
+import logging
+from focus_arrow.adapters.metrics import (
+    REPOSITORY_DURATION,
+    Histogram,
+    MetricsRegistry,
+)
+from focus_arrow.app import create_app
+from focus_arrow.domain.model import VerifiedEmailEntry
+from focus_arrow.services.uow import InstrumentedUnitOfWork
+from tests.fakes import FakeUnitOfWork, make_bus
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", ("kind",), (0.1, 1))
+    histogram.observe(0.05, "a")
+    histogram.observe(0.5, "a")
+    histogram.observe(5, "a")
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{kind="a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{kind="a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{kind="a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{kind="a"} 3' in lines
+
+
+def test_metrics_endpoint_reports_commands_and_requests():
+    client = create_app(make_bus(FakeUnitOfWork)).test_client()
+    client.get("/check-email?email=bob@example.com")
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'command="CheckEmailConfirmed"' in body
+    assert 'endpoint="check_email_confirmed",status="200"' in body
+
+
+def test_traces_requests_when_enabled(monkeypatch, caplog):
+    monkeypatch.setenv("TRACE_REQUESTS", "1")
+    client = create_app(make_bus(FakeUnitOfWork)).test_client()
+    with caplog.at_level(logging.INFO, logger="focus_arrow.trace"):
+        client.get("/check-email?email=bob@example.com")
+    assert "GET /check-email" in caplog.text
+    assert "CheckEmailConfirmed=" in caplog.text
+
+
+def test_instrumented_unit_of_work_times_repository_calls():
+    with InstrumentedUnitOfWork(FakeUnitOfWork()) as uow:
+        uow.verified_emails.add(VerifiedEmailEntry("bob@example.com"))
+        assert uow.verified_emails.contains(VerifiedEmailEntry("bob@example.com"))
+        uow.commit()
+    lines = REPOSITORY_DURATION.render()
+    assert any('method="contains"' in line and "_count" in line for line in lines)
+    assert any('repository="uow",method="commit"' in line for line in lines)
+
+
+def test_shared_registries_report_every_worker(tmp_path):
+    worker, other_worker = MetricsRegistry(), MetricsRegistry()
+    for registry, path in ((worker, "1.json"), (other_worker, "2.json")):
+        registry.histogram("latency_seconds", "Latency.").observe(0.5)
+        registry._directory, registry._path = str(tmp_path), str(tmp_path / path)
+    other_worker.dump()
+    assert "latency_seconds_count 2" in worker.render()
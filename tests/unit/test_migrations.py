@@ -0,0 +1,83 @@
+from pymongo import DeleteOne
+from focus_arrow.domain.model import address_key
+from focus_arrow.migrations import mongo, postgres, sqlite
+
+
+def test_postgres_migrations_are_numbered_consecutively():
+    versions = [version for version, _, _ in postgres.load_migrations()]
+    assert versions == list(range(1, len(versions) + 1))
+
+
+def test_mongo_migrations_are_numbered_consecutively():
+    versions = [version for version, _, _ in mongo.MIGRATIONS]
+    assert versions == list(range(1, len(versions) + 1))
+
+
+def test_sqlite_migrations_are_numbered_consecutively():
+    versions = [version for version, _, _ in sqlite.MIGRATIONS]
+    assert versions == list(range(1, len(versions) + 1))
+
+
+class FakeCursor(list):
+    def sort(self, field, direction):
+        return FakeCursor(sorted(self, key=lambda r: r[field], reverse=direction < 0))
+
+    def batch_size(self, size):
+        return self
+
+
+class FakeCollection:
+    def __init__(self, records):
+        self.records = {record["_id"]: record for record in records}
+        self.indexes = {"_id_": {}, "old_address_key": {}}
+
+    def find(self, query, projection):
+        return FakeCursor(dict(record) for record in self.records.values())
+
+    def bulk_write(self, requests, ordered):
+        for request in requests:
+            _id = request._filter["_id"]
+            if isinstance(request, DeleteOne):
+                del self.records[_id]
+            else:
+                self.records[_id].update(request._doc["$set"])
+
+    def create_index(self, field, name, **kwargs):
+        self.indexes[name] = kwargs
+
+    def index_information(self):
+        return self.indexes
+
+    def drop_index(self, name):
+        del self.indexes[name]
+
+
+def test_mongo_address_keys_can_be_set_again_after_an_interruption():
+    collection = FakeCollection(
+        [
+            {"_id": 1, "address": "Bob@Example.com", "sent": 1},
+            {"_id": 2, "address": " bob@example.com", "sent": 2},
+            {"_id": 3, "address": "alice@example.com", "sent": 3},
+        ]
+    )
+    for _ in range(2):
+        mongo.merge_duplicates(collection, sort="sent")
+        mongo.set_keys(collection, "key_key", "old_address_key")
+    assert collection.records == {
+        2: {
+            "_id": 2,
+            "address": "bob@example.com",
+            "sent": 2,
+            "key": address_key("bob@example.com"),
+        },
+        3: {
+            "_id": 3,
+            "address": "alice@example.com",
+            "sent": 3,
+            "key": address_key("alice@example.com"),
+        },
+    }
+    assert collection.indexes == {
+        "_id_": {},
+        "key_key": {"unique": True, "sparse": True},
+    }
@@ -0,0 +1,51 @@
+from pymongo import ReadPreference
+from focus_arrow.domain.model import VerifiedEmailEntry, address_key
+from focus_arrow.services.repositories import MongoVerifiedEmailRepository
+from focus_arrow.services.uow import create_mongo_client
+
+
+class RecordingCollection:
+    def __init__(self):
+        self.calls = []
+
+    def find_one(self, *args, **kwargs):
+        self.calls.append(("find_one", args))
+        return None
+
+    def update_one(self, *args, **kwargs):
+        self.calls.append(("update_one", args, kwargs["upsert"]))
+
+
+def test_client_is_tuned_from_settings():
+    client = create_mongo_client(
+        "mongodb://localhost:27017",
+        max_pool_size=7,
+        read_preference="secondaryPreferred",
+    )
+    try:
+        assert client.options.pool_options.max_pool_size == 7
+        assert client.read_preference == ReadPreference.SECONDARY_PREFERRED
+    finally:
+        client.close()
+
+
+def test_verified_emails_use_covered_lookups_and_single_upserts():
+    client = create_mongo_client("mongodb://localhost:27017")
+    repository = MongoVerifiedEmailRepository(client)
+    client.close()
+    repository._collection = RecordingCollection()
+    repository.add(VerifiedEmailEntry("bob@example.com"))
+    repository.contains(VerifiedEmailEntry("Bob@Example.com"))
+    key = address_key("bob@example.com")
+    assert len(key) == 16
+    assert repository._collection.calls == [
+        (
+            "update_one",
+            (
+                {"key": key},
+                {"$setOnInsert": {"address": "bob@example.com"}},
+            ),
+            True,
+        ),
+        ("find_one", ({"key": key}, {"_id": 0, "key": 1})),
+    ]
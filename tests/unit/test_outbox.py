@@ -0,0 +1,87 @@
+import time
+from focus_arrow import bootstrap
+from focus_arrow.adapters.email import QueuedEmailClient
+from focus_arrow.adapters.outbox import InMemoryOutbox, OutgoingEmail, SqliteOutbox
+from tests.fakes import FakeEmailClient
+
+
+class FlakyEmailClient(FakeEmailClient):
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    def send(self, to_address: str, subject: str, content: str) -> None:
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("SMTP is down")
+        super().send(to_address, subject, content)
+
+
+def wait_until(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_queued_client_delivers_in_the_background():
+    delegate = FakeEmailClient()
+    client = QueuedEmailClient(
+        delegate, InMemoryOutbox(), workers=2, poll_interval=0.05
+    )
+    for i in range(10):
+        client.send(f"user{i}@example.com", "Subject", "Content")
+    assert wait_until(lambda: len(delegate.sent) == 10)
+    client.close()
+
+
+def test_queued_client_retries_failed_sends():
+    delegate = FlakyEmailClient(failures=2)
+    client = QueuedEmailClient(
+        delegate, InMemoryOutbox(), workers=1, backoff=0.01, poll_interval=0.05
+    )
+    client.send("user@example.com", "Subject", "Content")
+    assert wait_until(lambda: len(delegate.sent) == 1)
+    client.close()
+
+
+def test_queued_client_gives_up_after_max_attempts():
+    delegate = FlakyEmailClient(failures=100)
+    outbox = InMemoryOutbox()
+    client = QueuedEmailClient(
+        delegate, outbox, workers=1, max_attempts=3, backoff=0.01, poll_interval=0.05
+    )
+    client.send("user@example.com", "Subject", "Content")
+    assert wait_until(lambda: delegate.failures == 97)
+    time.sleep(0.1)
+    client.close()
+    assert delegate.failures == 97
+    assert len(outbox) == 0
+
+
+def test_sqlite_outbox_keeps_emails_between_instances(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    SqliteOutbox(path).put(OutgoingEmail("user@example.com", "Subject", "Content"))
+    outbox = SqliteOutbox(path)
+    email = outbox.get(timeout=0)
+    assert email.to_address == "user@example.com"
+    assert outbox.get(timeout=0) is None
+    outbox.ack(email)
+
+
+def test_sqlite_outbox_delays_retries(tmp_path):
+    outbox = SqliteOutbox(str(tmp_path / "outbox.sqlite3"))
+    outbox.put(OutgoingEmail("user@example.com", "Subject", "Content"))
+    outbox.retry(outbox.get(timeout=0), delay=60)
+    assert outbox.get(timeout=0) is None
+
+
+def test_sqlite_deployments_queue_email_by_default(monkeypatch, tmp_path):
+    monkeypatch.delenv("EMAIL_QUEUE", raising=False)
+    monkeypatch.setenv("EMAIL_QUEUE_PATH", str(tmp_path / "outbox.sqlite3"))
+    monkeypatch.setenv("DATABASE_BACKEND", "sqlite")
+    assert isinstance(bootstrap._build_outbox(), SqliteOutbox)
+    monkeypatch.setenv("DATABASE_BACKEND", "postgres")
+    assert bootstrap._build_outbox() is None
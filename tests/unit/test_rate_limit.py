@@ -0,0 +1,87 @@
+import time
+from focus_arrow.adapters.rate_limit import (
+    InMemoryRateLimiter,
+    PostgreRateLimiter,
+    RateLimits,
+)
+from focus_arrow.app import client_ip, create_app
+from focus_arrow.bootstrap import build_rate_limits
+from tests.fakes import FakeUnitOfWork, make_bus
+
+
+def test_bucket_allows_bursts_up_to_capacity():
+    limiter = InMemoryRateLimiter(capacity=3, rate=0.001)
+    assert [limiter.acquire("bob") for _ in range(4)] == [True, True, True, False]
+    assert limiter.acquire("alice")
+
+
+def test_bucket_refills_over_time():
+    limiter = InMemoryRateLimiter(capacity=1, rate=100)
+    assert limiter.acquire("bob")
+    assert not limiter.acquire("bob")
+    time.sleep(0.02)
+    assert limiter.acquire("bob")
+
+
+def test_app_rejects_requests_over_the_address_limit():
+    rate_limits = RateLimits(per_address=InMemoryRateLimiter(capacity=2, rate=0.001))
+    client = create_app(make_bus(FakeUnitOfWork), rate_limits).test_client()
+    statuses = [
+        client.get("/send-token?email=bob@example.com").status_code for _ in range(3)
+    ]
+    assert statuses == [403, 403, 429]
+    response = client.get("/send-token?email=Bob@example.com")
+    assert int(response.headers["Retry-After"]) > 0
+    assert client.get("/send-token?email=alice@example.com").status_code == 403
+    # Other endpoints have their own buckets, and polling is not per address.
+    assert client.get("/uninstall?email=bob@example.com").status_code == 403
+    for _ in range(5):
+        assert client.get("/check-email?email=bob@example.com").status_code == 200
+    assert client.get("/block-screens/default").status_code == 200
+
+
+def test_client_ip_is_taken_behind_the_trusted_proxies():
+    assert client_ip("10.0.0.1", "6.6.6.6, 1.2.3.4", 0) == "10.0.0.1"
+    assert client_ip("10.0.0.1", "6.6.6.6, 1.2.3.4", 1) == "1.2.3.4"
+    assert client_ip("10.0.0.1", "6.6.6.6, 1.2.3.4, 10.0.0.2", 2) == "1.2.3.4"
+    assert client_ip("10.0.0.1", "1.2.3.4", 2) == "10.0.0.1"
+    assert client_ip("10.0.0.1", None, 1) == "10.0.0.1"
+
+
+def test_requests_refused_for_their_address_cost_the_ip_nothing():
+    rate_limits = RateLimits(
+        per_ip=InMemoryRateLimiter(capacity=2, rate=0.001),
+        per_address=InMemoryRateLimiter(capacity=1, rate=0.001),
+    )
+    assert rate_limits.check("email_token", "1.2.3.4", "bob@example.com") is None
+    for _ in range(5):
+        assert rate_limits.check("email_token", "1.2.3.4", "bob@example.com")
+    assert rate_limits.check("email_token", "1.2.3.4", "alice@example.com") is None
+
+
+def test_rate_limits_are_shared_through_postgres_by_default(monkeypatch):
+    monkeypatch.delenv("RATE_LIMIT_BACKEND")
+    monkeypatch.setenv("DATABASE_BACKEND", "postgres")
+    monkeypatch.setenv("RATE_LIMIT_PURGE_INTERVAL", "0")
+    monkeypatch.setenv("POSTGRES_POOL_MAX_SIZE", "0")
+    assert isinstance(build_rate_limits().per_ip, PostgreRateLimiter)
+    monkeypatch.setenv("DATABASE_BACKEND", "sqlite")
+    assert isinstance(build_rate_limits().per_ip, InMemoryRateLimiter)
+
+
+def test_idle_buckets_are_purged_in_chunks_per_kind():
+    class PurgingLimiter(InMemoryRateLimiter):
+        def __init__(self, idle):
+            super().__init__(capacity=1, rate=1)
+            self.idle, self.prefixes = idle, []
+
+        def purge_idle(self, prefix, limit):
+            self.prefixes.append(prefix)
+            deleted = min(self.idle, limit)
+            self.idle -= deleted
+            return deleted
+
+    per_ip, per_address = PurgingLimiter(5), PurgingLimiter(1)
+    assert RateLimits(per_ip, per_address).purge_idle(chunk_size=2) == 6
+    assert per_ip.prefixes == ["ip:"] * 3
+    assert per_address.prefixes == ["address:"]
@@ -0,0 +1,20 @@
+from datetime import datetime
+from focus_arrow.domain.model import VerificationEmailHistoryEntry
+from focus_arrow.services.retention import purge_expired_history
+from tests.fakes import FakeUnitOfWork
+
+
+def test_purges_records_sent_before_today_in_chunks():
+    uow = FakeUnitOfWork()
+    for day in range(1, 8):
+        uow.email_history.add_record(
+            VerificationEmailHistoryEntry(
+                f"user{day}@example.com", datetime(2024, 1, day, 12), f"TOKEN{day}"
+            )
+        )
+    purged = purge_expired_history(
+        lambda: uow, now=datetime(2024, 1, 7, 8), chunk_size=2
+    )
+    assert purged == 6
+    assert uow.email_history.get_record_by_token("TOKEN7") is not None
+    assert uow.email_history.get_record_by_token("TOKEN6") is None
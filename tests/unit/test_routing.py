@@ -0,0 +1,71 @@
+from datetime import datetime
+from focus_arrow.adapters.cache import LruTtlCache
+from focus_arrow.domain.model import VerificationEmailHistoryEntry, VerifiedEmailEntry
+from focus_arrow.services.uow import Replica, ReplicaSet, RoutingUnitOfWork
+from tests.fakes import FakeUnitOfWork
+
+BOB = VerifiedEmailEntry("bob@example.com")
+
+
+def make_routing(replica_uow, primary_uow=None, healthy=True):
+    primary_uow = primary_uow or FakeUnitOfWork()
+    replica = Replica("replica", lambda: replica_uow, lambda: None)
+    replica.healthy = healthy
+    recent_writes = LruTtlCache(100, 60)
+    return lambda: RoutingUnitOfWork(
+        lambda: primary_uow, ReplicaSet([replica]), recent_writes
+    )
+
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary():
+    primary, replica = FakeUnitOfWork(), FakeUnitOfWork()
+    replica.verified_emails.add(BOB)
+    uow_factory = make_routing(replica, primary)
+    with uow_factory() as uow:
+        assert uow.verified_emails.contains(BOB)
+        uow.verified_emails.add(VerifiedEmailEntry("alice@example.com"))
+        uow.commit()
+    assert primary.committed
+    assert VerifiedEmailEntry("alice@example.com") in primary.verified_emails.collection
+
+
+def test_reads_after_a_write_see_the_primary():
+    primary, replica = FakeUnitOfWork(), FakeUnitOfWork()
+    uow_factory = make_routing(replica, primary)
+    with uow_factory() as uow:
+        uow.verified_emails.add(BOB)
+        assert uow.verified_emails.contains(BOB)
+        uow.commit()
+    with uow_factory() as uow:
+        assert uow.verified_emails.contains(BOB)
+        assert not uow.verified_emails.contains(VerifiedEmailEntry("x@example.com"))
+
+
+def test_unhealthy_replicas_are_skipped():
+    replica = FakeUnitOfWork()
+    replica.verified_emails.add(BOB)
+    with make_routing(replica, healthy=False)() as uow:
+        assert not uow.verified_emails.contains(BOB)
+
+
+def test_health_checks_pick_the_fastest_healthy_replica():
+    def fail():
+        raise ConnectionError
+
+    slow = Replica("slow", FakeUnitOfWork, lambda: None)
+    fast = Replica("fast", FakeUnitOfWork, lambda: None)
+    broken = Replica("broken", FakeUnitOfWork, fail)
+    slow.latency, fast.latency, broken.latency = 0.5, 0.1, 0.0
+    replicas = ReplicaSet([slow, fast, broken], smoothing=0)
+    replicas.check()
+    assert not broken.healthy
+    assert replicas.choose() is fast
+
+
+def test_tokens_are_looked_up_on_the_primary():
+    primary, replica = FakeUnitOfWork(), FakeUnitOfWork()
+    primary.email_history.add_record(
+        VerificationEmailHistoryEntry("bob@example.com", datetime.now(), "TOKEN")
+    )
+    with make_routing(replica, primary)() as uow:
+        assert uow.email_history.get_record_by_token("TOKEN") is not None
@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+from threading import Thread
+import pytest
+from focus_arrow.domain.model import (
+    VerificationEmailHistoryEntry,
+    VerifiedEmailEntry,
+    normalize_address,
+)
+from focus_arrow.migrations import sqlite as sqlite_migrations
+from focus_arrow.services.retention import purge_expired_history
+from focus_arrow.services.uow import (
+    SqliteConnections,
+    SqliteUnitOfWork,
+    connect_sqlite,
+)
+
+
+@pytest.fixture
+def connections(tmp_path):
+    path = str(tmp_path / "focus_arrow.sqlite3")
+    conn = connect_sqlite(path)
+    assert sqlite_migrations.migrate(conn) == [1, 2, 3]
+    assert sqlite_migrations.migrate(conn) == []
+    conn.close()
+    return SqliteConnections(path)
+
+
+def test_rolls_back_uncommitted_changes(connections):
+    with SqliteUnitOfWork(connections) as uow:
+        uow.verified_emails.add(VerifiedEmailEntry("bob@example.com"))
+    with SqliteUnitOfWork(connections) as uow:
+        assert not uow.verified_emails.contains(VerifiedEmailEntry("bob@example.com"))
+        uow.verified_emails.add(VerifiedEmailEntry("bob@example.com"))
+        uow.commit()
+    with SqliteUnitOfWork(connections) as uow:
+        found = uow.verified_emails.contains_many(
+            [VerifiedEmailEntry("bob@example.com"), VerifiedEmailEntry("x@example.com")]
+        )
+        assert found == {"bob@example.com"}
+
+
+def test_keeps_the_latest_record_per_address(connections):
+    sent = datetime.now()
+    with SqliteUnitOfWork(connections) as uow:
+        for token in ("OLD", "NEW"):
+            uow.email_history.add_record(
+                VerificationEmailHistoryEntry("bob@example.com", sent, token)
+            )
+        uow.commit()
+    with SqliteUnitOfWork(connections) as uow:
+        assert uow.email_history.get_record_by_token("OLD") is None
+        record = uow.email_history.get_record_by_address("bob@example.com")
+        assert record == VerificationEmailHistoryEntry("bob@example.com", sent, "NEW")
+
+
+def test_purges_old_history(connections):
+    with SqliteUnitOfWork(connections) as uow:
+        for i, days in enumerate((0, 2, 3)):
+            uow.email_history.add_record(
+                VerificationEmailHistoryEntry(
+                    f"user{i}@example.com",
+                    datetime.now() - timedelta(days=days),
+                    f"T{i}",
+                )
+            )
+        uow.commit()
+    factory = lambda: SqliteUnitOfWork(connections)
+    assert purge_expired_history(factory, chunk_size=1) == 2
+
+
+def test_each_thread_gets_its_own_connection(connections):
+    seen = []
+    threads = [Thread(target=lambda: seen.append(connections.get())) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+        thread.join()
+    assert seen[0] is not seen[1]
+    assert connections.get() is connections.get()
+
+
+def test_migration_merges_addresses_that_only_differ_in_case(tmp_path, monkeypatch):
+    conn = connect_sqlite(str(tmp_path / "focus_arrow.sqlite3"))
+    initial = sqlite_migrations.MIGRATIONS[:1]
+    monkeypatch.setattr(sqlite_migrations, "MIGRATIONS", initial)
+    sqlite_migrations.migrate(conn)
+    conn.executemany(
+        "INSERT INTO verified_emails (email_address) VALUES (?);",
+        [("Bob@example.com",), ("bob@example.com ",)],
+    )
+    conn.executemany(
+        "INSERT INTO verification_email_history (address, sent, token) VALUES (?, ?, ?);",
+        [
+            ("BOB@example.com", "2024-01-02", "new"),
+            ("bob@example.com", "2024-01-01", "old"),
+        ],
+    )
+    monkeypatch.undo()
+    assert sqlite_migrations.migrate(conn) == [2, 3]
+    assert conn.execute("SELECT * FROM verified_emails;").fetchall() == [
+        ("bob@example.com",)
+    ]
+    assert conn.execute(
+        "SELECT address, token FROM verification_email_history;"
+    ).fetchall() == [("bob@example.com", "new")]
+    conn.close()
+
+
+def test_migration_normalizes_addresses_like_the_application(tmp_path, monkeypatch):
+    conn = connect_sqlite(str(tmp_path / "focus_arrow.sqlite3"))
+    initial = sqlite_migrations.MIGRATIONS[:2]
+    monkeypatch.setattr(sqlite_migrations, "MIGRATIONS", initial)
+    sqlite_migrations.migrate(conn)
+    # Decomposed and upper-case non-ASCII, which lower() and trim() miss.
+    conn.executemany(
+        "INSERT INTO verified_emails (email_address) VALUES (?);",
+        [("E\u0301ve@example.com",), ("\u00c9ve@example.com\u00a0",)],
+    )
+    monkeypatch.undo()
+    assert sqlite_migrations.migrate(conn) == [3]
+    assert conn.execute("SELECT * FROM verified_emails;").fetchall() == [
+        (normalize_address("\u00c9ve@example.com"),)
+    ]
+    conn.close()
@@ -0,0 +1,25 @@
+from jinja2 import DictLoader, PackageLoader
+import pytest
+from focus_arrow.adapters.templates import JinjaTemplateRenderer
+
+
+@pytest.mark.parametrize(
+    "arguments", [{}, {"token": "AbC123"}, {"message": "<b>Tom & Jerry</b>"}]
+)
+def test_renders_shipped_templates_like_jinja(arguments):
+    renderer = JinjaTemplateRenderer(PackageLoader("focus_arrow"))
+    for template_name in renderer.env.list_templates():
+        expected = renderer.env.get_template(template_name).render(**arguments)
+        assert renderer.render(template_name, **arguments) == expected
+
+
+def test_falls_back_to_jinja_for_templates_with_logic():
+    renderer = JinjaTemplateRenderer(
+        DictLoader({"list.html": "{% for i in items %}<{{ i }}>{% endfor %}"})
+    )
+    assert renderer.render("list.html", items=[1, 2]) == "<1><2>"
+
+
+def test_memoizes_templates_without_variables():
+    renderer = JinjaTemplateRenderer(DictLoader({"static.html": "<p>Bye</p>"}))
+    assert renderer.render("static.html") is renderer.render("static.html")
@@ -0,0 +1,28 @@
+from focus_arrow.adapters.token import BufferedTokenGenerator, SecureTokenGenerator
+import pytest
+
+
+def test_generates_tokens_of_given_length_and_alphabet():
+    generator = SecureTokenGenerator(12, "abc")
+    tokens = generator.generate_many(100)
+    assert len(tokens) == 100
+    assert all(len(token) == 12 and set(token) <= set("abc") for token in tokens)
+    assert len(set(tokens)) > 90
+
+
+def test_rejects_invalid_alphabets():
+    with pytest.raises(ValueError):
+        SecureTokenGenerator(8, "aab")
+    with pytest.raises(ValueError):
+        SecureTokenGenerator(8, "ñandú")
+    with pytest.raises(ValueError):
+        SecureTokenGenerator(0)
+
+
+def test_buffered_generator_refills_in_background():
+    generator = BufferedTokenGenerator(SecureTokenGenerator(), size=4)
+    try:
+        tokens = [generator.generate() for _ in range(20)]
+    finally:
+        generator.close()
+    assert all(len(token) == 8 for token in tokens)
@@ -0,0 +1,52 @@
+from datetime import datetime
+from focus_arrow.migrations import sqlite as sqlite_migrations
+from focus_arrow.services.uow import connect_sqlite
+from focus_arrow.transfer import FileStore, SqliteStore, chunked, transfer
+
+SENT = datetime(2024, 1, 2, 3, 4, 5)
+
+
+def sqlite_store(path) -> SqliteStore:
+    conn = connect_sqlite(str(path))
+    sqlite_migrations.migrate(conn)
+    return SqliteStore(conn)
+
+
+def test_chunks_rows_without_reading_ahead():
+    assert list(chunked(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_round_trips_through_ndjson_and_csv(tmp_path):
+    source = sqlite_store(tmp_path / "source.sqlite3")
+    source.write("verified_emails", [("alice@example.com",), ("Bob@Example.com",)])
+    source.write("verification_email_history", [("bob@example.com", SENT, "TOKEN")])
+    ndjson = FileStore(str(tmp_path / "{table}.ndjson"))
+    csv = FileStore(str(tmp_path / "{table}.csv"))
+    target = sqlite_store(tmp_path / "target.sqlite3")
+    progress = []
+
+    for table in ("verified_emails", "verification_email_history"):
+        transfer(source, ndjson, table)
+        ndjson.close()
+        transfer(ndjson, csv, table)
+        csv.close()
+        copied = transfer(
+            csv, target, table, 1, lambda *report: progress.append(report[:2])
+        )
+        # Existing rows are skipped, so running a transfer again is harmless.
+        assert transfer(csv, target, table) == copied
+
+    assert sorted(target.read("verified_emails", 10)) == [
+        ("alice@example.com",),
+        ("bob@example.com",),
+    ]
+    assert list(target.read("verification_email_history", 10)) == [
+        ("bob@example.com", SENT, "TOKEN")
+    ]
+    assert progress == [
+        ("verified_emails", 1),
+        ("verified_emails", 2),
+        ("verification_email_history", 1),
+    ]
+    source.close()
+    target.close()
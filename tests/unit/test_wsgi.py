@@ -0,0 +1,20 @@
+from werkzeug.test import Client
+from focus_arrow.app import create_app
+from tests.fakes import FakeUnitOfWork, make_bus
+import wsgi
+
+
+def test_app_is_built_per_worker_after_import(monkeypatch):
+    built = []
+
+    def create_worker_app():
+        built.append(create_app(make_bus(FakeUnitOfWork)))
+        return built[-1]
+
+    monkeypatch.setattr(wsgi, "create_app", create_worker_app)
+    monkeypatch.setattr(wsgi, "_worker_app", None)
+    assert built == []
+    wsgi.init_worker()
+    response = Client(wsgi.app).get("/check-email?email=bob@example.com")
+    assert response.json == {"confirmed": False}
+    assert len(built) == 1
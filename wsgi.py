@@ -0,0 +1,28 @@
+from typing import Optional
+from dotenv import load_dotenv
+from flask import Flask
+
+# Imported up front so that with `preload_app` the master process pays for
+# loading Flask, the drivers and every handler once, and workers share those
+# pages. The app itself is not built here: its database pools, SMTP
+# connections and background threads would not survive the fork.
+from focus_arrow.app import create_app
+
+load_dotenv(".env")
+_worker_app: Optional[Flask] = None
+
+
+def init_worker() -> None:
+    """
+    Builds this worker's app, with its own pools and threads. Called from
+    gunicorn's `post_fork` hook, see gunicorn.conf.py.
+    """
+    global _worker_app
+    _worker_app = create_app()
+
+
+def app(environ, start_response):
+    if _worker_app is None:
+        # Served without the hook, e.g. by a server that does not fork.
+        init_worker()
+    return _worker_app(environ, start_response)